@@ -0,0 +1,9 @@
+# 日文單字 Flashcards。各模組彼此用平的 import（from logic import ...），
+# 從套件外面使用時請走 python -m japanese_flashcard_pack（見 __main__.py），
+# 或是先 import japanese_flashcard_pack：會把套件目錄加進 sys.path，之後就能用同樣平的 import。
+import os
+import sys
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+if PACKAGE_DIR not in sys.path:
+    sys.path.insert(0, PACKAGE_DIR)
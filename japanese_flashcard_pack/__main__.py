@@ -0,0 +1,77 @@
+# 統一的進入點：python -m japanese_flashcard_pack [study|quiz|review|serve]
+# 沒有子命令時開啟命令列選單。這裡只 import 標準函式庫，
+# 題庫、colorama、streamlit 等只在需要的子命令裡才載入，選單不用等它們。
+import argparse
+import os
+import sys
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 套件裡的模組彼此用平的 import，直接執行和 -m 都要找得到
+if PACKAGE_DIR not in sys.path:
+    sys.path.insert(0, PACKAGE_DIR)
+
+def menu(args):
+    import practice_jp_new
+    practice_jp_new.main()
+
+def study(args):
+    import practice_jp_new
+    flashcards = practice_jp_new.load_flashcards()
+    unit = flashcards and practice_jp_new.pick_unit(flashcards, args.unit)
+    if unit:
+        practice_jp_new.study_mode(flashcards, unit)
+
+def quiz(args):
+    import practice_jp_new
+    flashcards = practice_jp_new.load_flashcards()
+    unit = flashcards and practice_jp_new.pick_unit(flashcards, args.unit)
+    if not unit:
+        return
+    if args.choice:
+        practice_jp_new.choice_quiz_mode(flashcards, unit, practice_jp_new.load_choices())
+    else:
+        practice_jp_new.quiz_mode(flashcards, unit, practice_jp_new.load_answers())
+
+def review(args):
+    import practice_jp_new
+    if not args.due:
+        practice_jp_new.review_wrong_answers()
+        return
+    flashcards = practice_jp_new.load_flashcards()
+    if flashcards:
+        practice_jp_new.due_review_mode(flashcards, practice_jp_new.load_answers())
+
+# 網頁版；其餘參數原樣交給 streamlit run，例如 serve --server.port 8502
+def serve(args, extra=()):
+    from streamlit.web import cli
+    sys.argv = ["streamlit", "run", os.path.join(PACKAGE_DIR, "frontend.py"), *extra]
+    sys.exit(cli.main())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m japanese_flashcard_pack", description="日文單字 Flashcards")
+    parser.add_argument("--dir", default=PACKAGE_DIR, help="命令列模式的題庫與紀錄檔所在資料夾，預設為套件資料夾")
+    parser.set_defaults(func=menu)
+    sub = parser.add_subparsers(dest="command")
+    p = sub.add_parser("study", help="學習模式：列出一個單元的單字")
+    p.add_argument("unit", nargs="?", help="單元名稱或編號，沒給時列出單元讓你選")
+    p.set_defaults(func=study)
+    p = sub.add_parser("quiz", help="單元測驗（從上次沒考完的地方繼續）")
+    p.add_argument("unit", nargs="?", help="單元名稱或編號，沒給時列出單元讓你選")
+    p.add_argument("--choice", action="store_true", help="改成選擇題")
+    p.set_defaults(func=quiz)
+    p = sub.add_parser("review", help="複習答錯過的單字")
+    p.add_argument("--due", action="store_true", help="改成依間隔重複排程，出今天到期的卡片")
+    p.set_defaults(func=review)
+    p = sub.add_parser("serve", help="開啟網頁版（streamlit）；其餘參數交給 streamlit run")
+    p.set_defaults(func=serve)
+    args, extra = parser.parse_known_args(argv)
+    os.chdir(args.dir)
+    if args.func is serve:
+        serve(args, extra)
+    elif extra:
+        parser.error(f"不認得的參數：{' '.join(extra)}")
+    else:
+        args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+# 學習分析。answers.log 是每次作答的原始紀錄（journal.log_answer 逐行 append），
+# 這裡把它累加成 NumPy 陣列：以單字 id 為索引的作答數 / 答對數 / 最後作答時間 / 最後作答的單元，
+# 以單元 id 為索引的作答數 / 答對數，以日期為索引的每日作答數 / 答對數。
+# 陣列連同讀到的位置存成 .npz 快照；之後每次只累加上次位置之後新增的行，不會重讀整份歷史，
+# 儀表板載入時間只和快照大小（單字數、天數）有關，和紀錄了幾年無關。
+# 日期以本機目前的時區換算（台灣沒有日光節約時間）。
+
+SNAPSHOT_VERSION = 1
+
+def _day(when):
+    return int((when + time.localtime().tm_gmtoff) // 86400)
+
+class Analytics:
+    def __init__(self, log_path, snapshot_path=None):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path or os.path.splitext(log_path)[0] + ".npz"
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.offset = 0
+        self.words = []
+        self.word_ids = {}
+        self.units = []
+        self.unit_ids = {}
+        self.first_day = None
+        self.word_attempts = np.zeros(0, np.int64)
+        self.word_correct = np.zeros(0, np.int64)
+        self.word_last = np.zeros(0, np.float64)
+        self.word_unit = np.zeros(0, np.int32)
+        self.unit_attempts = np.zeros(0, np.int64)
+        self.unit_correct = np.zeros(0, np.int64)
+        self.day_attempts = np.zeros(0, np.int64)
+        self.day_correct = np.zeros(0, np.int64)
+
+    def _load(self):
+        try:
+            with np.load(self.snapshot_path, allow_pickle=False) as snap:
+                if int(snap["version"]) != SNAPSHOT_VERSION:
+                    return
+                self.offset = int(snap["offset"])
+                self.words = snap["words"].tolist()
+                self.units = snap["units"].tolist()
+                first_day = int(snap["first_day"])
+                self.first_day = None if first_day < 0 else first_day
+                for name in ("word_attempts", "word_correct", "word_last", "word_unit",
+                             "unit_attempts", "unit_correct", "day_attempts", "day_correct"):
+                    setattr(self, name, snap[name])
+        except (OSError, KeyError, ValueError):
+            self._reset()
+            return
+        self.word_ids = {word: i for i, word in enumerate(self.words)}
+        self.unit_ids = {unit: i for i, unit in enumerate(self.units)}
+
+    def save(self):
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp.npz"
+        with self._lock:
+            # 空的字串陣列 dtype 不固定，至少給一個 unicode 型別
+            np.savez(tmp, version=SNAPSHOT_VERSION, offset=self.offset,
+                     words=np.array(self.words, dtype=str if self.words else "<U1"),
+                     units=np.array(self.units, dtype=str if self.units else "<U1"),
+                     first_day=-1 if self.first_day is None else self.first_day,
+                     word_attempts=self.word_attempts, word_correct=self.word_correct,
+                     word_last=self.word_last, word_unit=self.word_unit,
+                     unit_attempts=self.unit_attempts, unit_correct=self.unit_correct,
+                     day_attempts=self.day_attempts, day_correct=self.day_correct)
+        os.replace(tmp, self.snapshot_path)
+
+    def _intern(self, ids, names, name):
+        i = ids.get(name)
+        if i is None:
+            i = ids[name] = len(names)
+            names.append(name)
+        return i
+
+    # 把上次位置之後的新紀錄累加進陣列，回傳新增的筆數；紀錄檔變短代表被改寫過，整個重來
+    def sync(self):
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            return 0
+        with self._lock:
+            if size == self.offset:
+                return 0
+            if size < self.offset:
+                self._reset()
+            with open(self.log_path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+            # 只處理完整的行，寫到一半的行留給下次
+            end = data.rfind(b"\n") + 1
+            if not end:
+                return 0
+            count = self._fold(data[:end].decode("utf-8", errors="ignore").split("\n")[:-1])
+            self.offset += end
+        return count
+
+    def _fold(self, lines):
+        whens = []
+        correct = []
+        word_idx = []
+        unit_idx = []
+        for line in lines:
+            parts = line.split("\t", 3)
+            if len(parts) != 4:
+                continue
+            try:
+                whens.append(float(parts[0]))
+            except ValueError:
+                continue
+            correct.append(parts[1] == "1")
+            unit_idx.append(self._intern(self.unit_ids, self.units, parts[2]))
+            word_idx.append(self._intern(self.word_ids, self.words, parts[3]))
+        if not whens:
+            return 0
+        whens = np.array(whens)
+        correct = np.array(correct, np.int64)
+        word_idx = np.array(word_idx, np.int64)
+        unit_idx = np.array(unit_idx, np.int64)
+
+        n_words = len(self.words)
+        self.word_attempts = _grow(self.word_attempts, n_words)
+        self.word_correct = _grow(self.word_correct, n_words)
+        self.word_last = _grow(self.word_last, n_words)
+        self.word_unit = _grow(self.word_unit, n_words)
+        self.word_attempts += np.bincount(word_idx, minlength=n_words)
+        self.word_correct += np.bincount(word_idx, weights=correct, minlength=n_words).astype(np.int64)
+        # 同一個單字出現多次時，依時間排序後最後一筆的時間與單元會蓋過前面的
+        order = np.argsort(whens, kind="stable")
+        newer = whens[order] >= self.word_last[word_idx[order]]
+        self.word_last[word_idx[order][newer]] = whens[order][newer]
+        self.word_unit[word_idx[order][newer]] = unit_idx[order][newer]
+
+        n_units = len(self.units)
+        self.unit_attempts = _grow(self.unit_attempts, n_units)
+        self.unit_correct = _grow(self.unit_correct, n_units)
+        self.unit_attempts += np.bincount(unit_idx, minlength=n_units)
+        self.unit_correct += np.bincount(unit_idx, weights=correct, minlength=n_units).astype(np.int64)
+
+        offset = time.localtime().tm_gmtoff
+        days = ((whens + offset) // 86400).astype(np.int64)
+        first = int(days.min()) if self.first_day is None else min(self.first_day, int(days.min()))
+        if self.first_day is not None and first < self.first_day:
+            # 補了更早的日期：往前墊零
+            pad = self.first_day - first
+            self.day_attempts = np.concatenate([np.zeros(pad, np.int64), self.day_attempts])
+            self.day_correct = np.concatenate([np.zeros(pad, np.int64), self.day_correct])
+        self.first_day = first
+        span = int(days.max()) - first + 1
+        self.day_attempts = _grow(self.day_attempts, span)
+        self.day_correct = _grow(self.day_correct, span)
+        self.day_attempts += np.bincount(days - first, minlength=len(self.day_attempts))
+        self.day_correct += np.bincount(days - first, weights=correct,
+                                        minlength=len(self.day_attempts)).astype(np.int64)
+        return len(whens)
+
+    # (日期序號陣列, 每日作答數, 每日答對數)，最近 days 天；沒作答的日子為 0
+    def daily(self, days=None, today=None):
+        if self.first_day is None:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.int64)
+        last = max(_day(time.time() if today is None else today), self.first_day + len(self.day_attempts) - 1)
+        start = self.first_day if days is None else max(self.first_day, last - days + 1)
+        attempts = np.zeros(last - start + 1, np.int64)
+        correct = np.zeros(last - start + 1, np.int64)
+        lo = start - self.first_day
+        chunk = self.day_attempts[lo:lo + len(attempts)]
+        attempts[:len(chunk)] = chunk
+        correct[:len(chunk)] = self.day_correct[lo:lo + len(attempts)]
+        return np.arange(start, last + 1), attempts, correct
+
+    # 最難的單字：答錯率（加一平滑，作答少的不會一錯就排第一）最高的 limit 個
+    # 回傳 [(單字, 最後作答的單元, 作答數, 答對率)]
+    def hardest(self, limit=20, min_attempts=3):
+        attempts = self.word_attempts
+        candidates = np.flatnonzero(attempts >= min_attempts)
+        if not len(candidates):
+            return []
+        miss = (attempts[candidates] - self.word_correct[candidates] + 1) / (attempts[candidates] + 2)
+        if len(candidates) > limit:
+            top = np.argpartition(-miss, limit)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.lexsort((-attempts[candidates[top]], -miss[top]))]
+        return [(self.words[i], self.units[self.word_unit[i]], int(attempts[i]),
+                 float(self.word_correct[i] / attempts[i])) for i in candidates[top]]
+
+    # 各單元的熟練度：[(單元, 作答數, 答對率, 練過的單字數, 熟練的單字數)]；
+    # 單字算在最後一次作答的單元，作答至少 min_attempts 次且答對率達 threshold 算熟練
+    def unit_mastery(self, threshold=0.8, min_attempts=2):
+        n_units = len(self.units)
+        practiced = self.word_attempts > 0
+        mastered = (self.word_attempts >= min_attempts) & \
+                   (self.word_correct >= threshold * self.word_attempts)
+        practiced_count = np.bincount(self.word_unit[practiced], minlength=n_units)
+        mastered_count = np.bincount(self.word_unit[mastered], minlength=n_units)
+        result = []
+        for i, unit in enumerate(self.units):
+            attempts = int(self.unit_attempts[i])
+            if not attempts:
+                continue
+            result.append((unit, attempts, float(self.unit_correct[i] / attempts), int(practiced_count[i]),
+                           int(mastered_count[i])))
+        return result
+
+    def totals(self):
+        attempts = int(self.word_attempts.sum())
+        return attempts, int(self.word_correct.sum()), len(self.words)
+
+# 每次 sync 只長一次，直接補零到需要的長度
+def _grow(values, size):
+    if len(values) >= size:
+        return values
+    return np.concatenate([values, np.zeros(size - len(values), values.dtype)])
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+# 每個紀錄檔共用一個引擎，取得時順便累加新紀錄並更新快照
+def open_analytics(log_path):
+    key = os.path.abspath(log_path)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = Analytics(key)
+            _engines[key] = engine
+    if engine.sync():
+        engine.save()
+    return engine
@@ -0,0 +1,147 @@
+import re
+import unicodedata
+
+from deck_cache import load_cached_units
+
+# 作答比對共用的工具：正規化、題庫載入時預先算好的答案形式，
+# 以及答錯時判斷是哪一種「差一點」（濁音、半濁音、小字假名、拼字接近）。
+
+DAKUTEN = "\u3099"  # 結合用濁點
+HANDAKUTEN = "\u309a"  # 結合用半濁點
+SMALL_KANA = str.maketrans("ぁぃぅぇぉっゃゅょゎゕゖ", "あいうえおつやゆよわかけ")
+ALTERNATE_CHARS = "／/、，,；;"
+# 括號裡只有用這些符號列出好幾個說法時才算替代答案；「（禮貌型，靠對方）」這種逗號多半是補充說明
+INNER_ALTERNATE_CHARS = "／/、"
+PAREN = re.compile(r"\s*[（(]([^（）()]*)[）)]\s*")
+
+def normalize_string(s):
+    return unicodedata.normalize('NFKC', s.strip().lower())
+
+def to_hiragana(s):
+    return "".join(chr(ord(c) - 0x60) if "ァ" <= c <= "ヶ" else c for c in s)
+
+def strip_marks(s):
+    return "".join(c for c in unicodedata.normalize("NFD", s) if c not in (DAKUTEN, HANDAKUTEN))
+
+# (正規化, 平假名, 去掉濁點半濁點, 小字轉大字)，題庫載入時每張卡算一次
+def answer_forms(answer):
+    normalized = normalize_string(answer)
+    hira = to_hiragana(normalized)
+    return normalized, hira, strip_marks(hira), hira.translate(SMALL_KANA)
+
+def build_answer_forms(unit, cards):
+    return {word: answer_forms(word) for word in cards}
+
+# {單元: {單字: 答案形式}}，題庫變更時只重算有變的單元
+def load_answer_index(path, deck=None):
+    return load_cached_units(path, build_answer_forms, tag="answers", deck=deck)
+
+# 可接受答案的前綴樹（巢狀 dict，"" 表示走到這裡是完整的答案），給打字時的即時提示用。
+# 作答一律先轉成平假名再比，所以只放平假名形式
+def answer_trie(forms_list):
+    root = {}
+    for forms in forms_list:
+        node = root
+        for c in forms[1]:
+            node = node.setdefault(c, {})
+        node[""] = 1
+    return root
+
+# 只在括號外的分隔符號切開
+def split_alternates(text, separators=ALTERNATE_CHARS):
+    parts = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(text):
+        if c in "（(":
+            depth += 1
+        elif c in "）)":
+            depth = max(0, depth - 1)
+        elif depth == 0 and c in separators:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+# 解釋的可接受答案：「涙／眼淚」→ 涙、眼淚；「激（強烈、劇烈）」→ 激、強烈、劇烈。
+# 括號裡只有一個說法時是註解（「非常（口語）」），只接受完整寫法和拿掉括號的「非常」。
+# 原本的完整寫法也接受，全部先正規化好，批改時只要查一次 set。
+def expand_meaning(meaning):
+    accepted = {normalize_string(meaning)}
+    for part in split_alternates(meaning):
+        accepted.add(normalize_string(part))
+        accepted.add(normalize_string(PAREN.sub("", part)))
+        for inner in PAREN.findall(part):
+            alternates = split_alternates(inner, INNER_ALTERNATE_CHARS)
+            if len(alternates) > 1:
+                accepted.update(normalize_string(p) for p in alternates)
+    accepted.discard("")
+    return frozenset(accepted)
+
+# {單元: {單字: 可接受的解釋}}，和題庫一起快取
+def build_meaning_index(flashcards):
+    return {unit: {word: expand_meaning(meaning) for word, meaning in cards.items()}
+            for unit, cards in flashcards.items()}
+
+def check_meaning(user_answer, accepted):
+    return normalize_string(user_answer) in accepted
+
+# 字元 → a 裡出現位置的位元遮罩；同一個 a 要比很多次時可以先算好傳給 bounded_levenshtein
+def char_masks(a):
+    peq = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    return peq
+
+# 編輯距離，超過 limit 時回傳 limit + 1。
+# 用位元平行的 Myers 演算法：a 的每個字元對應一個位元，每讀 b 的一個字元只做幾次整數運算。
+def bounded_levenshtein(a, b, limit, peq=None):
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if not a:
+        return min(len(b), limit + 1)
+    peq = peq or char_masks(a)
+    mask = (1 << len(a)) - 1
+    high = 1 << (len(a) - 1)
+    pv, mv, score = mask, 0, len(a)
+    for c in b:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) | 1
+        pv = ((mh << 1) | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return min(score, limit + 1)
+
+def _mark_hint(user, answer):
+    user_marks = unicodedata.normalize("NFD", user)
+    answer_marks = unicodedata.normalize("NFD", answer)
+    if answer_marks.count(HANDAKUTEN) > user_marks.count(HANDAKUTEN):
+        return "少了半濁音（゜）"
+    if answer_marks.count(DAKUTEN) > user_marks.count(DAKUTEN):
+        return "少了濁音（゛）"
+    return "濁音／半濁音標錯"
+
+# 回傳 (是否正確, 提示)。片假名作答視同平假名；答錯時只在差一點的情況給提示。
+def check_answer(user_answer, forms):
+    normalized, hira, bare, big = forms
+    user = normalize_string(user_answer)
+    if user == normalized:
+        return True, None
+    user_hira = to_hiragana(user)
+    if user_hira == hira:
+        return True, None
+    if strip_marks(user_hira) == bare:
+        return False, _mark_hint(user_hira, hira)
+    if user_hira.translate(SMALL_KANA) == big:
+        return False, "小字假名（っゃゅょ）錯誤"
+    distance = bounded_levenshtein(user_hira, hira, 2)
+    if user_hira and distance <= 2:
+        return False, f"拼字接近，差 {distance} 個字"
+    return False, None
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# 批次批改答案卷：python batch_grade.py 答案卷/*.csv --out 批改結果
+import argparse
+import csv
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from answers import answer_forms, check_answer
+from wrong_store import format_header, format_record, parse_record
+from journal import append_locked
+
+# 答案卷格式：
+#   CSV：第一列為標題，欄位 meaning,user_answer,correct_answer（也可用 解釋,你的回答,正確答案），
+#        可另有 student／學生 欄；沒有標題時依序當成 [學生,] 解釋, 你的回答, 正確答案
+#   文字：和 wrong_answers.txt 相同的「解釋: …, 你的回答: …, 正確答案: …」行
+# 沒有學生欄時以檔名當學生。檔案分段交給 process pool 解析與批改（規則和 check_answer 相同），
+# 主程式只合併統計，並把答錯的紀錄分批 append 到錯題檔。
+
+CHUNK = 20_000
+ALIASES = {"meaning": "meaning", "解釋": "meaning", "user_answer": "user_answer", "你的回答": "user_answer",
+           "correct_answer": "correct_answer", "正確答案": "correct_answer", "student": "student", "學生": "student"}
+
+# 每個 worker 自己的快取：同一個正確答案的形式只算一次，
+# 全班常見的同一種答法（包括同一種錯法）也只批改一次
+_forms = {}
+_results = {}
+
+def _grade(user_answer, correct_answer):
+    key = (user_answer, correct_answer)
+    result = _results.get(key)
+    if result is None:
+        forms = _forms.get(correct_answer)
+        if forms is None:
+            forms = _forms[correct_answer] = answer_forms(correct_answer)
+        result = check_answer(user_answer, forms)
+        if len(_results) > 500_000:
+            _results.clear()
+            _forms.clear()
+        _results[key] = result
+    return result
+
+def csv_layout(header):
+    names = [ALIASES.get(name.strip().lower()) for name in header]
+    if {"meaning", "user_answer", "correct_answer"} <= set(names):
+        return {name: i for i, name in enumerate(names) if name}, True
+    # 沒有標題列
+    if len(header) >= 4:
+        return {"student": 0, "meaning": 1, "user_answer": 2, "correct_answer": 3}, False
+    return {"meaning": 0, "user_answer": 1, "correct_answer": 2}, False
+
+# 批改一段答案卷，回傳 ({學生: [題數, 答對]}, {單字: [解釋, 題數, 答對]}, [(學生, 解釋, 回答, 正確答案, 提示)])
+def grade_chunk(kind, layout, student, lines):
+    students = {}
+    words = {}
+    wrong = []
+    if kind == "csv":
+        width = max(layout.values()) + 1
+        who_col = layout.get("student")
+        m_col, u_col, c_col = layout["meaning"], layout["user_answer"], layout["correct_answer"]
+        rows = ((row[who_col] if who_col is not None else student, row[m_col], row[u_col], row[c_col])
+                for row in csv.reader(lines) if len(row) >= width)
+    else:
+        rows = ((student, *record) for record in map(parse_record, lines) if record)
+    for who, meaning, user_answer, correct_answer in rows:
+        correct, hint = _grade(user_answer, correct_answer)
+        counts = students.get(who)
+        if counts is None:
+            counts = students[who] = [0, 0]
+        counts[0] += 1
+        counts[1] += correct
+        stats = words.get(correct_answer)
+        if stats is None:
+            stats = words[correct_answer] = [meaning, 0, 0]
+        stats[1] += 1
+        stats[2] += correct
+        if not correct:
+            wrong.append((who, meaning, user_answer, correct_answer, hint or ""))
+    return students, words, wrong
+
+# CSV 的引號裡可以有換行，所以只在一筆記錄結束的地方切段：
+# 到目前為止的引號（跳脫的 "" 算兩個）個數是偶數時，這一行才是記錄的結尾
+def _balanced(lines):
+    return sum(line.count('"') for line in lines) % 2 == 0
+
+def read_chunks(path):
+    student = os.path.splitext(os.path.basename(path))[0]
+    kind = "csv" if path.lower().endswith(".csv") else "text"
+    with open(path, "r", encoding="utf-8-sig", errors="ignore", newline="" if kind == "csv" else None) as f:
+        layout = None
+        if kind == "csv":
+            first = [f.readline()]
+            while first[-1] and not _balanced(first):
+                first.append(f.readline())
+            header = next(csv.reader(first), [])
+            layout, has_header = csv_layout(header)
+            if not has_header:
+                yield kind, layout, student, first
+        lines = []
+        quotes = 0
+        for line in f:
+            lines.append(line)
+            if kind == "csv":
+                quotes += line.count('"')
+            if len(lines) >= CHUNK and quotes % 2 == 0:
+                yield kind, layout, student, lines
+                lines = []
+        if lines:
+            yield kind, layout, student, lines
+
+# 依序送出、依序取回，同時在途的段數有上限，記憶體不會隨檔案大小成長
+def graded_chunks(paths, workers):
+    chunks = (chunk for path in paths for chunk in read_chunks(path))
+    if workers <= 1:
+        for chunk in chunks:
+            yield grade_chunk(*chunk)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(grade_chunk, *chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def write_csv(path, header, rows):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def grade_sheets(paths, out_dir, workers=None, history="wrong_answers.txt", unit=None):
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    students = {}
+    words = {}
+    total = 0
+    start = time.perf_counter()
+    with open(os.path.join(out_dir, "wrong.csv"), "w", encoding="utf-8-sig", newline="") as wrong_file:
+        wrong_writer = csv.writer(wrong_file)
+        wrong_writer.writerow(["student", "meaning", "user_answer", "correct_answer", "hint"])
+        for chunk_students, chunk_words, wrong in graded_chunks(paths, workers):
+            for who, (count, correct) in chunk_students.items():
+                counts = students.setdefault(who, [0, 0])
+                counts[0] += count
+                counts[1] += correct
+                total += count
+            for word, (meaning, count, correct) in chunk_words.items():
+                stats = words.setdefault(word, [meaning, 0, 0])
+                stats[1] += count
+                stats[2] += correct
+            wrong_writer.writerows(wrong)
+            # 每段一個區塊、一次上鎖寫入，不會和其他程式的紀錄交錯
+            if history and wrong:
+                lines = [f"\n{format_header(unit)}\n"]
+                lines.extend(format_record(meaning, user_answer, correct_answer)
+                             for _, meaning, user_answer, correct_answer, _ in wrong)
+                append_locked(history, "".join(lines), sync=False)
+    if history and os.path.exists(history):
+        with open(history, "rb") as f:
+            os.fsync(f.fileno())
+
+    write_csv(os.path.join(out_dir, "students.csv"), ["student", "total", "correct", "accuracy"],
+              ((who, count, correct, f"{correct / count:.4f}") for who, (count, correct) in sorted(students.items())))
+    # 答對率低的單字排前面
+    write_csv(os.path.join(out_dir, "words.csv"), ["word", "meaning", "total", "correct", "accuracy"],
+              ((word, meaning, count, correct, f"{correct / count:.4f}")
+               for word, (meaning, count, correct) in sorted(words.items(), key=lambda item: item[1][2] / item[1][1])))
+    return total, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="批次批改答案卷")
+    parser.add_argument("sheets", nargs="+", help="答案卷（.csv 或文字檔）")
+    parser.add_argument("--out", default="批改結果", help="輸出資料夾")
+    parser.add_argument("--workers", type=int, default=None, help="process 數，預設為 CPU 數")
+    parser.add_argument("--history", default="wrong_answers.txt", help="要合併進去的錯題檔")
+    parser.add_argument("--no-history", action="store_true", help="不寫入錯題檔")
+    parser.add_argument("--unit", help="寫入錯題檔時標記的單元")
+    args = parser.parse_args()
+    total, seconds = grade_sheets(args.sheets, args.out, args.workers, None if args.no_history else args.history,
+                                  args.unit)
+    print(f"已批改 {total:,} 題（{seconds:.1f} 秒，每分鐘 {total / seconds * 60 if seconds else 0:,.0f} 題）")
+    print(f"結果在 {args.out}/：students.csv、words.csv、wrong.csv")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+# 效能量測：python bench.py cache --cards 100000
+#          python bench.py suite --sizes 1k,100k --baseline bench_baseline.json
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from deck_cache import load_cached, parse_flashcards, clear_cache
+from scheduler import Scheduler, DAY
+from card_store import CardStore
+
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをんがぎぐげござじずぜぞだでどばびぶべぼぱぴぷぺぽ"
+HANZI = "愛藍紅秋田草腳明天熱哥姐家椅一二三山川日本人台灣上班族有趣激強烈超非常認真噁心可愛好吃女朋友"
+
+def random_word(rng):
+    return "".join(rng.choice(KANA) for _ in range(rng.randint(2, 8)))
+
+def random_meaning(rng):
+    return "".join(rng.choice(HANZI) for _ in range(rng.randint(1, 6)))
+
+def write_deck(path, num_cards, cards_per_unit=200, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(num_cards):
+            if i % cards_per_unit == 0:
+                f.write(f"[單元{i // cards_per_unit + 1}]\n")
+            f.write(f"{random_word(rng)}{i}: {random_meaning(rng)}\n")
+
+def write_wrong_log(path, cards, num_lines, per_block=20, seed=0):
+    rng = random.Random(seed)
+    # 少數單字反覆答錯，和真實紀錄的分布比較接近
+    hard = rng.sample(cards, min(len(cards), max(1, len(cards) // 10)))
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(num_lines):
+            if i % per_block == 0:
+                f.write("\n=== 測驗紀錄 2026-01-01 00:00:00 ===\n")
+            word, meaning = rng.choice(hard) if rng.random() < 0.8 else rng.choice(cards)
+            f.write(f"解釋: {meaning}, 你的回答: {random_word(rng)}, 正確答案: {word}\n")
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+def timed(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def report(name, seconds, count=None):
+    line = f"{name:<28} {seconds * 1000:10.2f} ms"
+    if count:
+        line += f"  {count / seconds:14,.0f} cards/s"
+    print(line)
+
+def bench_cache(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "flashcards.txt")
+        write_deck(path, args.cards)
+        print(f"題庫：{args.cards:,} 張卡片，{os.path.getsize(path) / 1e6:.1f} MB")
+
+        report("冷啟動解析 (parse)", timed(lambda: parse_flashcards(path)), args.cards)
+
+        def cold_build():
+            clear_cache(path)
+            load_cached(path)
+        report("重建快取 (miss)", timed(cold_build), args.cards)
+
+        load_cached(path)
+        report("快取命中 (hit)", timed(lambda: load_cached(path)), args.cards)
+
+        def touched():
+            os.utime(path)
+            load_cached(path)
+        report("touch 後驗證雜湊", timed(touched), args.cards)
+
+        def edited():
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(f"{random_word(random)}: {random_meaning(random)}\n")
+            load_cached(path)
+        report("內容變更後失效重建", timed(edited), args.cards)
+
+# 重播模擬的複習歷史：每天取出到期卡片作答，答對機率隨間隔拉長而上升
+def bench_srs(args):
+    rng = random.Random(0)
+    scheduler = Scheduler()
+    now = 0.0
+    start = time.perf_counter()
+    scheduler.add(((f"w{i}", f"m{i}", f"u{i // 200}") for i in range(args.cards)), now=now)
+    report("加入卡片", time.perf_counter() - start, args.cards)
+
+    reviews = 0
+    pick_time = 0.0
+    review_time = 0.0
+    for day in range(args.days):
+        now = day * DAY
+        t0 = time.perf_counter()
+        due = scheduler.due(args.per_day, until=now + DAY)
+        t1 = time.perf_counter()
+        for word, _, _ in due:
+            card = scheduler.get(word)
+            recall = 0.6 + 0.4 * min(card.interval, 30) / 30
+            scheduler.review(word, rng.random() < recall, now=now)
+        t2 = time.perf_counter()
+        pick_time += t1 - t0
+        review_time += t2 - t1
+        reviews += len(due)
+    print(f"模擬 {args.days} 天，共 {reviews:,} 次複習")
+    report("取出到期卡片", pick_time, reviews)
+    report("更新排程 (SM-2)", review_time, reviews)
+
+# 比較同一份題庫用巢狀 dict 和 CardStore 存放時常駐的記憶體
+def bench_store(args):
+    import pickle
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "flashcards.txt")
+        write_deck(path, args.cards)
+        blobs = {}
+        flashcards = parse_flashcards(path)
+        blobs["dict[str, dict[str, str]]"] = pickle.dumps(flashcards, protocol=pickle.HIGHEST_PROTOCOL)
+        blobs["CardStore"] = pickle.dumps(CardStore.from_flashcards(flashcards), protocol=pickle.HIGHEST_PROTOCOL)
+        del flashcards
+
+    print(f"題庫：{args.cards:,} 張卡片")
+    sizes = {}
+    for name, blob in blobs.items():
+        tracemalloc.start()
+        value = pickle.loads(blob)
+        sizes[name] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del value
+        print(f"{name:<28} {sizes[name] / 1e6:10.1f} MB")
+    print(f"{'節省倍數':<28} {sizes['dict[str, dict[str, str]]'] / sizes['CardStore']:10.1f}x")
+
+# worker 掛上共享檔 vs 各自載入題庫快取：耗時與 Python heap 配置量
+def bench_shared(args):
+    from card_store import load_card_store
+    from shared_deck import SharedDeck, publish
+    print(f"{'卡片數':>10} {'載入快取 ms':>12} {'載入 MB':>9} {'掛共享檔 ms':>12} {'掛上 MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_cards in (parse_size(s) for s in args.sizes.split(",")):
+            path = os.path.join(tmp, f"deck_{num_cards}.txt")
+            segment = os.path.join(tmp, f"deck_{num_cards}.shared")
+            write_deck(path, num_cards)
+            publish(load_card_store(path), segment)
+            row = []
+            for attach in (lambda: load_card_store(path), lambda: SharedDeck(segment)):
+                seconds = timed(attach, args.repeat)
+                tracemalloc.start()
+                value = attach()
+                used = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                del value
+                row += [seconds * 1000, used / 1e6]
+            print(f"{num_cards:>10,} {row[0]:>12.2f} {row[1]:>9.1f} {row[2]:>12.2f} {row[3]:>9.1f}")
+
+# 選擇題：干擾選項索引的建立 / 快取命中，以及每題產生選項的耗時
+def bench_choices(args):
+    from choices import load_choice_index, make_choices
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "flashcards.txt")
+        write_deck(path, args.cards)
+        deck = load_cached(path)
+        print(f"題庫：{args.cards:,} 張卡片")
+        report("建立索引", timed(lambda: load_choice_index(path), 1))
+        report("快取命中", timed(lambda: load_choice_index(path)))
+        index = load_choice_index(path)
+        rng = random.Random(0)
+        units = list(deck)
+        questions = []
+        for _ in range(args.questions):
+            unit = rng.choice(units)
+            questions.append((unit, rng.choice(list(deck[unit]))))
+
+        def run():
+            for unit, word in questions:
+                make_choices(word, deck[unit], index[unit], rng=rng)
+
+        report("產生 4 選 1 題目", timed(run), args.questions)
+
+# 測驗進度：每答一題的呼叫耗時（背景寫入 vs 每題同步 commit），以及重新啟動後恢復一個 session 的耗時
+def bench_sessions(args):
+    import sqlite3
+    from session_store import SessionStore
+    rng = random.Random(0)
+    questions = [(random_word(rng), random_meaning(rng)) for _ in range(args.questions)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        store = SessionStore(path)
+        ids = [f"s{i}" for i in range(args.sessions)]
+        start = time.perf_counter()
+        for i, session_id in enumerate(ids):
+            store.start(session_id, questions, f"單元{i % 50}", "單元測驗", owner=f"user{i % 1000}")
+        store.flush()
+        print(f"開著的 session：{args.sessions:,}（每個 {args.questions} 題）")
+        report("建立 session", time.perf_counter() - start)
+
+        answers = [(rng.choice(ids), idx) for idx in range(1, args.answers + 1)]
+        latencies = []
+        start = time.perf_counter()
+        for session_id, idx in answers:
+            t = time.perf_counter()
+            store.progress(session_id, idx % args.questions, idx // 2, [questions[0]])
+            latencies.append(time.perf_counter() - t)
+        store.flush()
+        total = time.perf_counter() - start
+        latencies.sort()
+        report("作答（背景寫入）p50", latencies[len(latencies) // 2])
+        report("作答（背景寫入）p99", latencies[int(len(latencies) * 0.99)])
+        report(f"{args.answers:,} 題寫完", total)
+
+        # 對照組：每題都同步 commit
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        latencies = []
+        for session_id, idx in answers[:min(len(answers), 2_000)]:
+            t = time.perf_counter()
+            with conn:
+                conn.execute("UPDATE sessions SET idx = ?, score = ?, wrongs = ?, updated = ? WHERE id = ?",
+                             (idx % args.questions, idx // 2, json.dumps([questions[0]], ensure_ascii=False),
+                              time.time(), session_id))
+            latencies.append(time.perf_counter() - t)
+        conn.close()
+        latencies.sort()
+        report("作答（同步 commit）p50", latencies[len(latencies) // 2])
+        report("作答（同步 commit）p99", latencies[int(len(latencies) * 0.99)])
+        store.close()
+
+        # 重新啟動：開資料庫 + 用網址上的 id 取回 + 列出某位使用者沒考完的
+        def recover():
+            restarted = SessionStore(path)
+            restarted.get(rng.choice(ids))
+            restarted.open_sessions(f"user{rng.randrange(1000)}")
+            restarted.close()
+
+        report("重新啟動後恢復一個 session", timed(recover))
+
+# 大量匯入：每秒處理列數與 tracemalloc 的峰值。
+# 峰值 ≈ 一個 CHUNK 的緩衝 + 最大的單元 + 去重用的雜湊（每張不重複的卡約 80 位元組，--dedup none 時沒有）
+def bench_import(args):
+    from importer import import_files
+    rng = random.Random(0)
+    print(f"{'來源列數':>10} {'輸出':>6} {'秒':>8} {'列/秒':>12} {'峰值 MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_rows in (parse_size(s) for s in args.sizes.split(",")):
+            source = os.path.join(tmp, f"words_{num_rows}.tsv")
+            words = [random_word(rng) + str(i) for i in range(num_rows)]
+            with open(source, "w", encoding="utf-8") as f:
+                f.write("word\tmeaning\tunit\n")
+                for i in range(num_rows):
+                    # 約 10% 是前面出現過的卡片；單元交錯出現
+                    word = words[rng.randrange(i)] if i and rng.random() < 0.1 else words[i]
+                    f.write(f"{word}\t{random_meaning(rng)}\t單元{rng.randrange(max(1, num_rows // 500))}\n")
+            del words
+            out = os.path.join(tmp, "flashcards.txt")
+            for cache in (False, True):
+                seconds = timed(lambda: import_files([source], out, cache=cache), 1)
+                # tracemalloc 會拖慢速度，峰值另外跑一次量
+                tracemalloc.start()
+                import_files([source], out, cache=cache)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{num_rows:>10,} {'+快取' if cache else '文字':>6} {seconds:>8.2f} {num_rows / seconds:>12,.0f} "
+                      f"{peak / 1e6:>9.1f}")
+                clear_cache(out)
+
+# 學習分析：從頭累加整份作答紀錄、從快照載入（儀表板開啟時的成本）、累加一天份的新紀錄
+def bench_analytics(args):
+    from analytics import Analytics
+    rng = random.Random(0)
+    now = time.time()
+    num_events = args.years * 365 * args.per_day
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "answers.log")
+        with open(log, "w", encoding="utf-8") as f:
+            for i in range(num_events):
+                when = now - (num_events - i) / args.per_day * 86400
+                f.write(f"{when:.0f}\t{int(rng.random() < 0.7)}\t單元{rng.randrange(args.units)}\t"
+                        f"w{rng.randrange(args.words)}\n")
+        print(f"作答紀錄：{args.years} 年、{num_events:,} 筆、{args.words:,} 個單字")
+
+        def cold():
+            engine = Analytics(log, os.path.join(tmp, "cold.npz"))
+            engine.sync()
+            engine.save()
+            os.remove(engine.snapshot_path)
+
+        report("從頭累加", timed(cold, 1), num_events)
+        engine = Analytics(log)
+        engine.sync()
+        engine.save()
+
+        def dashboard():
+            engine = Analytics(log)
+            engine.sync()
+            engine.daily(365)
+            engine.hardest()
+            engine.unit_mastery()
+
+        report("快照載入 + 查詢", timed(dashboard))
+        with open(log, "a", encoding="utf-8") as f:
+            for _ in range(args.per_day):
+                f.write(f"{now:.0f}\t1\t單元0\tw{rng.randrange(args.words)}\n")
+        report("累加一天的新紀錄", timed(lambda: Analytics(log).sync(), 1), args.per_day)
+
+# 錯題檔壓縮：累積幾年的錯題檔，索引從頭重建的成本在壓縮前後的差別
+def bench_compact(args):
+    from wrong_store import WrongAnswerStore, format_header, format_record
+    from compact import compact
+    rng = random.Random(0)
+    now = time.time()
+    cards = [(f"{random_word(rng)}{i}", random_meaning(rng)) for i in range(args.words)]
+    hard = rng.sample(cards, max(1, args.words // 10))
+    blocks = args.years * 365 * args.per_day
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "wrong_answers.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(blocks):
+                f.write(f"\n{format_header(None, now - (blocks - i) / args.per_day * 86400)}\n")
+                for _ in range(10):
+                    word, meaning = rng.choice(hard) if rng.random() < 0.8 else rng.choice(cards)
+                    f.write(format_record(meaning, random_word(rng), word))
+        size = os.path.getsize(path)
+        print(f"錯題檔：{args.years} 年、{blocks * 10:,} 筆、{size / 1e6:.1f} MB")
+
+        def rebuild():
+            db = os.path.join(tmp, "rebuild.db")
+            store = WrongAnswerStore(path, db)
+            store.sync()
+            store.close()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db + suffix):
+                    os.remove(db + suffix)
+
+        report("重建索引（壓縮前）", timed(rebuild, 1))
+        start = time.perf_counter()
+        result = compact(path, args.keep_days, now=now)
+        report("壓縮", time.perf_counter() - start)
+        archive_size = os.path.getsize(result["archive"])
+        print(f"錯題檔剩 {result['kept'] / 1e6:.1f} MB，封存 {archive_size / 1e6:.1f} MB（gzip），"
+              f"彙總 {result['words']:,} 個單字")
+        report("重建索引（壓縮後）", timed(rebuild, 3))
+
+# 啟動時間：python -m japanese_flashcard_pack 到選單出現（輸入 5 直接退出）、quiz 到第一題要多久，
+# 和什麼都不做的 python 比；再用 -X importtime 列出開選單時 import 最久的模組
+def bench_startup(args):
+    import compileall
+    import shutil
+    import subprocess
+    import sys
+    package = os.path.dirname(os.path.abspath(__file__))
+    root = os.path.dirname(package)
+    # 先編好 .pyc（PYTHONDONTWRITEBYTECODE 時不會自己寫），量的是平常的啟動
+    compileall.compile_dir(package, quiet=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(os.path.join(package, "flashcards.txt"), tmp)
+        entry = ["-m", "japanese_flashcard_pack", "--dir", tmp]
+        cases = [
+            ("python -c pass", ["-c", "pass"], ""),
+            ("選單", entry, "5\n"),
+            ("quiz 到第一題", entry + ["quiz", "1"], "1\nhome\n"),
+            ("一次 import 所有命令列模組", ["-c", "import sys; sys.path.insert(0, 'japanese_flashcard_pack'); "
+                                    "import colorama, unit_index, answers, wrong_store, journal, scheduler, "
+                                    "session_store, permutation, choices, search"], ""),
+            ("import streamlit（serve）", ["-c", "import streamlit"], ""),
+        ]
+
+        def run(argv, stdin):
+            return subprocess.run([sys.executable, *argv], input=stdin, cwd=root, capture_output=True,
+                                  text=True, check=True)
+
+        for name, argv, stdin in cases:
+            run(argv, stdin)  # 先跑一次，題庫快取建好
+            report(name, timed(lambda: run(argv, stdin), args.repeat))
+        stderr = run(["-X", "importtime", *entry], "5\n").stderr
+
+    # 只看最外層的 import（名稱前面只有一個空白）
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and name.startswith(" ") and not name.startswith("  "):
+            rows.append((int(cumulative), name.strip()))
+    print("\n開選單時 import 最久的模組（-X importtime，含子模組）：")
+    for cumulative, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {name:<32} {cumulative / 1000:8.2f} ms")
+
+# 量一個函式：最佳耗時、每秒處理量、tracemalloc 的峰值記憶體
+def measure(func, items, repeat):
+    seconds = timed(func, repeat)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": seconds, "per_sec": items / seconds if seconds else 0.0, "peak_kb": peak / 1024}
+
+def suite_cases(tmp, num_cards, log_lines):
+    import logic
+    import practice_jp
+    import practice_jp_new
+    from answers import normalize_string
+
+    deck = os.path.join(tmp, f"deck_{num_cards}.txt")
+    wrong = os.path.join(tmp, f"wrong_{num_cards}.txt")
+    write_deck(deck, num_cards)
+    cards = [item for unit in parse_flashcards(deck).values() for item in unit.items()]
+    write_wrong_log(wrong, cards, log_lines)
+    unit_name, unit = next(iter(logic.load_flashcards(deck).items()))
+    inputs = [random_word(random) for _ in range(10_000)]
+    out = os.path.join(tmp, "out.txt")
+    mistakes = [(m, "x", w) for w, m in cards[:20]]
+
+    def cold_priority():
+        for name in os.listdir(tmp):
+            if name.endswith((".db", ".db-wal", ".db-shm")):
+                os.remove(os.path.join(tmp, name))
+        from wrong_store import _stores
+        _stores.clear()
+        logic.get_priority_list(wrong)
+
+    def save_batch():
+        for i in range(50):
+            logic.save_incorrect(mistakes, path=out, session_id=f"bench-{time.perf_counter()}-{i}")
+        logic.get_journal(out).flush()
+
+    def cold_load():
+        clear_cache(deck)
+        logic.load_flashcards(deck)
+
+    return [
+        ("load_flashcards (cold)", cold_load, num_cards),
+        ("load_flashcards (warm)", lambda: logic.load_flashcards(deck), num_cards),
+        ("practice_jp.load_flashcards", lambda: practice_jp.load_flashcards(deck), num_cards),
+        ("practice_jp_new.load_flashcards", lambda: practice_jp_new.load_flashcards(deck), num_cards),
+        ("list_units (unit index)", lambda: logic.list_units(deck), num_cards),
+        ("load_unit (seek)", lambda: logic.load_unit(unit_name, deck), len(unit)),
+        ("get_priority_list (import)", cold_priority, log_lines),
+        ("get_priority_list (warm)", lambda: logic.get_priority_list(wrong), 1),
+        ("select_quiz_questions", lambda: logic.select_quiz_questions(unit, 10, wrong_file=wrong), len(unit)),
+        ("save_incorrect x50 + flush", save_batch, 50 * len(mistakes)),
+        ("normalize_string x10k", lambda: [normalize_string(s) for s in inputs], len(inputs)),
+    ]
+
+def bench_suite(args):
+    results = {}
+    for size in args.sizes.split(","):
+        num_cards = parse_size(size)
+        log_lines = min(parse_size(args.log_lines), num_cards * 10)
+        print(f"\n== {num_cards:,} 張卡片，錯題紀錄 {log_lines:,} 行 ==")
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, func, items in suite_cases(tmp, num_cards, log_lines):
+                result = measure(func, items, args.repeat)
+                key = f"{size}/{name}"
+                results[key] = result
+                print(f"{name:<34} {result['seconds'] * 1000:10.2f} ms {result['per_sec']:14,.0f}/s"
+                      f" {result['peak_kb']:10,.0f} KB")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n已儲存基準：{args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = []
+        for key, result in results.items():
+            before = baseline.get(key)
+            if before and result["seconds"] > before["seconds"] * (1 + args.tolerance):
+                regressions.append((key, before["seconds"], result["seconds"]))
+        if regressions:
+            print("\n效能退步：")
+            for key, before, after in regressions:
+                print(f"  {key}: {before * 1000:.2f} ms → {after * 1000:.2f} ms")
+            raise SystemExit(1)
+        print("\n和基準相比沒有退步。")
+
+def main():
+    parser = argparse.ArgumentParser(description="Flashcards 效能量測")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("cache", help="題庫快取：冷解析 / 命中 / 失效")
+    p.add_argument("--cards", type=int, default=100_000)
+    p.set_defaults(func=bench_cache)
+    p = sub.add_parser("srs", help="間隔重複排程模擬")
+    p.add_argument("--cards", type=int, default=100_000)
+    p.add_argument("--days", type=int, default=365)
+    p.add_argument("--per-day", type=int, default=500)
+    p.set_defaults(func=bench_srs)
+    p = sub.add_parser("store", help="巢狀 dict 與 CardStore 的記憶體比較")
+    p.add_argument("--cards", type=int, default=1_000_000)
+    p.set_defaults(func=bench_store)
+    p = sub.add_parser("shared", help="worker 掛上共享題庫的啟動時間與記憶體")
+    p.add_argument("--sizes", default="10k,100k,1m")
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_shared)
+    p = sub.add_parser("choices", help="選擇題干擾選項索引與出題耗時")
+    p.add_argument("--cards", type=int, default=100_000)
+    p.add_argument("--questions", type=int, default=10_000)
+    p.set_defaults(func=bench_choices)
+    p = sub.add_parser("sessions", help="測驗進度的寫入延遲與重新啟動後的恢復")
+    p.add_argument("--sessions", type=int, default=10_000)
+    p.add_argument("--questions", type=int, default=20)
+    p.add_argument("--answers", type=int, default=20_000)
+    p.set_defaults(func=bench_sessions)
+    p = sub.add_parser("import", help="大量匯入單字表的處理量與峰值記憶體")
+    p.add_argument("--sizes", default="50k,200k")
+    p.set_defaults(func=bench_import)
+    p = sub.add_parser("analytics", help="學習分析的累加與儀表板載入")
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--per-day", type=int, default=1000)
+    p.add_argument("--words", type=int, default=20_000)
+    p.add_argument("--units", type=int, default=100)
+    p.set_defaults(func=bench_analytics)
+    p = sub.add_parser("compact", help="錯題檔壓縮前後的索引重建成本")
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--per-day", type=int, default=20, help="每天的測驗次數（每次 10 筆錯題）")
+    p.add_argument("--words", type=int, default=20_000)
+    p.add_argument("--keep-days", type=float, default=30)
+    p.set_defaults(func=bench_compact)
+    p = sub.add_parser("startup", help="python -m japanese_flashcard_pack 的啟動時間")
+    p.add_argument("--repeat", type=int, default=10)
+    p.add_argument("--top", type=int, default=10)
+    p.set_defaults(func=bench_startup)
+    p = sub.add_parser("suite", help="主要函式的處理量、記憶體與基準比較")
+    p.add_argument("--sizes", default="1k,100k", help="題庫大小，逗號分隔，例如 1k,100k,1m")
+    p.add_argument("--log-lines", default="100k", help="錯題紀錄行數上限，例如 10m")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--baseline", help="和這個基準 JSON 比較，退步就以非 0 結束")
+    p.add_argument("--save-baseline", help="把這次結果存成基準 JSON")
+    p.add_argument("--tolerance", type=float, default=0.2, help="允許比基準慢的比例")
+    p.set_defaults(func=bench_suite)
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
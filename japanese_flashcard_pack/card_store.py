@@ -0,0 +1,145 @@
+from array import array
+from collections.abc import Sequence
+
+from deck_cache import load_cached, load_cached_value
+
+# 緊湊的欄式卡片儲存：所有單字與解釋去重後存進同一個字串表（一個長字串 + 位移陣列），
+# 卡片只是兩個整數（單字 id、解釋 id），單元是 members 陣列裡的一段範圍。
+# 同一張卡（單字與解釋都相同）出現在多個單元時只存一份，不會像合併 dict 那樣被蓋掉。
+
+class StringTable:
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, strings):
+        offsets = array("I", [0])
+        total = 0
+        for s in strings:
+            total += len(s)
+            offsets.append(total)
+        return cls("".join(strings), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+class CardStore:
+    def __init__(self, strings, card_word, card_meaning, card_unit, unit_names, unit_offsets, members,
+                 extra_units):
+        self.strings = strings
+        self.card_word = card_word
+        self.card_meaning = card_meaning
+        self.card_unit = card_unit
+        self.unit_names = unit_names
+        self.unit_offsets = unit_offsets
+        self.members = members
+        self._unit_pos = {name: i for i, name in enumerate(unit_names)}
+        # 卡片 → 單元：大部分卡片只屬於第一個出現的單元，多單元的另外記
+        self.extra_units = extra_units
+        self._word_ids = None
+
+    @classmethod
+    def from_flashcards(cls, flashcards):
+        string_ids = {}
+        strings = []
+        card_ids = {}
+        card_word = array("I")
+        card_meaning = array("I")
+        card_unit = array("I")
+        extra_units = {}
+        unit_offsets = array("I", [0])
+        members = array("I")
+
+        def intern(s):
+            sid = string_ids.get(s)
+            if sid is None:
+                sid = string_ids[s] = len(strings)
+                strings.append(s)
+            return sid
+
+        unit_names = tuple(flashcards.keys())
+        for unit_pos, unit in enumerate(unit_names):
+            for word, meaning in flashcards[unit].items():
+                key = (intern(word), intern(meaning))
+                cid = card_ids.get(key)
+                if cid is None:
+                    cid = card_ids[key] = len(card_word)
+                    card_word.append(key[0])
+                    card_meaning.append(key[1])
+                    card_unit.append(unit_pos)
+                elif card_unit[cid] != unit_pos:
+                    extra_units.setdefault(cid, []).append(unit_pos)
+                members.append(cid)
+            unit_offsets.append(len(members))
+        return cls(StringTable.build(strings), card_word, card_meaning, card_unit, unit_names, unit_offsets,
+                   members, {cid: tuple(units) for cid, units in extra_units.items()})
+
+    def __len__(self):
+        return len(self.card_word)
+
+    def word(self, cid):
+        return self.strings[self.card_word[cid]]
+
+    def meaning(self, cid):
+        return self.strings[self.card_meaning[cid]]
+
+    def card(self, cid):
+        return self.word(cid), self.meaning(cid)
+
+    @property
+    def units(self):
+        return self.unit_names
+
+    # 零複製的 memoryview
+    def unit_ids(self, unit):
+        pos = self._unit_pos[unit]
+        return memoryview(self.members)[self.unit_offsets[pos]:self.unit_offsets[pos + 1]]
+
+    def unit_size(self, unit):
+        pos = self._unit_pos[unit]
+        return self.unit_offsets[pos + 1] - self.unit_offsets[pos]
+
+    def units_of(self, cid):
+        positions = (self.card_unit[cid],) + self.extra_units.get(cid, ())
+        return tuple(self.unit_names[p] for p in positions)
+
+    # 單字 → 卡片 id；只在需要反查時建立
+    def ids_of(self, word):
+        if self._word_ids is None:
+            index = {}
+            for cid in range(len(self)):
+                index.setdefault(self.word(cid), []).append(cid)
+            self._word_ids = index
+        return self._word_ids.get(word, [])
+
+    def view(self, ids):
+        return CardView(self, ids)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_word_ids"] = None
+        return state
+
+# 一串卡片 id 的唯讀序列，取用時才組出 (單字, 解釋)，不複製成 tuple 清單
+class CardView(Sequence):
+    def __init__(self, store, ids):
+        self.store = store
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return CardView(self.store, self.ids[i])
+        return self.store.card(self.ids[i])
+
+def build_card_store(path):
+    return CardStore.from_flashcards(load_cached(path))
+
+def load_card_store(path):
+    return load_cached_value(path, build_card_store, tag="store")
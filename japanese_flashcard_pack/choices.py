@@ -0,0 +1,99 @@
+import bisect
+import random
+from collections import Counter
+from itertools import chain
+
+from deck_cache import load_cached_units
+from answers import normalize_string, to_hiragana, strip_marks, char_masks, bounded_levenshtein
+
+# 選擇題的干擾選項索引：每張卡預先找出同單元裡最像的 NEIGHBORS 張卡，
+# 和題庫一起快取，出題時只要從這幾個裡面挑，不用每題掃整個單元。
+# 「像」的順序：假名編輯距離近 → 字數接近 → 解釋長度接近。
+# 候選先用假名二字組（bigram）的倒排表找，共同二字組最多的 CANDIDATES 張才算編輯距離；
+# 不夠的用字數相近的卡補足。
+
+NEIGHBORS = 8
+CANDIDATES = 16
+MAX_DISTANCE = 4
+
+def _kana(word):
+    return to_hiragana(normalize_string(word))
+
+def _bigrams(kana):
+    padded = f"^{strip_marks(kana)}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+def build_neighbors(cards):
+    words = list(cards)
+    kana = [_kana(w) for w in words]
+    grams = [_bigrams(k) for k in kana]
+    masks = [char_masks(k) for k in kana]
+    postings = {}
+    for i, g in enumerate(grams):
+        for gram in g:
+            postings.setdefault(gram, []).append(i)
+    by_length = sorted(range(len(words)), key=lambda i: len(kana[i]))
+    lengths = [len(kana[i]) for i in by_length]
+
+    # 編輯距離是對稱的，(i, j) 算過就不用再算 (j, i)
+    distances = {}
+    result = {}
+    for i, word in enumerate(words):
+        meaning = cards[word]
+        shared = Counter(chain.from_iterable(postings[gram] for gram in grams[i]))
+        del shared[i]
+        scored = []
+        for j, _ in shared.most_common(CANDIDATES):
+            if cards[words[j]] == meaning:
+                continue
+            pair = (i, j) if i < j else (j, i)
+            distance = distances.get(pair)
+            if distance is None:
+                distance = distances[pair] = bounded_levenshtein(kana[i], kana[j], MAX_DISTANCE, masks[i])
+            scored.append((distance, abs(len(kana[i]) - len(kana[j])),
+                           abs(len(meaning) - len(cards[words[j]])), j))
+        scored.sort()
+        chosen = [j for *_, j in scored[:NEIGHBORS]]
+        # 不夠的話從字數最接近的卡片往兩邊找
+        if len(chosen) < NEIGHBORS:
+            taken = set(chosen)
+            taken.add(i)
+            pos = bisect.bisect_left(lengths, len(kana[i]))
+            left, right = pos - 1, pos
+            while len(chosen) < NEIGHBORS and (left >= 0 or right < len(by_length)):
+                if right < len(by_length) and (left < 0 or lengths[right] - len(kana[i]) <= len(kana[i]) - lengths[left]):
+                    j = by_length[right]
+                    right += 1
+                else:
+                    j = by_length[left]
+                    left -= 1
+                if j not in taken and cards[words[j]] != meaning:
+                    taken.add(j)
+                    chosen.append(j)
+        result[word] = tuple(words[j] for j in chosen)
+    return result
+
+# {單元: {單字: 干擾選項的單字}}
+def build_choice_index(flashcards):
+    return {unit: build_neighbors(cards) for unit, cards in flashcards.items()}
+
+def load_choice_index(path):
+    return load_cached_units(path, lambda unit, cards: build_neighbors(cards), tag="choices")
+
+# 回傳 (選項單字, 正確答案的位置)。從最像的幾個裡隨機挑，同一題每次的選項不會完全一樣；
+# 解釋相同的不會同時出現，反向（看假名選解釋）時也不會有兩個一樣的選項。
+def make_choices(word, cards, neighbors, n=4, rng=None):
+    rng = rng or random
+    meaning = cards[word]
+    pool = [w for w in neighbors.get(word, ()) if w in cards][:2 * (n - 1)]
+    rng.shuffle(pool)
+    options = [word]
+    seen = {meaning}
+    for w in pool:
+        if len(options) >= n:
+            break
+        if cards[w] not in seen:
+            seen.add(cards[w])
+            options.append(w)
+    rng.shuffle(options)
+    return options, options.index(word)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# 壓縮錯題檔：python compact.py wrong_answers.txt --keep-days 30
+import argparse
+import gzip
+import os
+import re
+import sys
+import time
+
+from journal import file_replaced
+from wrong_store import (TIME_FORMAT, format_marker, read_generation, fold_records, load_summary, write_summary,
+                         archive_path)
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl：壓縮時不能有其他程式在寫錯題檔
+    fcntl = None
+
+# 錯題檔每次測驗都 append 一個區塊，永遠不會變小。這裡把 keep_days 天以前的區塊：
+#   1. 原封不動 gzip 到 wrong_answers.archive/第幾段.txt.gz；
+#   2. 累加進 wrong_answers.summary.json（每個單字一筆：解釋、單元、次數、最後答錯時間）；
+#   3. 從錯題檔拿掉，開頭換成「已彙總至第 N 段」的標記。
+# 讀的一方（wrong_store）看到標記就從彙總加上錯題檔重建索引，結果和讀完整份歷史相同。
+# 整個過程拿著錯題檔的檔案鎖，其他程式的 append 會等到新檔換上後寫進新檔。
+# 順序是先封存、再換錯題檔、最後寫彙總；中途中斷時彙總會落後，load_summary 會從封存補回來。
+
+STAMP_RE = re.compile(r"^=== 測驗紀錄 (\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)".encode("utf-8"), re.M)
+
+# 保留區塊的起點：第一個時間在 cutoff 之後的區塊標題；沒有時間的舊區塊一律算舊的。
+# 時間格式照字典順序就是時間順序，直接比字串，不用每個標題都 strptime
+def split_point(data, start, cutoff):
+    cutoff = time.strftime(TIME_FORMAT, time.localtime(cutoff)).encode("ascii")
+    for m in STAMP_RE.finditer(data, start):
+        if m.group(1) >= cutoff:
+            return m.start()
+    # 全部都舊：寫到一半的最後一行留在錯題檔
+    return max(start, data.rfind(b"\n") + 1)
+
+def _write_file(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+# 回傳這次壓縮的統計；沒有可以壓縮的區塊時為 None
+def compact(text_path, keep_days=30, min_bytes=0, now=None):
+    cutoff = (time.time() if now is None else now) - keep_days * 86400
+    while True:
+        with open(text_path, "rb") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                if fcntl and file_replaced(text_path, f):
+                    continue
+                generation = read_generation(f)
+                f.seek(0)
+                data = f.read()
+                if len(data) < min_bytes:
+                    return None
+                start = data.find(b"\n") + 1 if generation else 0
+                cut = split_point(data, start, cutoff)
+                # 第一個區塊前面只有空行時也不算有舊紀錄
+                if not data[start:cut].strip():
+                    return None
+                old = data[start:cut]
+                generation += 1
+                archive = archive_path(text_path, generation)
+                os.makedirs(os.path.dirname(archive), exist_ok=True)
+                _write_file(archive, gzip.compress(old, compresslevel=6))
+                summary = load_summary(text_path, generation - 1)
+                fold_records(summary, old.decode("utf-8", errors="ignore").splitlines())
+                _write_file(text_path, f"{format_marker(generation)}\n".encode("utf-8") + data[cut:])
+                write_summary(text_path, generation, summary)
+                return {"generation": generation, "archived": len(old), "kept": len(data) - cut,
+                        "words": len(summary), "archive": archive}
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def main():
+    parser = argparse.ArgumentParser(description="把錯題檔的舊紀錄彙總並壓縮封存")
+    parser.add_argument("path", nargs="?", default="wrong_answers.txt", help="錯題檔")
+    parser.add_argument("--keep-days", type=float, default=30, help="保留最近幾天的原始紀錄")
+    parser.add_argument("--min-mb", type=float, default=0, help="錯題檔小於這個大小就不壓縮（給排程用）")
+    args = parser.parse_args()
+    try:
+        result = compact(args.path, args.keep_days, int(args.min_mb * 1_000_000))
+    except OSError as e:
+        print(f"壓縮失敗：{e}")
+        sys.exit(1)
+    if result is None:
+        print("沒有需要壓縮的紀錄")
+        return
+    print(f"第 {result['generation']} 段：封存 {result['archived'] / 1e6:,.1f} MB → {result['archive']}，"
+          f"錯題檔保留 {result['kept'] / 1e6:,.1f} MB，彙總 {result['words']:,} 個單字")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import datetime
+
+import numpy as np
+import streamlit as st
+
+from logic import get_analytics
+
+# 學習分析頁：只讀 analytics.py 預先累加好的陣列，載入時只補上次之後新增的作答紀錄
+
+TREND_WINDOW = 7
+RANGES = {"最近 30 天": 30, "最近 90 天": 90, "最近一年": 365, "全部": None}
+
+def _date(day):
+    return (datetime.date(1970, 1, 1) + datetime.timedelta(days=int(day))).isoformat()
+
+# 每日答對率與 TREND_WINDOW 天移動平均（沒作答的日子不算進分母）
+def trend_rows(engine, days):
+    day_index, attempts, correct = engine.daily(days)
+    if not len(day_index):
+        return []
+    kernel = np.ones(TREND_WINDOW)
+    rolling_attempts = np.convolve(attempts, kernel)[:len(attempts)]
+    rolling_correct = np.convolve(correct, kernel)[:len(correct)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = np.where(attempts > 0, correct / attempts, np.nan)
+        rolling = np.where(rolling_attempts > 0, rolling_correct / rolling_attempts, np.nan)
+    return [{"日期": _date(day), "答對率": daily[i], f"{TREND_WINDOW} 日平均": rolling[i], "作答數": int(attempts[i])}
+            for i, day in enumerate(day_index)]
+
+def dashboard_page():
+    st.title("📊 學習分析")
+    engine = get_analytics()
+    attempts, correct, words = engine.totals()
+    if not attempts:
+        st.info("還沒有作答紀錄，先去做幾次測驗吧。")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("累計作答", f"{attempts:,}")
+    col2.metric("整體答對率", f"{correct / attempts:.1%}")
+    col3.metric("練過的單字", f"{words:,}")
+
+    st.subheader("答對率趨勢")
+    span = st.radio("範圍", list(RANGES), horizontal=True, label_visibility="collapsed")
+    rows = trend_rows(engine, RANGES[span])
+    st.line_chart(rows, x="日期", y=["答對率", f"{TREND_WINDOW} 日平均"])
+    st.bar_chart(rows, x="日期", y="作答數", height=160)
+
+    st.subheader("最常答錯的單字")
+    min_attempts = st.slider("至少作答次數", 1, 20, 3)
+    hardest = engine.hardest(limit=30, min_attempts=min_attempts)
+    if hardest:
+        st.dataframe([{"單字": word, "單元": unit or "（未分單元）", "作答數": count, "答對率": f"{accuracy:.0%}"}
+                      for word, unit, count, accuracy in hardest], hide_index=True)
+    else:
+        st.caption("沒有符合條件的單字")
+
+    st.subheader("各單元熟練度")
+    st.caption("作答至少 2 次、答對率 80% 以上的單字算熟練；單字算在最後一次作答的單元")
+    st.dataframe([{"單元": unit or "（未分單元）", "作答數": count, "答對率": f"{accuracy:.0%}", "練過": practiced,
+                   "熟練": mastered, "熟練比例": mastered / practiced if practiced else 0.0}
+                  for unit, count, accuracy, practiced, mastered in engine.unit_mastery()],
+                 hide_index=True,
+                 column_config={"熟練比例": st.column_config.ProgressColumn(min_value=0.0, max_value=1.0,
+                                                                         format="percent")})
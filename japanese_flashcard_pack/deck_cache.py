@@ -0,0 +1,299 @@
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import shutil
+import tempfile
+from collections.abc import Mapping
+
+# 快取格式版本，改變快取內容結構時要加一
+CACHE_VERSION = 2
+
+def parse_flashcards(path):
+    flashcards = {}
+    current_unit = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("[") and line.endswith("]"):
+                current_unit = line[1:-1]
+                flashcards[current_unit] = {}
+            elif ": " in line and current_unit:
+                word, meaning = line.split(": ", 1)
+                flashcards[current_unit][word] = meaning
+    return flashcards
+
+# 每個 [單元] 內容的位元組範圍 {單元: (開始, 結束)}。
+# 同名單元以最後一段為準、位置維持第一次出現的地方，和 parse_flashcards 一致
+def unit_ranges(f):
+    ranges = {}
+    current = None
+    offset = 0
+    for raw in f:
+        # 先用位元組粗篩，只有可能是標題的行才解碼
+        if b"[" in raw and b"]" in raw:
+            line = raw.decode("utf-8", errors="ignore").strip()
+            if line.startswith("[") and line.endswith("]"):
+                if current is not None:
+                    ranges[current[0]] = (current[1], offset)
+                current = (line[1:-1], offset + len(raw))
+        offset += len(raw)
+    if current is not None:
+        ranges[current[0]] = (current[1], offset)
+    return ranges
+
+def parse_unit(data):
+    cards = {}
+    for line in io.StringIO(data.decode("utf-8"), newline=None):
+        line = line.strip()
+        if ": " in line:
+            word, meaning = line.split(": ", 1)
+            cards[word] = meaning
+    return cards
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def segment_digest(segment):
+    return hashlib.blake2b(segment, digest_size=16).hexdigest()
+
+def cache_path(path, tag):
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.{tag}.cache")
+
+# 快取檔 = pickle 的標頭（來源簽章與各區段位移）+ 各區段各自 pickle 的內容。
+# 讀取時只解標頭，區段等到用到時才從 mmap 解開，所以命中快取幾乎不受題庫大小影響。
+class LazyDeck(Mapping):
+    def __init__(self, buf, base, sections):
+        self._buf = buf
+        self._base = base
+        self._sections = sections
+        self._loaded = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._loaded[key]
+        except KeyError:
+            offset, length = self._sections[key]
+        start = self._base + offset
+        value = pickle.loads(self._buf[start:start + length])
+        self._loaded[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._sections)
+
+    def __len__(self):
+        return len(self._sections)
+
+    def __contains__(self, key):
+        return key in self._sections
+
+    # 區段原本的 pickle 位元組，沿用到新快取時不用解開再重新 pickle
+    def raw(self, key):
+        offset, length = self._sections[key]
+        start = self._base + offset
+        return self._buf[start:start + length]
+
+# 重建快取時沿用舊快取裡內容沒變的區段
+class _Reuse:
+    def __init__(self, old, key):
+        self.old = old
+        self.key = key
+
+def _read_header(cpath):
+    try:
+        with open(cpath, "rb") as f:
+            header = pickle.load(f)
+            if not isinstance(header, dict) or header.get("version") != CACHE_VERSION:
+                return None, None
+            base = f.tell()
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None, None
+    return header, LazyDeck(buf, base, header["sections"])
+
+def _replace(cpath, write):
+    tmp = f"{cpath}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, cpath)
+    except OSError:
+        # 唯讀目錄之類的情況就不快取，下次重新解析
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _write_cache(cpath, signature, sections):
+    blobs = []
+    index = {}
+    offset = 0
+    for key, value in sections.items():
+        if isinstance(value, _Reuse):
+            blob = value.old.raw(key)
+        else:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        index[key] = (offset, len(blob))
+        offset += len(blob)
+        blobs.append(blob)
+    header = dict(signature, version=CACHE_VERSION, sections=index)
+
+    def write(f):
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.writelines(blobs)
+    _replace(cpath, write)
+
+def _touch_cache(cpath, header):
+    # 內容沒變只是 mtime 不同：換掉標頭，區段原封不動複製過去
+    def write(f):
+        with open(cpath, "rb") as src:
+            pickle.load(src)
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            for chunk in iter(lambda: src.read(1 << 20), b""):
+                f.write(chunk)
+    _replace(cpath, write)
+
+# 回傳 (內容, 簽章)。source 是題庫某一版的簽章（load_deck 回傳的）：
+# 指定時快取要對上那一版，不再重新 stat 和計算雜湊，建出來的東西和那一版題庫一致
+def _load(path, build, tag, source=None):
+    if source is None:
+        st = os.stat(path)
+        size, mtime, digest = st.st_size, st.st_mtime_ns, None
+    else:
+        size, mtime, digest = source["size"], source["mtime"], source["digest"]
+    cpath = cache_path(path, tag)
+    header, deck = _read_header(cpath)
+    if header is not None:
+        if header["size"] == size and header["mtime"] == mtime:
+            return deck, header
+        digest = digest or file_digest(path)
+        if header["size"] == size and header["digest"] == digest:
+            header = dict(header, mtime=mtime)
+            _touch_cache(cpath, header)
+            return deck, header
+    else:
+        digest = digest or file_digest(path)
+
+    data, extra = build(path, header, deck)
+    signature = dict(extra, size=size, mtime=mtime, digest=digest)
+    _write_cache(cpath, signature, data)
+    if not any(isinstance(value, _Reuse) for value in data.values()):
+        return data, signature
+    # 有沿用的區段時直接回傳新快取，沿用的部分等用到才解開
+    new_header, new_deck = _read_header(cpath)
+    if new_header is not None and new_header["digest"] == digest:
+        return new_deck, new_header
+    return {key: value.old[key] if isinstance(value, _Reuse) else value for key, value in data.items()}, signature
+
+# 題庫本身：逐單元算內容雜湊（記在標頭），變更時只重新解析雜湊不同的單元
+def _build_deck(path, header, old):
+    with open(path, "rb") as f:
+        data = f.read()
+    previous = (header or {}).get("units", {})
+    digests = {}
+    sections = {}
+    for unit, (start, end) in unit_ranges(io.BytesIO(data)).items():
+        segment = data[start:end]
+        digests[unit] = segment_digest(segment)
+        if old is not None and unit in old and previous.get(unit) == digests[unit]:
+            sections[unit] = _Reuse(old, unit)
+        else:
+            # 和 parse_flashcards 一樣，名稱是空字串的單元不收卡片
+            sections[unit] = parse_unit(segment) if unit else {}
+    return sections, {"units": digests}
+
+# 回傳 build(path) 的結果，來源檔沒變時直接讀編譯好的快取。
+# build 必須回傳 dict，每個 key（題庫就是每個單元）存成一個可單獨載入的區段；
+# 不指定 build 時就是題庫本身，內容變更時只重新解析有變的單元。
+# 先比對大小與 mtime；不同時才算內容雜湊，只是被 touch 過就更新簽章、不重建。
+def load_cached(path, build=None, tag="deck"):
+    if build is None:
+        return load_deck(path)[0]
+    return _load(path, lambda p, header, old: (build(p), {}), tag)[0]
+
+# (題庫, 簽章)：簽章是這一版題庫的大小、mtime、內容雜湊和各單元的內容雜湊（"units"），
+# 兩者來自同一次讀取。要從題庫衍生其他索引時把它傳給 load_cached_units，才不會對到不同版本
+def load_deck(path):
+    return _load(path, _build_deck, "deck")
+
+# 一邊產生題庫一邊寫出它的快取（匯入工具用），不必先把整份題庫放進記憶體：
+# 每個單元 pickle 後先寫進暫存檔，題庫檔寫完、知道簽章後再接在標頭後面。
+# 單元的內容雜湊必須是題庫檔裡 [單元] 標題之後到下一個標題之前的位元組，和 _build_deck 一致。
+class CacheWriter:
+    def __init__(self):
+        self._spill = tempfile.TemporaryFile()
+        self._sections = {}
+        self._digests = {}
+
+    def add(self, unit, cards, segment_digest):
+        blob = pickle.dumps(cards, protocol=pickle.HIGHEST_PROTOCOL)
+        self._sections[unit] = (self._spill.tell(), len(blob))
+        self._digests[unit] = segment_digest
+        self._spill.write(blob)
+
+    # path 已經是最後的題庫檔；digest 為整個檔案的 file_digest
+    def commit(self, path, digest):
+        st = os.stat(path)
+        header = dict(units=self._digests, size=st.st_size, mtime=st.st_mtime_ns, digest=digest,
+                      version=CACHE_VERSION, sections=self._sections)
+
+        def write(f):
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._spill.seek(0)
+            shutil.copyfileobj(self._spill, f, 1 << 20)
+        _replace(cache_path(path, "deck"), write)
+
+    def close(self):
+        self._spill.close()
+
+# 題庫各單元的內容雜湊 {單元: 雜湊}
+def unit_digests(path):
+    return load_deck(path)[1].get("units", {})
+
+# {單元: build_unit(單元, 卡片)}，每個單元一個區段。題庫變更時只重建內容有變的單元，
+# 其他單元直接沿用舊快取裡的區段（各單元的內容雜湊記在標頭）。
+# deck 是 load_deck 的結果；不指定時自己載入一次。結果一定是從這一版題庫建出來的
+def load_cached_units(path, build_unit, tag, deck=None):
+    flashcards, source = deck or load_deck(path)
+    digests = source.get("units", {})
+
+    def build(p, header, old):
+        previous = (header or {}).get("units", {})
+        data = {}
+        for unit in flashcards:
+            digest = digests.get(unit)
+            if digest is not None and old is not None and unit in old and previous.get(unit) == digest:
+                data[unit] = _Reuse(old, unit)
+            else:
+                data[unit] = build_unit(unit, flashcards[unit])
+        return data, {"units": digests}
+    return _load(path, build, tag, source)[0]
+
+# 從整份題庫衍生、存成單一區段的結果（例如跨單元的查詢表）。
+# build(舊結果, 舊的各單元雜湊, 新的各單元雜湊)：有舊快取時可以只更新雜湊不同的單元，沒有時舊結果是 None。
+# deck 同 load_cached_units
+def load_cached_merged(path, build, tag, deck=None):
+    flashcards, source = deck or load_deck(path)
+    digests = source.get("units", {})
+
+    def build_all(p, header, old):
+        if old is not None and "value" in old:
+            value = build(old["value"], (header or {}).get("units", {}), digests)
+        else:
+            value = build(None, {}, digests)
+        return {"value": value}, {"units": digests}
+    return _load(path, build_all, tag, source)[0]["value"]
+
+# 任意可 pickle 的結果，整包存成單一區段
+def load_cached_value(path, build, tag):
+    return load_cached(path, lambda p: {"value": build(p)}, tag)["value"]
+
+def clear_cache(path, tag="deck"):
+    cpath = cache_path(path, tag)
+    if os.path.exists(cpath):
+        os.remove(cpath)
@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+from collections import deque
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from deck_cache import load_deck
+from answers import build_answer_forms, load_answer_index
+from card_store import CardStore, load_card_store
+from shared_deck import SharedDeck
+from choices import build_neighbors
+from search import load_search_index, search
+
+log = logging.getLogger(__name__)
+
+# 某一版題庫的唯讀快照，所有 session 共用同一份。
+# 單元的卡片是 CardStore 上的 id 範圍，取用時才組出 (單字, 解釋)，不另外複製。
+# 熱更新後有變的單元各自用一個小 CardStore（overrides），其他單元沿用原本的 store。
+class DeckSnapshot:
+    # deck：這一版的 (卡片, 簽章)（deck_cache.load_deck），之後衍生的索引都從它建，不重新讀檔
+    def __init__(self, flashcards, answers, store, version, path=None, overrides=None, deck=None):
+        self._flashcards = flashcards
+        self._answers = answers
+        self.store = store
+        self.version = version
+        self.units = tuple(flashcards)
+        self._path = path
+        self._overrides = overrides or {}
+        self._deck = deck
+        self._choices = LazyUnits(self.units, lambda unit: build_neighbors(self._flashcards[unit]))
+        self._search = None
+
+    def __contains__(self, unit):
+        return unit in self._flashcards
+
+    def store_for(self, unit):
+        return self._overrides.get(unit, self.store)
+
+    def cards(self, unit):
+        store = self.store_for(unit)
+        return store.view(store.unit_ids(unit))
+
+    def lookup(self, unit):
+        return MappingProxyType(self._flashcards[unit])
+
+    # 單字 → 載入時預先算好的答案形式（answers.answer_forms）
+    def answers(self, unit):
+        return MappingProxyType(self._answers[unit])
+
+    # 單字 → 選擇題的干擾選項（choices.build_neighbors）；第一次出這個單元的選擇題時才從快照的卡片算，
+    # 成本只和這個單元的大小有關，也一定和快照是同一版
+    def choices(self, unit):
+        return MappingProxyType(self._choices[unit])
+
+    # [(單元, 單字, 解釋)]，索引第一次搜尋時才載入
+    def search(self, query):
+        if self._search is None:
+            self._search = load_search_index(self._path, self._deck)
+        return search(self._search, query)
+
+# {單元: build(單元)}，用到哪個單元才算。共享模式下 worker 的查詢表從共享檔衍生，
+# 啟動時不必解析或載入整份題庫
+class LazyUnits(Mapping):
+    def __init__(self, units, build):
+        self._units = dict.fromkeys(units)
+        self._build = build
+        self._built = {}
+
+    def __getitem__(self, unit):
+        try:
+            return self._built[unit]
+        except KeyError:
+            if unit not in self._units:
+                raise
+        value = self._built[unit] = self._build(unit)
+        return value
+
+    def __iter__(self):
+        return iter(self._units)
+
+    def __len__(self):
+        return len(self._units)
+
+    def __contains__(self, unit):
+        return unit in self._units
+
+# 共享檔上的 (卡片, 答案形式) 查詢表
+def shared_lookups(store):
+    flashcards = LazyUnits(store.units, lambda unit: dict(store.view(store.unit_ids(unit))))
+    answers = LazyUnits(store.units, lambda unit: build_answer_forms(unit, flashcards[unit]))
+    return flashcards, answers
+
+# 一個單元兩個版本之間的差異：{"added": {單字: 解釋}, "changed": {單字: 新解釋}, "removed": {單字}}
+def diff_cards(old, new):
+    return {
+        "added": {w: m for w, m in new.items() if w not in old},
+        "changed": {w: m for w, m in new.items() if w in old and old[w] != m},
+        "removed": {w for w in old if w not in new},
+    }
+
+# 每個 server process 只載入一次題庫，背景執行緒定期檢查 flashcards.txt。
+# 有變更時只重新解析內容雜湊不同的單元（deck_cache），算出這些單元的差異，
+# 換上新版本的快照並把差異記進 changes，正在進行的 session 用 changes_since 對齊自己的題目。
+# 指定 shared_path 時卡片改由 shared_deck 發佈的共享檔 mmap 取得，監看的也是共享檔；
+# 查詢表也從共享檔按單元衍生，worker 不載入題庫快取。
+class DeckService:
+    def __init__(self, path, poll_interval=2.0, shared_path=None, history=100):
+        self.path = path
+        self.shared_path = shared_path
+        self.poll_interval = poll_interval
+        self._stat = None
+        self._version = 0
+        self._digests = {}
+        # (版本, {單元: 差異})，太舊的版本丟掉
+        self.changes = deque(maxlen=history)
+        self._stop = threading.Event()
+        self.snapshot = self._load()
+        self._thread = threading.Thread(target=self._watch, name="deck-reloader", daemon=True)
+        self._thread.start()
+
+    def _signature(self):
+        st = os.stat(self.shared_path or self.path)
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _load(self):
+        self._stat = self._signature()
+        self._version += 1
+        if self.shared_path:
+            store = SharedDeck(self.shared_path)
+            flashcards, answers = shared_lookups(store)
+            self._digests = store.unit_digests
+            return DeckSnapshot(flashcards, answers, store, self._version, self.path)
+        store = load_card_store(self.path)
+        deck = load_deck(self.path)
+        flashcards, signature = deck
+        self._digests = signature.get("units", {})
+        return DeckSnapshot(flashcards, load_answer_index(self.path, deck), store, self._version, self.path, deck=deck)
+
+    # 只處理內容雜湊變了的單元，成本和修改的範圍成正比
+    def _reload(self):
+        old = self.snapshot
+        stat = self._signature()
+        if self.shared_path:
+            store = SharedDeck(self.shared_path)
+            flashcards, answers = shared_lookups(store)
+            digests = store.unit_digests
+            deck = None
+        else:
+            # 卡片、單元雜湊和答案索引都來自同一次讀取，中途被編輯也不會對到不同版本
+            deck = load_deck(self.path)
+            flashcards, signature = deck
+            digests = signature.get("units", {})
+        if digests:
+            changed = [unit for unit in {**self._digests, **digests}
+                       if digests.get(unit) != self._digests.get(unit)]
+        else:
+            # 沒有單元雜湊（空題庫或舊版共享檔）時逐單元比對
+            changed = list(dict.fromkeys([*old.units, *flashcards]))
+        diffs = {unit: diff_cards(old.lookup(unit) if unit in old else {}, flashcards.get(unit, {}))
+                 for unit in changed}
+        if self.shared_path:
+            overrides = {}
+        else:
+            store = old.store
+            overrides = {unit: s for unit, s in old._overrides.items() if unit not in diffs}
+            for unit in changed:
+                if unit in flashcards:
+                    overrides[unit] = CardStore.from_flashcards({unit: flashcards[unit]})
+            answers = load_answer_index(self.path, deck)
+        version = self._version + 1
+        snapshot = DeckSnapshot(flashcards, answers, store, version, self.path, overrides, deck)
+        # 新快照建好才更新狀態，中途出錯的話下次輪詢整個重來
+        self._stat, self._digests, self._version = stat, digests, version
+        self.changes.append((version, diffs))
+        return snapshot
+
+    # 從 version 之後的所有差異 [(單元, 差異)]，依版本順序；太舊查不到時回傳 None
+    def changes_since(self, version):
+        if version >= self._version:
+            return []
+        if not self.changes or self.changes[0][0] > version + 1:
+            return None
+        return [(unit, diff) for v, diffs in list(self.changes) if v > version for unit, diff in diffs.items()]
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self._signature() != self._stat:
+                    self.snapshot = self._reload()
+            except (OSError, ValueError):
+                # 檔案編輯到一半或暫時不存在，下次再試，繼續用舊快照
+                continue
+            except Exception:
+                # 其他錯誤也只記下來，不能讓熱更新就此停掉
+                log.exception("重新載入題庫失敗：%s", self.path)
+
+    def stop(self):
+        self._stop.set()
@@ -1,29 +1,25 @@
 import streamlit as st
-import random
 import os
+from card_store import load_card_store
+from permutation import LazySample
+
+# 整個 server process 共用一份 CardStore，rerun 時不再重新載入；
+# 以 mtime 當 key，題庫被編輯後下一次 rerun 才換新的一份
+@st.cache_resource(max_entries=1)
+def cached_card_store(filepath, mtime):
+    return load_card_store(filepath)
 
 def load_flashcards(file="flashcards.txt"):
-    flashcards = {}
-    current_unit = None
     # 確保使用相對於本檔案的路徑
     filepath = os.path.join(os.path.dirname(__file__), file)
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith("[") and line.endswith("]"):
-                current_unit = line[1:-1]
-                flashcards[current_unit] = {}
-            elif ": " in line and current_unit:
-                key, value = line.split(": ", 1)
-                flashcards[current_unit][key] = value
-    return flashcards
+    return cached_card_store(filepath, os.stat(filepath).st_mtime_ns)
 
+# cards 是 CardStore：每張卡只是一個 id，出現在多個單元的同一個單字也不會被蓋掉
 def run_quiz(cards):
     st.header("Flashcards 無範圍測驗系統")
     if "idx" not in st.session_state:
         st.session_state.idx = 0
-        st.session_state.order = list(cards.items())
-        random.shuffle(st.session_state.order)
+        st.session_state.order = LazySample(range(len(cards)), len(cards))
         st.session_state.score = 0
         st.session_state.total = len(st.session_state.order)
         st.session_state.history = []
@@ -31,7 +27,7 @@ def run_quiz(cards):
         st.session_state.last_result = ""
 
     if st.session_state.idx < st.session_state.total:
-        question, answer = st.session_state.order[st.session_state.idx]
+        question, answer = cards.card(st.session_state.order[st.session_state.idx])
         st.write(f"解釋：**{answer}**")
         st.session_state.user_input = st.text_input(
             "請輸入對應假名", value=st.session_state.user_input, key="input"
@@ -66,11 +62,7 @@ def run_quiz(cards):
 
 def main():
     st.set_page_config(page_title="Flashcards 無範圍測驗", layout="centered")
-    flashcards = load_flashcards()
-    all_cards = {}
-    for unit in flashcards:
-        all_cards.update(flashcards[unit])
-    run_quiz(all_cards)
+    run_quiz(load_flashcards())
 
 if __name__ == "__main__":
     main()
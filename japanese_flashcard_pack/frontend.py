@@ -1,68 +1,278 @@
 import streamlit as st
-import random
-from logic import load_flashcards, normalize_string, save_incorrect
+import os
+import uuid
+from logic import (deck_path, save_incorrect, get_scheduler, get_session_store, record_answer, select_due_questions,
+                   select_quiz_ids, DEFAULT_WEIGHTS)
+from answers import check_answer, answer_forms, answer_trie
+from choices import make_choices
+from live_feedback import live_feedback
+from deck_service import DeckService
+from permutation import LazySample
+from instrument import stage, enabled, summary
+
+# 整個 server process 共用一份題庫，不再每次 rerun 重新解析；
+# 多個 worker 時設定 FLASHCARD_SHARED_DECK，改掛 shared_deck.py 發佈的共享檔
+@st.cache_resource
+def get_deck_service():
+    return DeckService(deck_path(), shared_path=os.environ.get("FLASHCARD_SHARED_DECK"))
+
+# 測驗進度存在 sessions.db，網址帶著 ?session=… 重新整理或重新部署後可以接著考；
+# 很久沒動的 session 在 server 啟動時清掉
+@st.cache_resource
+def get_sessions():
+    sessions = get_session_store()
+    sessions.prune()
+    return sessions
+
+# FLASHCARD_PROFILE=1 時在側邊欄顯示各階段的延遲與記憶體
+def show_profile_panel():
+    stats = summary()
+    with st.sidebar.expander("🛠 效能量測", expanded=True):
+        rows = [{"stage": name, "次數": s["count"], "p50 ms": round(s["p50"] * 1000, 2),
+                 "p95 ms": round(s["p95"] * 1000, 2), "p99 ms": round(s["p99"] * 1000, 2),
+                 "配置 KB": round(s["alloc_kb"], 1)} for name, s in sorted(stats.items())]
+        st.dataframe(rows, hide_index=True)
+        st.caption("profile.json / profile.prom 每 5 秒更新一次")
+
+# 單元測驗的出題權重，改動後下一次「開始測驗」生效
+def weight_panel():
+    with st.sidebar.expander("🎯 出題權重"):
+        prioritize = st.checkbox("依錯題紀錄加權", value=True)
+        weights = {
+            "base": st.slider("沒答錯過的單字", 0.1, 5.0, DEFAULT_WEIGHTS["base"], 0.1),
+            "miss": st.slider("每答錯一次", 0.0, 10.0, DEFAULT_WEIGHTS["miss"], 0.5),
+            "recency": st.slider("最近答錯", 0.0, 20.0, DEFAULT_WEIGHTS["recency"], 0.5),
+            "half_life": st.slider("最近答錯的半衰期（天）", 1.0, 60.0, DEFAULT_WEIGHTS["half_life"], 1.0),
+            "same_unit": st.slider("在本單元答錯的倍數", 1.0, 5.0, DEFAULT_WEIGHTS["same_unit"], 0.1),
+        }
+    return prioritize, weights
+
+# 側邊欄搜尋：找某個單字或中文解釋在哪個單元
+def search_panel(deck):
+    query = st.sidebar.text_input("🔍 搜尋單字或解釋")
+    if not query:
+        return
+    with stage("frontend.search"):
+        results = deck.search(query)
+    if results:
+        st.sidebar.dataframe([{"單元": unit, "單字": word, "解釋": meaning} for unit, word, meaning in results],
+                             hide_index=True)
+    else:
+        st.sidebar.caption("找不到符合的單字")
+
+# 題庫熱更新後，把進行中測驗還沒出的題目對齊新版本：刪掉的卡片拿掉、改過的解釋換新；
+# 出整個單元時，本單元新增的卡片接在後面。已經作答過的題目維持原樣。
+def reconcile_session(service, deck):
+    version = st.session_state.get("deck_version", deck.version)
+    st.session_state.deck_version = deck.version
+    changes = service.changes_since(version)
+    if changes is None:
+        # 差異紀錄已經太舊：直接拿目前快照的本單元當成差異，逐題重新比對
+        unit = st.session_state.current_unit
+        cards = dict(deck.lookup(unit)) if unit in deck else {}
+        removed = {q for q, _ in st.session_state.selected if q not in cards}
+        changes = [(unit, {"added": cards, "changed": {}, "removed": removed})]
+    if not changes:
+        return
+    removed = set()
+    updated = {}
+    added = {}
+    for unit, diff in changes:
+        for word in diff["removed"]:
+            removed.add(word)
+            updated.pop(word, None)
+            added.pop(word, None)
+        for word, meaning in {**diff["changed"], **diff["added"]}.items():
+            removed.discard(word)
+            updated[word] = meaning
+        if unit == st.session_state.current_unit:
+            added.update(diff["added"])
+    selected = st.session_state.selected
+    idx = st.session_state.idx
+    done = [selected[i] for i in range(idx)]
+    remaining = [(q, updated.get(q, a)) for q, a in (selected[i] for i in range(idx, len(selected)))
+                 if q not in removed]
+    if st.session_state.get("whole_unit"):
+        asked = {q for q, _ in done} | {q for q, _ in remaining}
+        remaining.extend((w, m) for w, m in added.items() if w not in asked)
+    st.session_state.selected = done + remaining
+    st.session_state.total = len(st.session_state.selected)
+    get_sessions().set_questions(st.session_state.session_id, st.session_state.selected)
+    # 這題之後的選擇題選項可能已經過時
+    for key in [k for k in st.session_state if k.startswith("options_") and int(k[len("options_"):]) >= idx]:
+        del st.session_state[key]
+
+# 網址上的 session 還沒考完、單元也還在時，把進度放回 session_state；
+# 單元和模式的選單也一起設好，才不會被當成換了單元而重新出題
+def resume_session(deck):
+    session_id = st.query_params.get("session")
+    if not session_id:
+        return
+    session = get_sessions().get(session_id)
+    if session is None or session["status"] != "open" or session["unit"] not in deck.units:
+        del st.query_params["session"]
+        return
+    st.session_state.selected = session["questions"]
+    st.session_state.session_id = session_id
+    st.session_state.idx = session["idx"]
+    st.session_state.score = session["score"]
+    st.session_state.total = session["total"]
+    st.session_state.wrongs = session["wrongs"]
+    st.session_state.current_unit = st.session_state.unit_choice = session["unit"]
+    st.session_state.current_mode = st.session_state.mode_choice = session["mode"]
+    st.session_state.whole_unit = session["whole_unit"]
+    st.session_state.deck_version = deck.version
+    st.session_state.last_result = ""
+
+# 退出或重新開始：沒考完的標記為放棄，清掉網址上的 session
+def end_session():
+    if "session_id" in st.session_state and st.session_state.idx < st.session_state.total:
+        get_sessions().finish(st.session_state.session_id, "closed")
+    st.query_params.clear()
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+
+def quiz():
+    with stage("frontend.rerun"):
+        quiz_page()
+    if enabled():
+        show_profile_panel()
+
+def analytics():
+    from dashboard import dashboard_page
+    with stage("frontend.dashboard"):
+        dashboard_page()
 
 def main():
     st.set_page_config(page_title="Flashcards 測驗", layout="centered")
+    page = st.navigation([st.Page(quiz, title="測驗", icon="📘", default=True),
+                          st.Page(analytics, title="學習分析", icon="📊")])
+    page.run()
+
+def quiz_page():
     st.title("📘 日文單字 Flashcards 測驗")
 
     # 載入題庫
     try:
-        flashcards = load_flashcards()
+        with stage("frontend.deck"):
+            service = get_deck_service()
+            deck = service.snapshot
     except FileNotFoundError as e:
         st.error(str(e))
         return
+    if "selected" in st.session_state:
+        reconcile_session(service, deck)
+    else:
+        resume_session(deck)
+    search_panel(deck)
 
     # 單元選擇
-    unit_names = list(flashcards.keys())
-    unit = st.selectbox("選擇單元", unit_names)
+    unit = st.selectbox("選擇單元", deck.units, key="unit_choice")
 
-    # 題庫與總題數
-    all_cards = list(flashcards[unit].items())
+    # 題庫與總題數（共用的唯讀 tuple，不複製）
+    all_cards = deck.cards(unit)
     total_available = len(all_cards)
-    random.shuffle(all_cards)  # 題目打亂
 
     # 顯示總題數提示
     st.markdown(f"💡 本單元共有 **{total_available}** 題")
+    if not total_available:
+        return
 
-    # 題數選擇（加上「全部」選項）
-    options = list(range(1, total_available + 1))
-    options.append("全部")
-    choice = st.selectbox("請選擇要測驗的題數", options, index=min(9, len(options)-2))
-    num_questions = total_available if choice == "全部" else int(choice)
+    # 題數選擇（勾選「全部」就出整個單元）
+    use_all = st.checkbox("全部", value=False)
+    if use_all:
+        num_questions = total_available
+    else:
+        num_questions = st.number_input("請選擇要測驗的題數", min_value=1, max_value=total_available,
+                                        value=min(10, total_available), step=1)
+
+    # 測驗模式：單元隨機出題（打字或選擇題），或依間隔重複排程出今天到期的卡片
+    mode = st.radio("測驗模式", ["單元測驗", "選擇題", "今日到期複習"], horizontal=True, key="mode_choice")
+    prioritize, weights = weight_panel()
+    live = st.sidebar.checkbox("⌨️ 打字時即時提示", help="每打一個字就標出對的部分和第一個打錯的字（在瀏覽器裡比對，不會重新整理）")
 
     # 初始化測驗狀態
-    if st.button("開始測驗") or "selected" not in st.session_state or st.session_state.get("current_unit") != unit:
-        st.session_state.selected = all_cards[:num_questions]
+    if (st.button("開始測驗") or "selected" not in st.session_state
+            or st.session_state.get("current_unit") != unit or st.session_state.get("current_mode") != mode):
+        # 換掉還沒考完的測驗時，舊的標記為放棄
+        if "session_id" in st.session_state and st.session_state.idx < st.session_state.total:
+            get_sessions().finish(st.session_state.session_id, "closed")
+        with stage("frontend.select"):
+            if mode == "今日到期複習":
+                st.session_state.selected = select_due_questions(deck.lookup(unit), int(num_questions), unit=unit)
+            elif prioritize:
+                # 錯得多、錯得近的單字較容易抽到；只存卡片 id
+                store = deck.store_for(unit)
+                ids = select_quiz_ids(store, unit, int(num_questions), weights=weights)
+                st.session_state.selected = store.view(ids)
+            else:
+                # 題目打亂：只記住種子，第幾題用到時才從排列算出來
+                st.session_state.selected = LazySample(all_cards, int(num_questions))
+        # 上一輪測驗留下的選擇題選項
+        for key in [k for k in st.session_state if k.startswith("options_")]:
+            del st.session_state[key]
+        st.session_state.current_mode = mode
+        st.session_state.deck_version = deck.version
+        st.session_state.whole_unit = use_all and mode != "今日到期複習"
+        st.session_state.session_id = uuid.uuid4().hex
         st.session_state.idx = 0
         st.session_state.score = 0
         st.session_state.total = len(st.session_state.selected)
         st.session_state.wrongs = []
         st.session_state.current_unit = unit
         st.session_state.last_result = ""
+        st.session_state.finished = False
+        # 題目在背景寫入時才展開，這裡不用等
+        get_sessions().start(st.session_state.session_id, st.session_state.selected, unit, mode, owner="web",
+                             whole_unit=st.session_state.whole_unit)
+        st.query_params["session"] = st.session_state.session_id
 
     # 進行中題目
     if "selected" in st.session_state and st.session_state.idx < st.session_state.total:
         q, a = st.session_state.selected[st.session_state.idx]
         st.write(f"解釋：**{a}**")
-        user_input = st.text_input("請輸入對應假名", key=f"q_{st.session_state.idx}")
+        multiple_choice = st.session_state.current_mode == "選擇題"
+        if multiple_choice:
+            # 選項只在第一次顯示這題時產生，rerun 時維持不變
+            options_key = f"options_{st.session_state.idx}"
+            if options_key not in st.session_state:
+                with stage("frontend.choices"):
+                    st.session_state[options_key] = make_choices(q, deck.lookup(unit), deck.choices(unit))[0]
+            user_input = st.radio("請選擇對應假名", st.session_state[options_key], index=None,
+                                  key=f"q_{st.session_state.idx}") or ""
+        else:
+            # 今日複習可能出到其他單元的卡片，查不到預先算好的形式就當場算
+            forms = deck.answers(unit).get(q) or answer_forms(q)
+            user_input = st.text_input("請輸入對應假名", key=f"q_{st.session_state.idx}")
+            if live:
+                live_feedback("請輸入對應假名", answer_trie([forms]))
 
         if st.button("提交"):
-            if normalize_string(user_input) == normalize_string(q):
+            with stage("frontend.grade"):
+                if multiple_choice:
+                    correct, hint = user_input == q, None
+                else:
+                    correct, hint = check_answer(user_input, forms)
+            if correct:
                 st.session_state.last_result = f"✅ 正確！"
                 st.session_state.score += 1
             else:
-                st.session_state.last_result = f"❌ 錯誤！正確答案是：{q}"
+                hint = f"（{hint}）" if hint else ""
+                st.session_state.last_result = f"❌ 錯誤！{hint}正確答案是：{q}"
                 st.session_state.wrongs.append((a, user_input, q))
+            with stage("frontend.schedule"):
+                get_scheduler().review(q, correct, a, st.session_state.current_unit)
+                record_answer(q, st.session_state.current_unit, correct)
             st.session_state.idx += 1
+            get_sessions().progress(st.session_state.session_id, st.session_state.idx, st.session_state.score,
+                                    st.session_state.wrongs)
             st.rerun()
 
         if st.session_state.last_result:
             st.markdown(st.session_state.last_result)
 
         if st.button("退出"):
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
+            end_session()
             st.rerun()
 
     # 測驗結束
@@ -74,11 +284,15 @@ def main():
             st.write("你答錯的題目：")
             for meaning, user, correct in st.session_state.wrongs:
                 st.write(f"- {meaning}: 你的回答：{user}, 正解：{correct}")
-            save_incorrect(st.session_state.wrongs)
+            # 結果頁每次 rerun 都會走到這裡，靠 session_id 去重，不會重複記錄
+            save_incorrect(st.session_state.wrongs, unit=st.session_state.current_unit,
+                           session_id=st.session_state.session_id)
+        if not st.session_state.get("finished"):
+            get_sessions().finish(st.session_state.session_id)
+            st.session_state.finished = True
 
         if st.button("重新開始"):
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
+            end_session()
             st.rerun()
 
 if __name__ == "__main__":
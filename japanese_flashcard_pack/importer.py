@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# 大量匯入單字表：python importer.py 字典.tsv --word 0 --meaning 1 --unit 2 --out flashcards.txt --cache
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from deck_cache import CacheWriter, segment_digest
+
+# 把 TSV / CSV / JSON Lines 的單字表串流轉成題庫格式（[單元] 與「單字: 解釋」行）。
+# 來源逐列串流讀取；各單元的行先放在記憶體，累積 CHUNK 列就依單元整批寫進暫存檔，
+# 最後依單元第一次出現的順序把各段接起來寫出，記憶體只和 CHUNK 與最大的單元有關，和來源大小無關。
+# 跨單元去重邊讀邊做，只記 8 位元組的雜湊（每張卡約 80 位元組的記憶體）：
+#   card：同一組（單字, 解釋）只留第一次出現的；word：同一個單字只留第一次出現的單元；none：不去重。
+# 同一單元裡重複的單字合併成一行，不同的解釋用「／」串起來（批改時視為可接受的多種解釋）。
+# 加上 --cache 時同時寫出編譯好的題庫快取，第一次載入不用再解析。
+
+CHUNK = 50_000
+ALIASES = {"word": "word", "單字": "word", "假名": "word", "kana": "word",
+           "meaning": "meaning", "解釋": "meaning", "意思": "meaning", "gloss": "meaning",
+           "unit": "unit", "單元": "unit", "lesson": "unit"}
+FORMATS = {".tsv": "tsv", ".tab": "tsv", ".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+def detect_format(path):
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "tsv")
+
+# 換行與連續空白都變成一個空格（str.split 也會切開 \u2028 之類的分行字元）
+def _clean(value):
+    return " ".join(str(value).split()) if value is not None else ""
+
+# 欄位對應：數字為第幾欄（從 0 開始），其他為標題名稱（JSON Lines 為 key）。
+# 沒指定時用標題列的名稱猜；猜不到就當作沒有標題列，依序為 單字, 解釋[, 單元]
+def column_layout(header, word=None, meaning=None, unit=None):
+    given = {"word": word, "meaning": meaning, "unit": unit}
+    names = [ALIASES.get(_clean(name).lower()) for name in header]
+    layout = {}
+    has_header = False
+    for field, spec in given.items():
+        if spec is None:
+            if field in names:
+                layout[field] = names.index(field)
+                has_header = True
+        elif str(spec).isdigit():
+            layout[field] = int(spec)
+        else:
+            cleaned = [_clean(name) for name in header]
+            if spec not in cleaned:
+                raise ValueError(f"標題列裡沒有欄位：{spec}")
+            layout[field] = cleaned.index(spec)
+            has_header = True
+    if "word" not in layout or "meaning" not in layout:
+        if has_header:
+            raise ValueError("需要指定單字與解釋的欄位（--word / --meaning）")
+        layout.setdefault("word", 0)
+        layout.setdefault("meaning", 1)
+        if unit is None and len(header) >= 3:
+            layout["unit"] = 2
+    return layout, has_header
+
+# 逐列產生 (單字, 解釋, 單元或 None)
+def read_rows(path, fmt=None, word=None, meaning=None, unit=None):
+    fmt = fmt or detect_format(path)
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="" if fmt != "jsonl" else None) as f:
+        if fmt == "jsonl":
+            keys = {"word": word or "word", "meaning": meaning or "meaning", "unit": unit or "unit"}
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield None
+                    continue
+                if not isinstance(record, dict):
+                    yield None
+                    continue
+                yield record.get(keys["word"]), record.get(keys["meaning"]), record.get(keys["unit"])
+            return
+        reader = csv.reader(f, delimiter="\t" if fmt == "tsv" else ",",
+                            quoting=csv.QUOTE_NONE if fmt == "tsv" else csv.QUOTE_MINIMAL)
+        first = next(reader, None)
+        if first is None:
+            return
+        layout, has_header = column_layout(first, word, meaning, unit)
+        width = max(layout.values()) + 1
+        w_col, m_col, u_col = layout["word"], layout["meaning"], layout.get("unit")
+        rows = reader if has_header else _chain_first(first, reader)
+        for row in rows:
+            if len(row) < width:
+                yield None
+                continue
+            yield row[w_col], row[m_col], row[u_col] if u_col is not None else None
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
+
+def _key(*parts):
+    return int.from_bytes(hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=8).digest(), "little")
+
+class Importer:
+    def __init__(self, dedup="card", unit_size=200, unit_name="匯入", chunk=CHUNK):
+        if dedup not in ("card", "word", "none"):
+            raise ValueError(f"不支援的去重方式：{dedup}")
+        self.dedup = dedup
+        self.unit_size = unit_size
+        self.unit_name = unit_name
+        self.chunk = chunk
+        self.rows = 0
+        self.duplicates = 0
+        self.merged = 0
+        self.rejected = 0
+        self._seen = set()
+        self._units = {}  # 單元 → [(暫存檔位移, 長度)]，插入順序就是輸出順序
+        self._buffer = {}
+        self._buffered = 0
+        self._spill = tempfile.TemporaryFile()
+        self._auto = 0
+
+    # 沒有單元欄時每 unit_size 張卡自動分一個單元
+    def _default_unit(self):
+        unit = f"{self.unit_name} {self._auto // self.unit_size + 1}"
+        self._auto += 1
+        return unit
+
+    def add(self, row):
+        self.rows += 1
+        if row is None:
+            self.rejected += 1
+            return
+        word, meaning, unit = (_clean(value) for value in row)
+        # 題庫格式的限制：單字不能含「: 」、整行不能像 [單元] 標題
+        if not word or not meaning or ": " in word or (word.startswith("[") and meaning.endswith("]")):
+            self.rejected += 1
+            return
+        if self.dedup != "none":
+            key = _key(word, meaning) if self.dedup == "card" else _key(word)
+            if key in self._seen:
+                self.duplicates += 1
+                return
+            self._seen.add(key)
+        unit = unit or self._default_unit()
+        if unit not in self._units:
+            self._units[unit] = []
+        self._buffer.setdefault(unit, []).append(f"{word}: {meaning}\n")
+        self._buffered += 1
+        if self._buffered >= self.chunk:
+            self._flush()
+
+    def _flush(self):
+        for unit, lines in self._buffer.items():
+            data = "".join(lines).encode("utf-8")
+            self._units[unit].append((self._spill.tell(), len(data)))
+            self._spill.write(data)
+        self._buffer = {}
+        self._buffered = 0
+
+    # 依序產生 (單元, {單字: 解釋})，同單元重複的單字合併解釋
+    def units(self):
+        self._flush()
+        for unit, runs in self._units.items():
+            cards = {}
+            for offset, length in runs:
+                self._spill.seek(offset)
+                for line in self._spill.read(length).decode("utf-8").split("\n")[:-1]:
+                    word, meaning = line.split(": ", 1)
+                    meanings = cards.get(word)
+                    if meanings is None:
+                        cards[word] = [meaning]
+                    elif meaning not in meanings:
+                        meanings.append(meaning)
+                        self.merged += 1
+                    else:
+                        self.duplicates += 1
+            yield unit, {word: "／".join(meanings) for word, meanings in cards.items()}
+
+    def close(self):
+        self._spill.close()
+
+# 寫出題庫檔（先寫暫存檔再換上），cache=True 時同時寫出編譯好的題庫快取
+def write_deck(importer, out, cache=False):
+    folder = os.path.dirname(os.path.abspath(out))
+    fd, tmp = tempfile.mkstemp(prefix=".import.", dir=folder)
+    digest = hashlib.blake2b(digest_size=16)
+    writer = CacheWriter() if cache else None
+    units = 0
+    total = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for unit, cards in importer.units():
+                head = f"[{unit}]\n".encode("utf-8")
+                segment = ("".join(f"{word}: {meaning}\n" for word, meaning in cards.items()) + "\n").encode("utf-8")
+                f.write(head)
+                f.write(segment)
+                digest.update(head)
+                digest.update(segment)
+                if writer:
+                    writer.add(unit, cards, segment_digest(segment))
+                units += 1
+                total += len(cards)
+        os.replace(tmp, out)
+        if writer:
+            writer.commit(out, digest.hexdigest())
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        if writer:
+            writer.close()
+    return units, total
+
+def import_files(paths, out, fmt=None, word=None, meaning=None, unit=None, dedup="card", unit_size=200,
+                 unit_name="匯入", cache=False, chunk=CHUNK):
+    importer = Importer(dedup, unit_size, unit_name, chunk)
+    start = time.perf_counter()
+    try:
+        for path in paths:
+            for row in read_rows(path, fmt, word, meaning, unit):
+                importer.add(row)
+        units, cards = write_deck(importer, out, cache)
+    finally:
+        importer.close()
+    return {"rows": importer.rows, "cards": cards, "units": units, "duplicates": importer.duplicates,
+            "merged": importer.merged, "rejected": importer.rejected, "seconds": time.perf_counter() - start}
+
+def main():
+    parser = argparse.ArgumentParser(description="把大型單字表匯入成題庫")
+    parser.add_argument("sources", nargs="+", help="來源檔（.tsv / .csv / .jsonl）")
+    parser.add_argument("--out", default="flashcards.txt", help="輸出的題庫檔（會整個覆蓋）")
+    parser.add_argument("--format", choices=["tsv", "csv", "jsonl"], help="來源格式，預設依副檔名判斷")
+    parser.add_argument("--word", help="單字欄（第幾欄或標題名稱）")
+    parser.add_argument("--meaning", help="解釋欄")
+    parser.add_argument("--unit", help="單元欄；沒有時每 --unit-size 張卡自動分一個單元")
+    parser.add_argument("--unit-size", type=int, default=200)
+    parser.add_argument("--unit-name", default="匯入", help="自動分單元時的名稱")
+    parser.add_argument("--dedup", choices=["card", "word", "none"], default="card", help="跨單元去重的方式")
+    parser.add_argument("--cache", action="store_true", help="同時寫出編譯好的題庫快取")
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="一次處理的列數")
+    args = parser.parse_args()
+    try:
+        result = import_files(args.sources, args.out, args.format, args.word, args.meaning, args.unit, args.dedup,
+                              args.unit_size, args.unit_name, args.cache, args.chunk)
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"匯入失敗：{e}")
+        sys.exit(1)
+    seconds = result["seconds"]
+    print(f"讀取 {result['rows']:,} 列，寫入 {result['cards']:,} 張卡片、{result['units']:,} 個單元"
+          f"（重複 {result['duplicates']:,}、合併解釋 {result['merged']:,}、略過 {result['rejected']:,}）")
+    print(f"耗時 {seconds:.1f} 秒，每秒 {result['rows'] / seconds if seconds else 0:,.0f} 列 → {args.out}")
+
+if __name__ == "__main__":
+    main()
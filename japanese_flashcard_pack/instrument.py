@@ -0,0 +1,144 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+# 效能量測（預設關閉）。設定環境變數 FLASHCARD_PROFILE=1 後，
+# 每個 stage 記錄耗時與 tracemalloc 的配置量，保留最近 WINDOW 筆算 p50/p95/p99，
+# 並定期輸出成 JSON 與 Prometheus 文字格式，放在 FLASHCARD_PROFILE_DIR（預設為本目錄）。
+# 多個 stage 同時執行時 tracemalloc 的峰值是共用的，記憶體數字只能當參考。
+
+WINDOW = 1000
+EXPORT_INTERVAL = 5.0
+
+_enabled = os.environ.get("FLASHCARD_PROFILE", "") not in ("", "0")
+_samples = {}
+_lock = threading.Lock()
+_exporter = None
+
+def enabled():
+    return _enabled
+
+# trace_memory=False 時只記耗時（tracemalloc 會讓每次配置都變慢，負載測試時不開）
+def enable(export_dir=None, trace_memory=True):
+    global _enabled
+    _enabled = True
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _start_exporter(export_dir or os.environ.get("FLASHCARD_PROFILE_DIR") or os.path.dirname(os.path.abspath(__file__)))
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def record(name, seconds, alloc_bytes=0):
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = {"times": deque(maxlen=WINDOW), "allocs": deque(maxlen=WINDOW),
+                                        "count": 0, "total": 0.0}
+        samples["times"].append(seconds)
+        samples["allocs"].append(alloc_bytes)
+        samples["count"] += 1
+        samples["total"] += seconds
+
+@contextmanager
+def stage(name):
+    if not _enabled:
+        yield
+        return
+    tracing = tracemalloc.is_tracing()
+    before = tracemalloc.get_traced_memory()[0] if tracing else 0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        alloc = tracemalloc.get_traced_memory()[0] - before if tracing else 0
+        record(name, seconds, max(alloc, 0))
+
+# 裝飾器版本，沒開啟時只多一次旗標判斷
+def instrumented(name):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+# {stage: {count, total, p50, p95, p99, alloc_kb}}，時間單位為秒
+def summary():
+    with _lock:
+        snapshot = {name: (sorted(s["times"]), list(s["allocs"]), s["count"], s["total"])
+                    for name, s in _samples.items()}
+    result = {}
+    for name, (times, allocs, count, total) in snapshot.items():
+        result[name] = {
+            "count": count,
+            "total": total,
+            "p50": _quantile(times, 0.50),
+            "p95": _quantile(times, 0.95),
+            "p99": _quantile(times, 0.99),
+            "alloc_kb": (sum(allocs) / len(allocs) / 1024) if allocs else 0.0,
+        }
+    return result
+
+def to_prometheus(stats):
+    lines = [
+        "# HELP flashcards_stage_seconds Stage latency over the recent window.",
+        "# TYPE flashcards_stage_seconds summary",
+    ]
+    for name, s in sorted(stats.items()):
+        for q, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            lines.append(f'flashcards_stage_seconds{{stage="{name}",quantile="{q}"}} {s[key]:.6f}')
+        lines.append(f'flashcards_stage_seconds_sum{{stage="{name}"}} {s["total"]:.6f}')
+        lines.append(f'flashcards_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+    lines.append("# HELP flashcards_stage_alloc_kilobytes Mean traced allocation per stage call.")
+    lines.append("# TYPE flashcards_stage_alloc_kilobytes gauge")
+    for name, s in sorted(stats.items()):
+        lines.append(f'flashcards_stage_alloc_kilobytes{{stage="{name}"}} {s["alloc_kb"]:.1f}')
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def export(export_dir):
+    stats = summary()
+    _write_atomic(os.path.join(export_dir, "profile.json"), json.dumps(stats, ensure_ascii=False, indent=2))
+    _write_atomic(os.path.join(export_dir, "profile.prom"), to_prometheus(stats))
+
+def _start_exporter(export_dir):
+    global _exporter
+    with _lock:
+        if _exporter is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(EXPORT_INTERVAL)
+                try:
+                    export(export_dir)
+                except OSError:
+                    continue
+
+        _exporter = threading.Thread(target=run, name="profile-exporter", daemon=True)
+        _exporter.start()
+
+if _enabled:
+    enable()
@@ -0,0 +1,171 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from wrong_store import format_header, format_record
+from instrument import stage
+
+log = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，只靠單一寫入執行緒避免交錯
+    fcntl = None
+
+# 一次把整段文字 append 到檔案；跨 process 用檔案鎖，避免和其他程式的寫入交錯。
+# 開啟效能量測時，等鎖的時間記在 wait_stage（錯題檔是 journal.lock_wait），可以看出檔案的競爭程度
+def append_locked(path, text, sync=True, wait_stage="journal.lock_wait"):
+    while True:
+        with open(path, "a", encoding="utf-8", errors="ignore") as f:
+            if fcntl:
+                with stage(wait_stage):
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                # 等鎖的時候檔案被 compact.py 換掉了：寫到舊檔會不見，重新開新的檔案
+                if fcntl and file_replaced(path, f):
+                    continue
+                f.write(text)
+                f.flush()
+                if sync:
+                    os.fsync(f.fileno())
+                return
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def file_replaced(path, f):
+    try:
+        return os.stat(path).st_ino != os.fstat(f.fileno()).st_ino
+    except OSError:
+        return True
+
+# 背景寫入執行緒：呼叫端只把紀錄放進佇列，由單一背景執行緒累積一小段時間後交給 _write 整批寫入，
+# 呼叫端（例如 Streamlit 的 rerun）不用等檔案鎖和磁碟。
+class BackgroundWriter:
+    name = "background-writer"
+
+    def __init__(self, path, flush_interval=0.2):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._drain()
+            try:
+                self._write(batch)
+            except Exception:
+                # 寫不進去就放棄這批並記下原因；背景執行緒掛掉的話 flush() 會永遠等下去
+                log.exception("%s 寫入失敗，略過 %d 筆", self.path, len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        raise NotImplementedError
+
+    # 等佇列中的紀錄都寫完
+    def flush(self):
+        self._queue.join()
+
+# 每一次作答（答對也記）一行：時間、1/0、單元、單字，以 tab 分隔，給學習分析（analytics.py）累加。
+# 和錯題檔分開量測（answers.lock_wait / answers.append），不算進錯題檔的競爭程度；不 fsync
+class AnswerLog(BackgroundWriter):
+    name = "answer-log"
+
+    def log(self, word, unit, correct, when=None):
+        when = time.time() if when is None else when
+        unit = " ".join((unit or "").split())
+        word = " ".join(word.split())
+        self._queue.put(f"{when:.0f}\t{int(bool(correct))}\t{unit}\t{word}\n")
+
+    def _write(self, batch):
+        with stage("answers.append"):
+            append_locked(self.path, "".join(batch), sync=False, wait_stage="answers.lock_wait")
+
+# 錯題紀錄的寫入佇列。每筆以 (session, 題號) 為 key，重複送來的會被丟掉；
+# 同一批只 fsync 一次。
+class WrongAnswerJournal(BackgroundWriter):
+    name = "wrong-answer-journal"
+
+    def __init__(self, path, flush_interval=0.2, max_keys=100_000):
+        self.max_keys = max_keys
+        self._seen = OrderedDict()
+        self._seen_lock = threading.Lock()
+        super().__init__(path, flush_interval)
+
+    def _claim(self, key):
+        with self._seen_lock:
+            if key in self._seen:
+                return False
+            self._seen[key] = None
+            if len(self._seen) > self.max_keys:
+                self._seen.popitem(last=False)
+            return True
+
+    # records: [(題號, 解釋, 你的回答, 正確答案)]，回傳實際排入的筆數
+    def record_many(self, session_id, unit, records):
+        queued = 0
+        for question, meaning, user_answer, correct_answer in records:
+            if self._claim((session_id, question)):
+                self._queue.put((session_id, unit, meaning, user_answer, correct_answer))
+                queued += 1
+        return queued
+
+    def _write(self, batch):
+        # 同一個 session、同一個單元的紀錄放在同一個區塊
+        blocks = OrderedDict()
+        for session_id, unit, meaning, user_answer, correct_answer in batch:
+            blocks.setdefault((session_id, unit), []).append(format_record(meaning, user_answer, correct_answer))
+        lines = []
+        for (_, unit), records in blocks.items():
+            lines.append(f"\n{format_header(unit)}\n")
+            lines.extend(records)
+        with stage("journal.append"):
+            append_locked(self.path, "".join(lines))
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+def _get_writer(cls, path):
+    key = (cls, os.path.abspath(path))
+    with _journals_lock:
+        writer = _journals.get(key)
+        if writer is None:
+            writer = cls(key[1])
+            _journals[key] = writer
+        return writer
+
+def get_journal(path):
+    return _get_writer(WrongAnswerJournal, path)
+
+def get_answer_log(path):
+    return _get_writer(AnswerLog, path)
+
+# 作答紀錄放進背景寫入佇列，不在呼叫端等檔案鎖
+def log_answer(path, word, unit, correct, when=None):
+    get_answer_log(path).log(word, unit, correct, when)
+
+@atexit.register
+def _flush_all():
+    for journal in list(_journals.values()):
+        journal.flush()
@@ -0,0 +1,83 @@
+import json
+
+import streamlit as st
+
+# 打字時的即時提示：把這題可接受答案的前綴樹（answers.answer_trie）嵌進一小段 HTML，
+# 由瀏覽器監聽同一頁的輸入框，每按一個鍵就在瀏覽器裡沿著樹走一次（和輸入長度成正比），
+# 標出對的前綴和第一個打錯的字。整個過程不會送回 server，不會 rerun，也不會重新載入題庫。
+# 答案會出現在網頁原始碼裡，所以只做成自己練習時可以打開的選項。
+
+TEMPLATE = """
+<div id="feedback" style="font-family: sans-serif; font-size: 1.1rem; min-height: 1.6rem;"></div>
+<script>
+const trie = %(trie)s;
+const label = %(label)s;
+const box = document.getElementById("feedback");
+
+// 和 answers.normalize_string + to_hiragana 相同：去空白、小寫、NFKC、片假名轉平假名
+function normalize(text) {
+  return text.trim().toLowerCase().normalize("NFKC")
+    .replace(/[\\u30a1-\\u30f6]/g, c => String.fromCharCode(c.charCodeAt(0) - 0x60));
+}
+
+function span(text, style) {
+  const s = document.createElement("span");
+  s.textContent = text;
+  s.style.cssText = style;
+  return s;
+}
+
+function render(value) {
+  const chars = Array.from(normalize(value));
+  let node = trie;
+  let i = 0;
+  while (i < chars.length && node[chars[i]]) {
+    node = node[chars[i]];
+    i++;
+  }
+  box.replaceChildren();
+  if (!chars.length) {
+    return;
+  }
+  box.append(span(chars.slice(0, i).join(""), "color: #1a7f37;"));
+  if (i < chars.length) {
+    box.append(span(chars[i], "color: #fff; background: #cf222e; border-radius: 3px; padding: 0 2px;"));
+    box.append(span(chars.slice(i + 1).join(""), "color: #8c959f;"));
+    box.append(span("  第 " + (i + 1) + " 個字不對", "color: #cf222e; font-size: 0.9rem;"));
+  } else if (node[""]) {
+    box.append(span("  ✓", "color: #1a7f37;"));
+  } else {
+    box.append(span("  …", "color: #8c959f;"));
+  }
+}
+
+// 輸入框在外層頁面；rerun 後可能還是同一個元素，先拿掉上一題掛的監聽
+function attach() {
+  const input = window.parent.document.querySelector('input[aria-label="' + label + '"]');
+  if (!input) {
+    setTimeout(attach, 100);
+    return;
+  }
+  if (input.flashcardFeedback) {
+    input.flashcardFeedback.abort();
+  }
+  const controller = new AbortController();
+  input.flashcardFeedback = controller;
+  input.addEventListener("input", () => render(input.value), {signal: controller.signal});
+  render(input.value);
+}
+attach();
+</script>
+"""
+
+def _json(value):
+    # 避免答案裡的 </script> 之類的字串提早結束 script
+    return json.dumps(value).replace("<", "\\u003c")
+
+def live_feedback(label, trie):
+    html = TEMPLATE % {"trie": _json(trie), "label": _json(label)}
+    if hasattr(st, "iframe"):
+        st.iframe(html, height=40)
+    else:  # 舊版 Streamlit 沒有 st.iframe
+        import streamlit.components.v1 as components
+        components.html(html, height=40)
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# 上線前的負載測試：python loadtest.py --learners 20 --processes 2 --max-p95 800
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# 用 Streamlit 的 AppTest 在本機模擬多位同時上線的學習者，完全離線。
+# 每個 process 相當於一個 frontend.py server：裡面的每個執行緒是一位學習者，
+# 共用同一份 st.cache_resource（題庫、錯題佇列、session 資料庫），
+# 反覆「選單元 → 開始測驗 → 一題一題作答 → 重新開始」，每個動作之間停 think 秒（指數分布）。
+# AppTest 每次執行都會替換全域的 Runtime，不能同時跑，所以同一個 process 的 rerun 排隊執行；
+# server 的 rerun 是純 Python、受 GIL 限制，本來就幾乎是一個接一個跑，
+# 「延遲」含排隊時間，相當於使用者感受到的等待；「處理時間」是 rerun 本身。
+# 所有檔案都在暫存資料夾的副本裡跑，不會動到真正的錯題檔與排程資料庫；
+# 多個 process 共用同一個錯題檔，用來看檔案鎖的競爭。
+# 報告每次 rerun 的延遲百分位、每位學習者的 CPU 與記憶體、錯題檔等鎖的時間，
+# 並確認寫進錯題檔的筆數和送出的錯誤答案一樣多；超過門檻時以非 0 結束，可以擋住發佈。
+# 延遲包含 AppTest 本身組裝與解析畫面的成本，實際瀏覽器連線時會略低。
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_run_lock = threading.Lock()
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# 建立測試用的副本：程式、題庫（或產生 cards 張卡的假題庫），錯題檔從空的開始
+def prepare_workdir(workdir, deck=None, cards=0):
+    for path in glob.glob(os.path.join(HERE, "*.py")):
+        shutil.copy(path, workdir)
+    target = os.path.join(workdir, "flashcards.txt")
+    if cards:
+        from bench import write_deck
+        write_deck(target, cards)
+    else:
+        shutil.copy(deck or os.path.join(HERE, "flashcards.txt"), target)
+    open(os.path.join(workdir, "wrong_answers.txt"), "w", encoding="utf-8").close()
+
+def _button(at, label):
+    for button in at.button:
+        if button.label == label:
+            return button
+    raise LookupError(f"找不到按鈕：{label}")
+
+class Learner:
+    def __init__(self, script, rng, questions, accuracy, choice_ratio, think, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(script, default_timeout=timeout)
+        self.rng = rng
+        self.questions = questions
+        self.accuracy = accuracy
+        self.choice_ratio = choice_ratio
+        self.think = think
+        self.latencies = {}
+        self.service = []
+        self.cpu = 0.0
+        self.answered = 0
+        self.wrong = 0
+        self.errors = 0
+
+    def run(self, action):
+        if self.think:
+            time.sleep(self.rng.expovariate(1 / self.think))
+        start = time.perf_counter()
+        with _run_lock:
+            begin = time.perf_counter()
+            cpu = time.process_time()
+            self.at.run()
+            # 拿著鎖的期間只有這個 rerun 在跑，整個 process 的 CPU 都算它的
+            self.cpu += time.process_time() - cpu
+            end = time.perf_counter()
+        self.service.append(end - begin)
+        self.latencies.setdefault(action, []).append(end - start)
+        if self.at.exception:
+            self.errors += 1
+            raise RuntimeError(self.at.exception[0].value)
+
+    def round(self):
+        at = self.at
+        state = at.session_state
+        at.selectbox(key="unit_choice").select(self.rng.choice(at.selectbox(key="unit_choice").options))
+        self.run("選單元")
+        # 空的單元沒有題目可考
+        if not at.number_input:
+            return
+        mode = "選擇題" if self.rng.random() < self.choice_ratio else "單元測驗"
+        at.radio(key="mode_choice").set_value(mode)
+        if at.number_input:
+            at.number_input[0].set_value(min(self.questions, int(at.number_input[0].max)))
+        _button(at, "開始測驗").click()
+        self.run("開始測驗")
+        while state["idx"] < state["total"]:
+            idx = state["idx"]
+            word = state["selected"][idx][0]
+            correct = self.rng.random() < self.accuracy
+            if mode == "選擇題":
+                options = state[f"options_{idx}"]
+                wrong = [o for o in options if o != word]
+                at.radio(key=f"q_{idx}").set_value(word if correct or not wrong else self.rng.choice(wrong))
+                correct = correct or not wrong
+            else:
+                at.text_input(key=f"q_{idx}").input(word if correct else "ぬ" * 3)
+            _button(at, "提交").click()
+            self.run("作答")
+            self.answered += 1
+            self.wrong += not correct
+        _button(at, "重新開始").click()
+        self.run("重新開始")
+
+    def session(self, rounds):
+        self.run("開啟頁面")
+        for _ in range(rounds):
+            self.round()
+
+# 一個 process：learners 位學習者同時作答，回傳這個 process 的統計
+def run_process(workdir, learners, rounds, questions, accuracy, choice_ratio, think, seed, timeout):
+    os.chdir(workdir)
+    sys.path.insert(0, workdir)
+    # 各 stage 的耗時（包括錯題檔等鎖）照樣記錄，但不開 tracemalloc
+    import instrument
+    instrument.enable(workdir, trace_memory=False)
+    from journal import get_journal
+    from logic import get_session_store
+
+    script = os.path.join(workdir, "frontend.py")
+    rss_start = _rss_mb()
+    # 第一位學習者先開頁面，題庫載入的成本不算進每位學習者的記憶體
+    warm = Learner(script, random.Random(seed), questions, accuracy, choice_ratio, 0, timeout)
+    warm.run("開啟頁面")
+    rss_warm = _rss_mb()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    crowd = [Learner(script, random.Random(seed * 1000 + i), questions, accuracy, choice_ratio, think, timeout)
+             for i in range(learners)]
+    failures = []
+
+    def drive(learner):
+        try:
+            learner.session(rounds)
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=drive, args=(learner,)) for learner in crowd]
+    for thread in threads:
+        thread.start()
+    peak = rss_warm
+    while any(thread.is_alive() for thread in threads):
+        peak = max(peak, _rss_mb())
+        time.sleep(0.2)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    get_journal(os.path.join(workdir, "wrong_answers.txt")).flush()
+    get_session_store().flush()
+
+    latencies = {}
+    for learner in crowd:
+        for action, values in learner.latencies.items():
+            latencies.setdefault(action, []).extend(values)
+    return {
+        "latencies": latencies,
+        "elapsed": elapsed,
+        "cpu": cpu,
+        "service": [v for learner in crowd for v in learner.service],
+        "learner_cpu": [learner.cpu for learner in crowd],
+        "rss_start": rss_start,
+        "rss_warm": rss_warm,
+        "rss_peak": peak,
+        "answered": sum(learner.answered for learner in crowd),
+        "wrong": sum(learner.wrong for learner in crowd),
+        "failures": failures,
+        "stages": instrument.summary(),
+    }
+
+def count_records(path):
+    from wrong_store import parse_record
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for line in f if parse_record(line))
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+def summarize(results, learners, wrong_recorded):
+    latencies = {}
+    for result in results:
+        for action, values in result["latencies"].items():
+            latencies.setdefault(action, []).extend(values)
+    every = sorted(v for values in latencies.values() for v in values)
+    service = sorted(v for r in results for v in r["service"])
+    elapsed = max(result["elapsed"] for result in results)
+    stages = {}
+    for result in results:
+        for name, s in result["stages"].items():
+            merged = stages.setdefault(name, {"count": 0, "p50": 0.0, "p95": 0.0})
+            merged["count"] += s["count"]
+            merged["p50"] = max(merged["p50"], s["p50"])
+            merged["p95"] = max(merged["p95"], s["p95"])
+    lock_waits = [r["stages"]["journal.lock_wait"] for r in results if "journal.lock_wait" in r["stages"]]
+    appends = [r["stages"]["journal.append"] for r in results if "journal.append" in r["stages"]]
+    return {
+        "learners": learners,
+        "reruns": len(every),
+        "reruns_per_s": round(len(every) / elapsed, 1) if elapsed else 0.0,
+        "answers": sum(r["answered"] for r in results),
+        "latency_ms": {"p50": _ms(_quantile(every, 0.50)), "p95": _ms(_quantile(every, 0.95)),
+                       "p99": _ms(_quantile(every, 0.99)), "max": _ms(every[-1]) if every else 0.0},
+        "service_ms": {"p50": _ms(_quantile(service, 0.50)), "p95": _ms(_quantile(service, 0.95)),
+                       "p99": _ms(_quantile(service, 0.99))},
+        "by_action_ms": {action: {"count": len(values), "p50": _ms(_quantile(sorted(values), 0.50)),
+                                  "p95": _ms(_quantile(sorted(values), 0.95))}
+                         for action, values in latencies.items()},
+        # 各 process 之中最慢的 p50 / p95
+        "stages_ms": {name: {"count": s["count"], "p50": _ms(s["p50"]), "p95": _ms(s["p95"])}
+                      for name, s in sorted(stages.items())},
+        "cpu_s_per_learner": round(sum(c for r in results for c in r["learner_cpu"]) / learners, 3),
+        "cpu_s_total": round(sum(r["cpu"] for r in results), 3),
+        "rss_mb_base": round(sum(r["rss_warm"] for r in results), 1),
+        "rss_mb_per_learner": round(sum(r["rss_peak"] - r["rss_warm"] for r in results) / learners, 2),
+        "wrong_file": {
+            "submitted": sum(r["wrong"] for r in results),
+            "recorded": wrong_recorded,
+            "appends": sum(w["count"] for w in lock_waits),
+            "lock_wait_p95_ms": _ms(max((w["p95"] for w in lock_waits), default=0.0)),
+            "lock_wait_max_p99_ms": _ms(max((w["p99"] for w in lock_waits), default=0.0)),
+            "append_p95_ms": _ms(max((w["p95"] for w in appends), default=0.0)),
+        },
+        "failures": [f for r in results for f in r["failures"]],
+    }
+
+def print_report(report):
+    print(f"學習者 {report['learners']} 位，rerun {report['reruns']:,} 次（{report['reruns_per_s']}/秒），"
+          f"作答 {report['answers']:,} 題")
+    lat = report["latency_ms"]
+    print(f"rerun 延遲 ms：p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  最大 {lat['max']}")
+    service = report["service_ms"]
+    print(f"rerun 處理時間 ms：p50 {service['p50']}  p95 {service['p95']}  p99 {service['p99']}")
+    for action, s in report["by_action_ms"].items():
+        print(f"  {action:<6} {s['count']:>6} 次  p50 {s['p50']:>8} ms  p95 {s['p95']:>8} ms")
+    for name, s in sorted(report["stages_ms"].items(), key=lambda item: -item[1]["p95"])[:8]:
+        print(f"  {name:<24} {s['count']:>6} 次  p50 {s['p50']:>8} ms  p95 {s['p95']:>8} ms")
+    print(f"CPU 每位學習者 {report['cpu_s_per_learner']} 秒（全部 {report['cpu_s_total']} 秒）；記憶體 基本 {report['rss_mb_base']} MB，"
+          f"每位學習者 +{report['rss_mb_per_learner']} MB")
+    w = report["wrong_file"]
+    print(f"錯題檔：送出 {w['submitted']} 筆錯誤、寫入 {w['recorded']} 筆，{w['appends']} 次寫入，"
+          f"等鎖 p95 {w['lock_wait_p95_ms']} ms，寫入 p95 {w['append_p95_ms']} ms")
+    for failure in report["failures"][:10]:
+        print(f"失敗：{failure}")
+
+# 回傳沒通過的門檻，空清單代表通過
+def check_gates(report, args):
+    failed = []
+    if report["failures"]:
+        failed.append(f"{len(report['failures'])} 位學習者中途出錯")
+    if args.max_p95 and report["latency_ms"]["p95"] > args.max_p95:
+        failed.append(f"p95 {report['latency_ms']['p95']} ms > {args.max_p95} ms")
+    if args.max_p99 and report["latency_ms"]["p99"] > args.max_p99:
+        failed.append(f"p99 {report['latency_ms']['p99']} ms > {args.max_p99} ms")
+    if args.max_rss_per_learner and report["rss_mb_per_learner"] > args.max_rss_per_learner:
+        failed.append(f"每位學習者 {report['rss_mb_per_learner']} MB > {args.max_rss_per_learner} MB")
+    if report["wrong_file"]["recorded"] != report["wrong_file"]["submitted"]:
+        failed.append("錯題檔的筆數和送出的錯誤答案不一致")
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="模擬多位同時作答的學習者")
+    parser.add_argument("--learners", type=int, default=10, help="每個 process 的學習者人數")
+    parser.add_argument("--processes", type=int, default=1, help="server process 數，共用同一個錯題檔")
+    parser.add_argument("--rounds", type=int, default=2, help="每位學習者做幾輪測驗")
+    parser.add_argument("--questions", type=int, default=5, help="每輪的題數")
+    parser.add_argument("--accuracy", type=float, default=0.7, help="答對的機率")
+    parser.add_argument("--choice-ratio", type=float, default=0.3, help="選擇題模式的比例")
+    parser.add_argument("--think", type=float, default=1.0, help="每個動作之間的平均思考秒數")
+    parser.add_argument("--deck", help="題庫檔，預設為本目錄的 flashcards.txt")
+    parser.add_argument("--cards", type=int, default=0, help="改用產生的假題庫（張數）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="單次 rerun 的逾時秒數")
+    parser.add_argument("--max-p95", type=float, help="rerun p95 上限（ms）")
+    parser.add_argument("--max-p99", type=float, help="rerun p99 上限（ms）")
+    parser.add_argument("--max-rss-per-learner", type=float, help="每位學習者的記憶體上限（MB）")
+    parser.add_argument("--out", help="把報告存成 JSON")
+    parser.add_argument("--keep", action="store_true", help="保留暫存資料夾")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="flashcards-load-")
+    try:
+        prepare_workdir(workdir, args.deck, args.cards)
+        jobs = [(workdir, args.learners, args.rounds, args.questions, args.accuracy, args.choice_ratio,
+                 args.think, args.seed + p + 1, args.timeout) for p in range(args.processes)]
+        # spawn：每個 process 都是乾淨的 server，不繼承這邊已經 import 的模組
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(args.processes) as pool:
+            results = pool.starmap(run_process, jobs)
+        report = summarize(results, args.learners * args.processes,
+                           count_records(os.path.join(workdir, "wrong_answers.txt")))
+    finally:
+        if args.keep:
+            print(f"暫存資料夾：{workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    failed = check_gates(report, args)
+    for reason in failed:
+        print(f"未通過：{reason}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,130 @@
-import unicodedata
-import random
 import os
+import time
+import uuid
+from deck_cache import load_cached
+from unit_index import load_unit_index, load_unit as read_unit
+from answers import load_answer_index
+from wrong_store import open_store
+from journal import get_journal, get_answer_log, log_answer
+from scheduler import open_scheduler
+from session_store import open_session_store
+from permutation import LazySample, weighted_sample
+from card_store import load_card_store
+from instrument import instrumented
 
-def normalize_string(s):
-    return unicodedata.normalize('NFKC', s.strip().lower())
-
-def load_flashcards(filename="flashcards.txt"):
-    flashcards = {}
-    current_unit = None
+def deck_path(filename="flashcards.txt"):
     path = os.path.join(os.path.dirname(__file__), filename)
     if not os.path.exists(path):
         raise FileNotFoundError(f"找不到題庫檔案：{path}")
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith("[") and line.endswith("]"):
-                current_unit = line[1:-1]
-                flashcards[current_unit] = {}
-            elif ": " in line and current_unit:
-                word, meaning = line.split(": ", 1)
-                flashcards[current_unit][word] = meaning
-    return flashcards
-
-def get_priority_list(wrong_file="wrong_answers.txt"):
-    priority_words = set()
-    path = os.path.join(os.path.dirname(__file__), wrong_file)
-    if not os.path.exists(path):
-        return priority_words
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            if line.startswith("解釋: "):
-                parts = line.strip().split(", ")
-                correct_answer = parts[2].split(": ")[1]
-                priority_words.add(correct_answer)
-    return priority_words
-
-def save_incorrect(incorrect_answers, path="wrong_answers.txt"):
+    return path
+
+@instrumented("logic.load_flashcards")
+def load_flashcards(filename="flashcards.txt"):
+    return load_cached(deck_path(filename))
+
+def list_units(filename="flashcards.txt"):
+    return list(load_unit_index(deck_path(filename)))
+
+# 只解析指定單元那一段，O(單元大小)
+@instrumented("logic.load_unit")
+def load_unit(unit, filename="flashcards.txt"):
+    return read_unit(deck_path(filename), unit)
+
+def load_store(filename="flashcards.txt"):
+    return load_card_store(deck_path(filename))
+
+def load_answers(filename="flashcards.txt"):
+    return load_answer_index(deck_path(filename))
+
+def get_wrong_store(wrong_file="wrong_answers.txt"):
+    return open_store(os.path.join(os.path.dirname(__file__), wrong_file))
+
+@instrumented("logic.get_priority_list")
+def get_priority_list(wrong_file="wrong_answers.txt", words=None):
+    store = get_wrong_store(wrong_file)
+    if words is None:
+        return store.missed_words()
+    return store.missed_among(words)
+
+# 交給背景寫入；同一個 session_id 重複呼叫（例如結果頁 rerun）不會重複記錄
+@instrumented("logic.save_incorrect")
+def save_incorrect(incorrect_answers, path="wrong_answers.txt", unit=None, session_id=None):
     if not incorrect_answers:
         return
     path = os.path.join(os.path.dirname(__file__), path)
-    with open(path, "a", encoding="utf-8", errors="ignore") as f:
-        f.write("\n=== 測驗紀錄 ===\n")
-        for meaning, user_answer, correct_answer in incorrect_answers:
-            clean_user_answer = ''.join(c for c in user_answer if unicodedata.category(c)[0] != "C")
-            f.write(f"解釋: {meaning}, 你的回答: {clean_user_answer}, 正確答案: {correct_answer}\n")
-
-def select_quiz_questions(flashcards_dict, num=10, prioritize=True):
-    all_items = list(flashcards_dict.items())
-    priority_words = get_priority_list() if prioritize else set()
-    priority = [(w, m) for w, m in all_items if w in priority_words]
-    others = [(w, m) for w, m in all_items if w not in priority_words]
-    random.shuffle(others)
-    questions = priority + others
-    return questions[:num]
+    records = [(i, *record) for i, record in enumerate(incorrect_answers)]
+    get_journal(path).record_many(session_id or uuid.uuid4().hex, unit, records)
+
+# 出題權重：沒答錯過的單字為 base；答錯過的是
+#   base + miss × 答錯次數 + recency × 0.5 ^ (距上次答錯天數 / half_life)，
+# 若是在本單元測驗時答錯的，再乘上 same_unit。
+DEFAULT_WEIGHTS = {"base": 1.0, "miss": 2.0, "recency": 4.0, "half_life": 7.0, "same_unit": 1.5}
+
+def miss_weights(stats, unit=None, weights=None, now=None):
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    now = now or time.time()
+    result = {}
+    for word, _, miss_unit, count, last_miss in stats:
+        weight = weights["base"] + weights["miss"] * count
+        # 舊紀錄沒有時間，只算次數
+        if last_miss:
+            age_days = max(0.0, now - last_miss) / 86400
+            weight += weights["recency"] * 0.5 ** (age_days / max(weights["half_life"], 1e-9))
+        if unit is not None and miss_unit == unit:
+            weight *= weights["same_unit"]
+        result[word] = weight
+    return result
+
+# 依答錯次數、最近程度與單元加權，不重複抽出 num 題；prioritize=False 時等機率
+@instrumented("logic.select_quiz_questions")
+def select_quiz_questions(flashcards_dict, num=10, prioritize=True, wrong_file="wrong_answers.txt", unit=None,
+                          weights=None):
+    if not prioritize:
+        return list(LazySample(list(flashcards_dict.items()), num))
+    boost = miss_weights(get_wrong_store(wrong_file).stats(flashcards_dict), unit, weights)
+    base = {**DEFAULT_WEIGHTS, **(weights or {})}["base"]
+    return weighted_sample((((w, m), boost.get(w, base)) for w, m in flashcards_dict.items()), num)
+
+# 和 select_quiz_questions 相同的出題規則，但只傳卡片 id，不複製 (單字, 解釋)
+@instrumented("logic.select_quiz_ids")
+def select_quiz_ids(store, unit, num=10, prioritize=True, wrong_file="wrong_answers.txt", weights=None):
+    ids = store.unit_ids(unit)
+    if not prioritize:
+        return list(LazySample(ids, num))
+    words = {store.word(cid) for cid in ids}
+    boost = miss_weights(get_wrong_store(wrong_file).stats(words), unit, weights)
+    base = {**DEFAULT_WEIGHTS, **(weights or {})}["base"]
+    return weighted_sample(((cid, boost.get(store.word(cid), base)) for cid in ids), num)
+
+def get_scheduler(db_file="schedule.db"):
+    return open_scheduler(os.path.join(os.path.dirname(__file__), db_file))
+
+def get_session_store(db_file="sessions.db"):
+    return open_session_store(os.path.join(os.path.dirname(__file__), db_file))
+
+# 每次作答都記一行，給學習分析用
+def record_answer(word, unit, correct, log_file="answers.log"):
+    log_answer(os.path.join(os.path.dirname(__file__), log_file), word, unit, correct)
+
+# 學習分析需要 NumPy，只有打開儀表板時才載入
+def get_analytics(log_file="answers.log"):
+    from analytics import open_analytics
+    path = os.path.join(os.path.dirname(__file__), log_file)
+    # 作答紀錄是背景寫入的，先等剛答的幾題寫進檔案
+    get_answer_log(path).flush()
+    return open_analytics(path)
+
+@instrumented("logic.select_due_questions")
+def select_due_questions(flashcards_dict, num=10, scheduler=None, unit=None):
+    scheduler = scheduler or get_scheduler()
+    # 只出本單元到期的卡片，作答紀錄記在本單元不會記錯
+    questions = [(w, m) for w, m, _ in scheduler.due(num, unit=unit)]
+    # 今天到期的不夠時，從本單元補上還沒學過的新卡片
+    if len(questions) < num:
+        known = scheduler.known_words(unit)
+        for w, m in flashcards_dict.items():
+            if w not in known:
+                questions.append((w, m))
+                if len(questions) >= num:
+                    break
+    return questions
@@ -0,0 +1,83 @@
+import heapq
+import math
+import random
+from collections.abc import Sequence
+
+# 以種子決定的 [0, n) 雙射排列（Feistel 網路 + cycle walking）。
+# 第 i 個位置直接算出來，不需要先把整個單元打亂；同一個種子永遠得到同一個順序。
+class IndexPermutation:
+    def __init__(self, n, seed, rounds=4):
+        self.n = n
+        self.seed = seed
+        bits = max(2, (n - 1).bit_length())
+        if bits % 2:
+            bits += 1
+        self._half = bits // 2
+        self._mask = (1 << self._half) - 1
+        rng = random.Random(seed)
+        self._keys = [rng.getrandbits(32) for _ in range(rounds)]
+
+    def _mix(self, value, key):
+        x = (value * 0x9E3779B1 + key) & 0xFFFFFFFF
+        x ^= x >> 16
+        x = (x * 0x85EBCA6B) & 0xFFFFFFFF
+        x ^= x >> 13
+        x = (x * 0xC2B2AE35) & 0xFFFFFFFF
+        x ^= x >> 16
+        return x & self._mask
+
+    def _encrypt(self, x):
+        left, right = x >> self._half, x & self._mask
+        for key in self._keys:
+            left, right = right, left ^ self._mix(right, key)
+        return (left << self._half) | right
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        # 值域是 2 的偶數次方，落在 n 以外就繼續加密，平均不到 4 次
+        x = self._encrypt(i)
+        while x >= self.n:
+            x = self._encrypt(x)
+        return x
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self[i]
+
+# 從 items 中不重複抽出 k 題，第 i 題要用到時才算；只記住種子就能重現整份測驗。
+class LazySample(Sequence):
+    def __init__(self, items, k, seed=None):
+        self.items = items
+        self.k = min(k, len(items))
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self._perm = IndexPermutation(len(items), self.seed)
+
+    def __len__(self):
+        return self.k
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.k:
+            raise IndexError(i)
+        return self.items[self._perm[i]]
+
+# 加權不重複抽樣（Efraimidis–Spirakis）：每個項目的 key 為 log(u) / 權重，取 key 最大的 k 個。
+# pairs 是 (項目, 權重) 的 iterable，只掃一次、heap 只留 k 個，O(n log k)。
+# 權重 <= 0 的項目不會被抽到；回傳順序由 key 大到小，權重高的傾向排在前面。
+def weighted_sample(pairs, k, rng=None):
+    if k <= 0:
+        return []
+    rng = rng or random
+    heap = []
+    for i, (item, weight) in enumerate(pairs):
+        if weight <= 0:
+            continue
+        key = math.log(1.0 - rng.random()) / weight
+        if len(heap) < k:
+            heapq.heappush(heap, (key, i, item))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, i, item))
+    return [item for _, _, item in sorted(heap, reverse=True)]
@@ -1,30 +1,18 @@
 
 import random
 from colorama import Fore, Style
-import unicodedata
-
-def normalize_string(s):
-    return unicodedata.normalize('NFKC', s.strip().lower())
+from unit_index import UnitFileDeck
+from answers import normalize_string
+from wrong_store import open_store, format_header, format_record
+from journal import append_locked
 
 def load_flashcards(filename="flashcards.txt"):
-    flashcards = {}
-    current_unit = None
-
+    # 只讀單元索引，單元內容等選到時才從檔案中那一段解析
     try:
-        with open(filename, 'r', encoding="utf-8") as file:
-            for line in file:
-                line = line.strip()
-                if line.startswith("[") and line.endswith("]"):
-                    current_unit = line[1:-1]
-                    flashcards[current_unit] = {}
-                elif current_unit and ": " in line:
-                    parts = line.split(": ", 1)
-                    if len(parts) == 2:
-                        word, meaning = parts
-                        flashcards[current_unit][word] = meaning
+        return UnitFileDeck(filename)
     except FileNotFoundError:
         print(f"文件 '{filename}' 未找到。請確認文件存在並重新運行。")
-    return flashcards
+    return {}
 
 def list_units(flashcards):
     units = list(flashcards.keys())
@@ -39,13 +27,12 @@ def study_mode(flashcards, unit):
         print(f"{word}: {meaning}\n")
     input("已完成學習，按 Enter 返回主選單...")
 
-def save_incorrect_answers(incorrect_answers):
+def save_incorrect_answers(incorrect_answers, unit=None):
     if not incorrect_answers:
         return
-    with open("wrong_answers.txt", "a", encoding="utf-8") as f:
-        f.write("\n=== 測驗紀錄 ===\n")
-        for meaning, user_answer, correct_answer in incorrect_answers:
-            f.write(f"解釋: {meaning}, 你的回答: {user_answer}, 正確答案: {correct_answer}\n")
+    lines = [f"\n{format_header(unit)}\n"]
+    lines.extend(format_record(*record) for record in incorrect_answers)
+    append_locked("wrong_answers.txt", "".join(lines))
 
 def quiz_mode(flashcards, unit):
     print(f"\n測驗模式：{unit} (輸入 'home' 返回主頁)")
@@ -73,27 +60,14 @@ def quiz_mode(flashcards, unit):
         print("你答錯的題目：")
         for meaning, user_answer, correct_answer in incorrect_answers:
             print(f"{meaning}: 你的回答：{user_answer}, 正確答案：{correct_answer}")
-        save_incorrect_answers(incorrect_answers)
+        save_incorrect_answers(incorrect_answers, unit)
         print("\n已將錯誤題目記錄至 'wrong_answers.txt'")
     print(f"\n答對率: {correct_answers / total_questions * 100:.2f}%")
     input("按 Enter 返回主選單...")
 
 def review_wrong_answers():
-    try:
-        with open("wrong_answers.txt", "r", encoding="utf-8") as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        print("目前沒有錯誤紀錄。")
-        input("按 Enter 返回主選單...")
-        return
-
-    questions = []
-    for line in lines:
-        if line.startswith("解釋: "):
-            parts = line.strip().split(", ")
-            meaning = parts[0].split(": ")[1]
-            correct_answer = parts[2].split(": ")[1]
-            questions.append((meaning, correct_answer))
+    # 每個錯過的單字只出一次
+    questions = [(meaning, word) for word, meaning, _, _, _ in open_store("wrong_answers.txt").stats()]
 
     if not questions:
         print("目前沒有錯誤紀錄。")
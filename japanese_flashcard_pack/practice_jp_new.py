@@ -1,30 +1,52 @@
 #!/usr/bin/env python3
 import random
-from colorama import Fore, Style
-import unicodedata
 
-def normalize_string(s):
-    return unicodedata.normalize('NFKC', s.strip().lower())
+# 選單要馬上出現：import 這個檔案時只載入標準函式庫，
+# 題庫、錯題索引、排程、colorama 等都在用到的功能裡才 import（python -m japanese_flashcard_pack 也走這裡）
 
 def load_flashcards(filename="flashcards.txt"):
-    flashcards = {}
-    current_unit = None
-
+    from unit_index import UnitFileDeck
+    # 只讀單元索引，單元內容等選到時才從檔案中那一段解析
     try:
-        with open(filename, 'r', encoding="utf-8") as file:
-            for line in file:
-                line = line.strip()
-                if line.startswith("[") and line.endswith("]"):
-                    current_unit = line[1:-1]
-                    flashcards[current_unit] = {}
-                elif current_unit and ": " in line:
-                    parts = line.split(": ", 1)
-                    if len(parts) == 2:
-                        word, meaning = parts
-                        flashcards[current_unit][word] = meaning
+        return UnitFileDeck(filename)
     except FileNotFoundError:
         print(f"文件 '{filename}' 未找到。請確認文件存在並重新運行。")
-    return flashcards
+    return {}
+
+def load_answers(filename="flashcards.txt"):
+    from answers import load_answer_index
+    try:
+        return load_answer_index(filename)
+    except FileNotFoundError:
+        return {}
+
+# 選擇題的干擾選項索引，第一次用到時才建（之後走快取）
+def load_choices(filename="flashcards.txt"):
+    from choices import load_choice_index
+    try:
+        return load_choice_index(filename)
+    except FileNotFoundError:
+        return {}
+
+def normalize_string(s):
+    from answers import normalize_string
+    return normalize_string(s)
+
+def say(color, text):
+    from colorama import Fore, Style
+    print(getattr(Fore, color) + text + Style.RESET_ALL)
+
+# 用預先算好的答案形式批改，答錯時順便指出差在哪裡
+def grade(user_answer, word, forms=None):
+    from answers import check_answer, answer_forms
+    correct, hint = check_answer(user_answer, forms or answer_forms(word))
+    if correct:
+        say("GREEN", "正確！")
+    elif hint:
+        say("RED", f"錯誤！（{hint}）正確答案是：{word}")
+    else:
+        say("RED", f"錯誤！正確答案是：{word}")
+    return correct
 
 def list_units(flashcards):
     units = list(flashcards.keys())
@@ -33,38 +55,42 @@ def list_units(flashcards):
         print(f"{idx}. {unit} (學習/測驗模式)")
     return units
 
+# 單元名稱或編號；沒給時列出單元讓使用者選。找不到時回傳 None
+def pick_unit(flashcards, unit=None):
+    units = list(flashcards.keys())
+    if unit is None:
+        list_units(flashcards)
+        unit = input("\n請輸入單元編號: ").strip()
+    if unit in flashcards:
+        return unit
+    if unit.isdigit() and 1 <= int(unit) <= len(units):
+        return units[int(unit) - 1]
+    print("無效的選擇，請重新選擇。")
+    return None
+
 def study_mode(flashcards, unit):
     print(f"\n學習模式：{unit}")
     for word, meaning in flashcards[unit].items():
         print(f"{word}: {meaning}\n")
     input("已完成學習，按 Enter 返回主選單...")
 
-def save_incorrect_answers(incorrect_answers):
+def save_incorrect_answers(incorrect_answers, unit=None):
+    from wrong_store import format_header, format_record
+    from journal import append_locked
     if not incorrect_answers:
         return
-    with open("wrong_answers.txt", "a", encoding="utf-8", errors="ignore") as f:
-        f.write("\n=== 測驗紀錄 ===\n")
-        for meaning, user_answer, correct_answer in incorrect_answers:
-            # 濾掉奇怪符號
-            clean_user_answer = ''.join(c for c in user_answer if unicodedata.category(c)[0] != "C")
-            f.write(f"解釋: {meaning}, 你的回答: {clean_user_answer}, 正確答案: {correct_answer}\n")
-
-def quiz_mode(flashcards, unit):
-    print(f"\n測驗模式：{unit} (輸入 'home' 返回主頁)")
+    lines = [f"\n{format_header(unit)}\n"]
+    lines.extend(format_record(*record) for record in incorrect_answers)
+    append_locked("wrong_answers.txt", "".join(lines))
 
+# 選題：優先錯題，不夠再從其他題目隨機抽（只抽需要的題數）
+def select_questions(flashcards, unit):
+    from wrong_store import open_store
+    from permutation import LazySample
     flashcards_list = list(flashcards[unit].items())
 
-    # 讀取錯題檔，優先出現
-    priority_words = set()
-    try:
-        with open("wrong_answers.txt", "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith("解釋: "):
-                    parts = line.strip().split(", ")
-                    correct_answer = parts[2].split(": ")[1]
-                    priority_words.add(correct_answer)
-    except FileNotFoundError:
-        pass
+    # 查詢錯題索引，優先出現
+    priority_words = open_store("wrong_answers.txt").missed_among(flashcards[unit])
 
     priority_flashcards = [(w, m) for (w, m) in flashcards_list if w in priority_words]
     normal_flashcards = [(w, m) for (w, m) in flashcards_list if w not in priority_words]
@@ -77,60 +103,151 @@ def quiz_mode(flashcards, unit):
     else:
         num = total_questions
 
-    # 排序：優先錯題
-    selected = priority_flashcards[:]
+    selected = priority_flashcards[:num]
     if len(selected) < num:
-        remaining = [x for x in normal_flashcards if x not in selected]
-        random.shuffle(remaining)
-        selected.extend(remaining[:num - len(selected)])
-    else:
-        selected = selected[:num]
+        selected.extend(LazySample(normal_flashcards, num - len(selected)))
 
     random.shuffle(selected)
+    return selected
+
+def start_session(flashcards, unit, mode):
+    from session_store import start_cli_session
+    return start_cli_session(flashcards[unit], unit, mode, lambda: select_questions(flashcards, unit))
+
+def show_results(selected, correct_answers, incorrect_answers, unit):
+    print("\n測驗結束！")
+    if incorrect_answers:
+        print("你答錯的題目：")
+        for meaning, user_answer, correct_answer in incorrect_answers:
+            print(f"{meaning}: 你的回答：{user_answer}, 正確答案：{correct_answer}")
+        save_incorrect_answers(incorrect_answers, unit)
+        print("\n已將錯誤題目記錄至 'wrong_answers.txt'")
+    print(f"\n答對率: {correct_answers / len(selected) * 100:.2f}%")
+    input("按 Enter 返回主選單...")
+
+def quiz_mode(flashcards, unit, answers=None):
+    print(f"\n測驗模式：{unit} (輸入 'home' 返回主頁)")
+    from scheduler import open_scheduler
+    from journal import log_answer
+    sessions, session_id, selected, start, correct_answers, incorrect_answers = start_session(flashcards, unit, "quiz")
 
     # 開始測驗
+    scheduler = open_scheduler("schedule.db")
+    unit_answers = (answers or {}).get(unit, {})
+
+    for i in range(start, len(selected)):
+        word, meaning = selected[i]
+        user_answer = input(f"解釋：{meaning}\n請輸入對應假名: ").strip()
+        if normalize_string(user_answer) == "home":
+            print("返回主頁...（進度已保存，下次選這個單元可以繼續）")
+            return
+        correct = grade(user_answer, word, unit_answers.get(word))
+        if correct:
+            correct_answers += 1
+        else:
+            incorrect_answers.append((meaning, user_answer, word))
+        scheduler.review(word, correct, meaning, unit)
+        log_answer("answers.log", word, unit, correct)
+        sessions.progress(session_id, i + 1, correct_answers, incorrect_answers)
+        print()
+
+    sessions.finish(session_id)
+    show_results(selected, correct_answers, incorrect_answers, unit)
+
+# 選擇題：看解釋，從 4 個假名裡選；干擾選項來自預先建好的相似卡片索引
+def choice_quiz_mode(flashcards, unit, choices):
+    print(f"\n選擇題模式：{unit} (輸入 'home' 返回主頁)")
+    from scheduler import open_scheduler
+    from journal import log_answer
+    from choices import make_choices
+    sessions, session_id, selected, start, correct_answers, incorrect_answers = start_session(flashcards, unit, "choice")
+
+    scheduler = open_scheduler("schedule.db")
+    neighbors = choices.get(unit, {})
+
+    for i in range(start, len(selected)):
+        word, meaning = selected[i]
+        options, _ = make_choices(word, flashcards[unit], neighbors)
+        print(f"解釋：{meaning}")
+        for idx, option in enumerate(options, start=1):
+            print(f"  {idx}. {option}")
+        user_answer = input(f"請輸入選項 (1-{len(options)}): ").strip()
+        if normalize_string(user_answer) == "home":
+            print("返回主頁...（進度已保存，下次選這個單元可以繼續）")
+            return
+        picked = user_answer
+        if user_answer.isdigit() and 1 <= int(user_answer) <= len(options):
+            picked = options[int(user_answer) - 1]
+        correct = picked == word
+        if correct:
+            say("GREEN", "正確！")
+            correct_answers += 1
+        else:
+            say("RED", f"錯誤！正確答案是：{word}")
+            incorrect_answers.append((meaning, picked, word))
+        scheduler.review(word, correct, meaning, unit)
+        log_answer("answers.log", word, unit, correct)
+        sessions.progress(session_id, i + 1, correct_answers, incorrect_answers)
+        print()
+
+    sessions.finish(session_id)
+    show_results(selected, correct_answers, incorrect_answers, unit)
+
+def due_review_mode(flashcards, answers=None):
+    from scheduler import open_scheduler
+    from journal import log_answer
+    scheduler = open_scheduler("schedule.db")
+    num = input("今日到期複習，輸入要測驗的題數 (或按 Enter 使用 20): ").strip()
+    num = int(num) if num.isdigit() else 20
+
+    # 先出今天到期的卡片，不夠再從題庫補上還沒學過的新卡片
+    selected = scheduler.due(num)
+    for unit, cards in flashcards.items():
+        if len(selected) >= num:
+            break
+        # 每個單元查一次已排程的單字，不是每張卡各查一次
+        known = scheduler.known_words(unit)
+        for word, meaning in cards.items():
+            if word not in known:
+                selected.append((word, meaning, unit))
+                if len(selected) >= num:
+                    break
+
+    if not selected:
+        print("今天沒有到期的卡片。")
+        input("按 Enter 返回主選單...")
+        return
+
+    print("\n今日到期複習模式 (輸入 'home' 返回主頁)")
     correct_answers = 0
     incorrect_answers = []
 
-    for word, meaning in selected:
+    for word, meaning, unit in selected:
         user_answer = input(f"解釋：{meaning}\n請輸入對應假名: ").strip()
         if normalize_string(user_answer) == "home":
             print("返回主頁...")
             return
-        elif normalize_string(user_answer) == normalize_string(word):
-            print(Fore.GREEN + "正確！" + Style.RESET_ALL)
+        correct = grade(user_answer, word, (answers or {}).get(unit, {}).get(word))
+        if correct:
             correct_answers += 1
         else:
-            print(Fore.RED + f"錯誤！正確答案是：{word}" + Style.RESET_ALL)
             incorrect_answers.append((meaning, user_answer, word))
-        print()
+        card = scheduler.review(word, correct, meaning, unit)
+        log_answer("answers.log", word, unit, correct)
+        print(f"下次複習：{card.interval:g} 天後\n" if correct else "")
 
-    print("\n測驗結束！")
+    print("\n複習結束！")
     if incorrect_answers:
-        print("你答錯的題目：")
-        for meaning, user_answer, correct_answer in incorrect_answers:
-            print(f"{meaning}: 你的回答：{user_answer}, 正確答案：{correct_answer}")
         save_incorrect_answers(incorrect_answers)
-        print("\n已將錯誤題目記錄至 'wrong_answers.txt'")
+        print("已將錯誤題目記錄至 'wrong_answers.txt'")
     print(f"\n答對率: {correct_answers / len(selected) * 100:.2f}%")
     input("按 Enter 返回主選單...")
 
 def review_wrong_answers():
-    try:
-        with open("wrong_answers.txt", "r", encoding="utf-8") as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        print("目前沒有錯誤紀錄。")
-        input("按 Enter 返回主選單...")
-        return
-
-    questions = []
-    for line in lines:
-        if line.startswith("解釋: "):
-            parts = line.strip().split(", ")
-            meaning = parts[0].split(": ")[1]
-            correct_answer = parts[2].split(": ")[1]
-            questions.append((meaning, correct_answer))
+    from wrong_store import open_store
+    from journal import log_answer
+    # 每個錯過的單字只出一次
+    questions = [(meaning, word, unit) for word, meaning, unit, _, _ in open_store("wrong_answers.txt").stats()]
 
     if not questions:
         print("目前沒有錯誤紀錄。")
@@ -141,54 +258,88 @@ def review_wrong_answers():
     random.shuffle(questions)
     correct_answers = 0
 
-    for meaning, correct_answer in questions:
+    for meaning, correct_answer, unit in questions:
         user_answer = input(f"解釋：{meaning}\n請輸入對應假名: ").strip()
         if normalize_string(user_answer) == "home":
             print("返回主頁...")
             return
-        elif normalize_string(user_answer) == normalize_string(correct_answer):
-            print(Fore.GREEN + "正確！" + Style.RESET_ALL)
+        correct = grade(user_answer, correct_answer)
+        if correct:
             correct_answers += 1
-        else:
-            print(Fore.RED + f"錯誤！正確答案是：{correct_answer}" + Style.RESET_ALL)
+        log_answer("answers.log", correct_answer, unit, correct)
         print()
 
     print("\n複習結束！")
     print(f"\n答對率: {correct_answers / len(questions) * 100:.2f}%")
     input("按 Enter 返回主選單...")
 
-def main():
-    flashcards = load_flashcards()
-    if not flashcards:
-        print("無法載入卡片資料，請檢查文件內容。")
+# 查某個單字或中文解釋在哪個單元
+def search_mode(filename="flashcards.txt"):
+    from search import load_search_index, search
+    try:
+        index = load_search_index(filename)
+    except FileNotFoundError:
+        print(f"文件 '{filename}' 未找到。")
         return
+    while True:
+        query = input("\n輸入要搜尋的假名或解釋（直接按 Enter 返回）: ").strip()
+        if not query:
+            return
+        results = search(index, query)
+        if not results:
+            print("找不到符合的單字。")
+        for unit, word, meaning in results:
+            print(f"[{unit}] {word}: {meaning}")
+
+def main():
+    # 題庫與答案形式等第一次用到時才載入
+    flashcards = None
+    answers = None
 
     while True:
         print("\n選單：")
         print("1. 單元學習/測驗")
         print("2. 複習錯誤題目")
-        print("3. 退出")
-        choice = input("請輸入選項 (1/2/3): ").strip()
+        print("3. 今日到期複習")
+        print("4. 搜尋單字")
+        print("5. 退出")
+        choice = input("請輸入選項 (1/2/3/4/5): ").strip()
+
+        if choice in ("1", "3"):
+            if flashcards is None:
+                flashcards = load_flashcards()
+                if not flashcards:
+                    print("無法載入卡片資料，請檢查文件內容。")
+                    flashcards = None
+                    continue
+            # 每次選完選項都檢查題庫有沒有被編輯過，不用重新啟動
+            elif flashcards.refresh():
+                answers = None
+                print("\n題庫已更新。")
 
-        if choice == "3":
+        if choice == "5":
             print("已退出。")
             break
         elif choice == "1":
-            units = list_units(flashcards)
-            unit_choice = input("\n請輸入單元編號: ").strip()
-            if unit_choice.isdigit() and 1 <= int(unit_choice) <= len(units):
-                unit = units[int(unit_choice) - 1]
-                mode = input(f"\n你已選擇 {unit}。選擇模式: 1) 學習模式  2) 測驗模式\n請輸入選項 (1/2): ").strip()
+            unit = pick_unit(flashcards)
+            if unit:
+                mode = input(f"\n你已選擇 {unit}。選擇模式: 1) 學習模式  2) 測驗模式  3) 選擇題\n請輸入選項 (1/2/3): ").strip()
                 if mode == "1":
                     study_mode(flashcards, unit)
                 elif mode == "2":
-                    quiz_mode(flashcards, unit)
+                    answers = load_answers() if answers is None else answers
+                    quiz_mode(flashcards, unit, answers)
+                elif mode == "3":
+                    choice_quiz_mode(flashcards, unit, load_choices())
                 else:
                     print("無效選項，返回主選單。")
-            else:
-                print("無效的選擇，請重新選擇。")
         elif choice == "2":
             review_wrong_answers()
+        elif choice == "3":
+            answers = load_answers() if answers is None else answers
+            due_review_mode(flashcards, answers)
+        elif choice == "4":
+            search_mode()
         else:
             print("無效選項，請重新選擇。")
 
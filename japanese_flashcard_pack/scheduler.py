@@ -0,0 +1,291 @@
+import heapq
+import os
+import sqlite3
+import threading
+import time
+
+# SM-2 間隔重複排程。每張卡（以 (單字, 單元) 為 key：同一個單字出現在好幾個單元時各自排程，
+# 複習哪個單元就出哪個單元的卡）記錄 ease、間隔天數、連續答對次數與下次到期時間。
+# 有資料庫時 schedule.db 才是準的：命令列、Streamlit 與其他 worker 共用同一份，
+# review 在同一個寫入交易裡讀出最新的那一列、算完再寫回，不會蓋掉別的 process 的作答；
+# due 直接查 (unit, due) 索引，看得到別的 process 剛排好的卡片。
+# 只在記憶體中運作時（模擬器用）到期順序放在 heap 裡，取下一張是 O(log n)。
+# 沒有單元的卡片在資料庫裡存成空字串，主鍵才不會因為 NULL 而重複。
+
+DAY = 86400
+RELEARN_DELAY = 600  # 答錯後 10 分鐘再出現
+MIN_EASE = 1.3
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    word TEXT NOT NULL,
+    meaning TEXT NOT NULL,
+    unit TEXT NOT NULL DEFAULT '',
+    ease REAL NOT NULL,
+    interval REAL NOT NULL,
+    reps INTEGER NOT NULL,
+    lapses INTEGER NOT NULL,
+    due REAL NOT NULL,
+    PRIMARY KEY (word, unit)
+);
+CREATE INDEX IF NOT EXISTS cards_due ON cards (due);
+CREATE INDEX IF NOT EXISTS cards_unit_due ON cards (unit, due);
+"""
+
+# 舊版以單字為主鍵：換成新表，每個單字沿用原本記錄的單元
+MIGRATE = """
+ALTER TABLE cards RENAME TO cards_v0;
+DROP INDEX IF EXISTS cards_due;
+DROP INDEX IF EXISTS cards_unit_due;
+""" + SCHEMA + """
+INSERT INTO cards SELECT word, meaning, COALESCE(unit, ''), ease, interval, reps, lapses, due FROM cards_v0;
+DROP TABLE cards_v0;
+"""
+
+COLUMNS = "word, meaning, unit, ease, interval, reps, lapses, due"
+
+class Card:
+    __slots__ = ("word", "meaning", "unit", "ease", "interval", "reps", "lapses", "due")
+
+    def __init__(self, word, meaning, unit, ease=2.5, interval=0.0, reps=0, lapses=0, due=0.0):
+        self.word = word
+        self.meaning = meaning
+        self.unit = unit
+        self.ease = ease
+        self.interval = interval
+        self.reps = reps
+        self.lapses = lapses
+        self.due = due
+
+    @classmethod
+    def from_row(cls, row):
+        word, meaning, unit, *rest = row
+        return cls(word, meaning, unit or None, *rest)
+
+    def row(self):
+        return (self.word, self.meaning, self.unit or "", self.ease, self.interval, self.reps, self.lapses, self.due)
+
+# SM-2：quality 0~5，3 以上算答對
+def sm2(card, quality, now):
+    card.ease = max(MIN_EASE, card.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        card.reps = 0
+        card.lapses += 1
+        card.interval = 0.0
+        card.due = now + RELEARN_DELAY
+        return card
+    card.reps += 1
+    if card.reps == 1:
+        card.interval = 1.0
+    elif card.reps == 2:
+        card.interval = 6.0
+    else:
+        card.interval = round(card.interval * card.ease, 2)
+    card.due = now + card.interval * DAY
+    return card
+
+def end_of_today(now=None):
+    t = time.localtime(now)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+class Scheduler:
+    # db_path 為 None 時只在記憶體中運作（模擬器用）
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._cards = {}
+        self._units = {}
+        self._heap = []
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._write(self._migrate)
+
+    def _migrate(self):
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        columns = self._conn.execute("PRAGMA table_info(cards)").fetchall()
+        # 第 6 欄是在主鍵裡的位置；舊版只有 word 在主鍵裡
+        if columns and sum(1 for column in columns if column[5]) == 1:
+            for statement in MIGRATE.split(";"):
+                if statement.strip():
+                    self._conn.execute(statement)
+        else:
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    self._conn.execute(statement)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _one(self, query, params=()):
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()
+
+    def __contains__(self, word):
+        if self._conn is None:
+            return word in self._units
+        return self._one("SELECT 1 FROM cards WHERE word = ? LIMIT 1", (word,)) is not None
+
+    def __len__(self):
+        if self._conn is None:
+            return len(self._cards)
+        return self._one("SELECT COUNT(*) FROM cards")[0]
+
+    # 已經排程的單字；給 unit 時只算這個單元的卡片。一次查完，補新卡片時不用每個單字各查一次
+    def known_words(self, unit=None):
+        if self._conn is None:
+            with self._lock:
+                if unit is None:
+                    return set(self._units)
+                return {word for word, units in self._units.items() if unit in units}
+        sql = "SELECT DISTINCT word FROM cards"
+        args = ()
+        if unit is not None:
+            sql = "SELECT word FROM cards WHERE unit = ?"
+            args = (unit,)
+        with self._lock:
+            return {row[0] for row in self._conn.execute(sql, args)}
+
+    # unit 為 None 時取這個單字任一個單元的卡片（最早到期的）
+    def get(self, word, unit=None):
+        if self._conn is None:
+            with self._lock:
+                return self._find(word, unit)
+        if unit is None:
+            row = self._one(f"SELECT {COLUMNS} FROM cards WHERE word = ? ORDER BY due LIMIT 1", (word,))
+        else:
+            row = self._one(f"SELECT {COLUMNS} FROM cards WHERE word = ? AND unit = ?", (word, unit))
+        return Card.from_row(row) if row else None
+
+    def _find(self, word, unit):
+        if unit is not None:
+            return self._cards.get((word, unit))
+        cards = [self._cards[(word, u)] for u in self._units.get(word, ())]
+        return min(cards, key=lambda card: card.due, default=None)
+
+    def _store(self, card):
+        self._cards[(card.word, card.unit)] = card
+        self._units.setdefault(card.word, set()).add(card.unit)
+        self._push(card)
+
+    def _push(self, card):
+        heapq.heappush(self._heap, (card.due, card.word, card.unit or ""))
+        # 舊的 heap 項目用延遲刪除，累積太多時整理一次
+        if len(self._heap) > 2 * len(self._cards) + 64:
+            self._heap = [(c.due, c.word, c.unit or "") for c in self._cards.values()]
+            heapq.heapify(self._heap)
+
+    # 寫入交易：BEGIN IMMEDIATE 讓多個 process 的讀出—改寫—寫回一個接一個做
+    def _write(self, func, *args):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    # 新卡片立即到期；已排程的卡片不受影響
+    def add(self, cards, now=None):
+        now = time.time() if now is None else now
+        if self._conn is not None:
+            rows = [Card(word, meaning, unit, due=now).row() for word, meaning, unit in cards]
+            return self._write(lambda: self._conn.executemany(
+                f"INSERT OR IGNORE INTO cards ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows).rowcount)
+        added = 0
+        with self._lock:
+            for word, meaning, unit in cards:
+                if (word, unit) not in self._cards:
+                    self._store(Card(word, meaning, unit, due=now))
+                    added += 1
+        return added
+
+    # 作答記在這個單元的卡片上；unit 為 None 時記在這個單字已有的卡片（get 的規則）
+    def review(self, word, correct, meaning=None, unit=None, now=None):
+        now = time.time() if now is None else now
+        if self._conn is not None:
+            return self._write(self._review_row, word, correct, meaning, unit, now)
+        with self._lock:
+            card = self._find(word, unit) or Card(word, meaning or "", unit, due=now)
+            sm2(card, 4 if correct else 1, now)
+            self._store(card)
+        return card
+
+    def _review_row(self, word, correct, meaning, unit, now):
+        if unit is None:
+            query, args = f"SELECT {COLUMNS} FROM cards WHERE word = ? ORDER BY due LIMIT 1", (word,)
+        else:
+            query, args = f"SELECT {COLUMNS} FROM cards WHERE word = ? AND unit = ?", (word, unit)
+        row = self._conn.execute(query, args).fetchone()
+        card = Card.from_row(row) if row else Card(word, meaning or "", unit, due=now)
+        sm2(card, 4 if correct else 1, now)
+        self._conn.execute(f"INSERT OR REPLACE INTO cards ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", card.row())
+        return card
+
+    def _pop_valid(self):
+        while self._heap:
+            due, word, unit = heapq.heappop(self._heap)
+            card = self._cards.get((word, unit or None))
+            if card is not None and card.due == due:
+                return card
+        return None
+
+    # 最多 limit 張在 until 之前到期的卡片（最早到期的先）；給 unit 時只出這個單元的。
+    # 資料庫走 (unit, due) 索引；記憶體中的 heap 為 O(limit·log n)（有 unit 時還要跳過別的單元）
+    def due(self, limit, until=None, unit=None):
+        until = end_of_today() if until is None else until
+        if self._conn is not None:
+            sql = "SELECT word, meaning, NULLIF(unit, '') FROM cards WHERE due <= ?"
+            args = [until]
+            if unit is not None:
+                sql += " AND unit = ?"
+                args.append(unit)
+            sql += " ORDER BY due LIMIT ?"
+            args.append(limit)
+            with self._lock:
+                return [tuple(row) for row in self._conn.execute(sql, args)]
+        picked = []
+        skipped = []
+        with self._lock:
+            while len(picked) < limit:
+                card = self._pop_valid()
+                if card is None:
+                    break
+                if card.due > until:
+                    skipped.append(card)
+                    break
+                (picked if unit is None or card.unit == unit else skipped).append(card)
+            for card in picked + skipped:
+                heapq.heappush(self._heap, (card.due, card.word, card.unit or ""))
+        return [(c.word, c.meaning, c.unit) for c in picked]
+
+    def next_due(self):
+        if self._conn is not None:
+            row = self._one("SELECT due, word FROM cards ORDER BY due LIMIT 1")
+            return tuple(row) if row else None
+        with self._lock:
+            card = self._pop_valid()
+            if card is None:
+                return None
+            heapq.heappush(self._heap, (card.due, card.word, card.unit or ""))
+            return card.due, card.word
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def open_scheduler(db_path):
+    key = os.path.abspath(db_path)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = Scheduler(key)
+            _schedulers[key] = scheduler
+        return scheduler
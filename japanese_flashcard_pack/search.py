@@ -0,0 +1,149 @@
+import bisect
+
+from deck_cache import load_cached_merged, load_cached_units, load_deck
+from answers import normalize_string, to_hiragana
+
+# 單字與解釋的全文搜尋索引，和題庫快取放在一起。
+# 假名單字索引單字元、二字組與前 PREFIX 個字的前綴（"^" 開頭）；中文解釋索引單字元與二字組。
+# 每個單元各自建一個分片（tag "search-shards"），題庫變更時只重建內容有變的單元。
+# 另外有一份小的路由表（tag "search-routes"）：字元/二字組 → 出現過的單元，
+# 查詢只解開、只查可能有結果的分片，成本和符合的單元數有關，不是和單元總數。
+# 分片內的 posting 是遞增的題號，長查詢取交集時用二分搜尋往前跳，不用建 set。
+
+PREFIX = 3
+LIMIT = 50
+
+def _fold(text):
+    return to_hiragana(normalize_string(text))
+
+def _grams(text):
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+def _add(postings, grams, i):
+    for gram in grams:
+        postings.setdefault(gram, []).append(i)
+
+def build_shard(unit, cards):
+    words = tuple(cards)
+    meanings = tuple(cards[w] for w in words)
+    keys = tuple((_fold(w), _fold(m)) for w, m in zip(words, meanings))
+    word_postings = {}
+    meaning_postings = {}
+    for i, (word, meaning) in enumerate(keys):
+        grams = _grams(word)
+        grams.update("^" + word[:n] for n in range(1, min(PREFIX, len(word)) + 1))
+        _add(word_postings, grams, i)
+        _add(meaning_postings, _grams(meaning), i)
+    exact = {}
+    for i, (word, _) in enumerate(keys):
+        exact.setdefault(word, []).append(i)
+    return {"words": words, "meanings": meanings, "keys": keys,
+            "word": word_postings, "meaning": meaning_postings, "exact": exact}
+
+# 分片裡出現過的所有 key（含 "^" 前綴，多出來的 key 不影響結果）
+def _shard_grams(shard):
+    return set(shard["word"]).union(shard["meaning"])
+
+# {字元或二字組: (單元, ...)}；有舊表時拿掉內容變了或被刪掉的單元，只補上有變的單元
+def _update_routes(shards, routes, previous, digests):
+    changed = [unit for unit in shards if routes is None or previous.get(unit) != digests.get(unit)]
+    merged = {}
+    if routes is not None:
+        stale = {unit for unit in previous if previous[unit] != digests.get(unit)}
+        for gram, units in routes.items():
+            kept = [unit for unit in units if unit not in stale] if stale else list(units)
+            if kept:
+                merged[gram] = kept
+    for unit in changed:
+        for gram in _shard_grams(shards[unit]):
+            merged.setdefault(gram, []).append(unit)
+    return {gram: tuple(units) for gram, units in merged.items()}
+
+class SearchIndex:
+    def __init__(self, shards, routes):
+        self.shards = shards
+        self.routes = routes
+        self.order = {unit: i for i, unit in enumerate(shards)}
+
+# 分片（{單元: 分片}，用到時才從快取解開）和路由表都從同一版題庫建
+def load_search_index(path, deck=None):
+    deck = deck or load_deck(path)
+    shards = load_cached_units(path, build_shard, tag="search-shards", deck=deck)
+    routes = load_cached_merged(
+        path, lambda old, previous, digests: _update_routes(shards, old, previous, digests),
+        tag="search-routes", deck=deck)
+    return SearchIndex(shards, routes)
+
+# 遞增序列的交集：從最短的開始，其他的用二分搜尋從上次的位置往前找
+def _intersect(lists):
+    lists.sort(key=len)
+    first, others = lists[0], lists[1:]
+    positions = [0] * len(others)
+    for i in first:
+        for k, other in enumerate(others):
+            j = bisect.bisect_left(other, i, positions[k])
+            positions[k] = j
+            if j == len(other) or other[j] != i:
+                break
+        else:
+            yield i
+
+# 一兩個字直接就是 posting；更長的取各二字組的交集，再確認真的包含
+def _containing(postings, query, field, keys):
+    if len(query) <= 2:
+        return postings.get(query, ())
+    lists = []
+    for gram in (query[i:i + 2] for i in range(len(query) - 1)):
+        ids = postings.get(gram)
+        if not ids:
+            return ()
+        lists.append(ids)
+    return (i for i in _intersect(lists) if query in keys[i][field])
+
+def _ranked(shard, query, tier):
+    keys = shard["keys"]
+    if tier == 0:
+        return shard["exact"].get(query, ())
+    if tier == 1:
+        if len(query) <= PREFIX:
+            return shard["word"].get("^" + query, ())
+        return (i for i in _containing(shard["word"], query, 0, keys) if keys[i][0].startswith(query))
+    if tier == 2:
+        return _containing(shard["word"], query, 0, keys)
+    return _containing(shard["meaning"], query, 1, keys)
+
+# 每個查詢用到的字元/二字組都出現過的單元，依題庫順序
+def _candidate_units(index, query):
+    grams = {query} if len(query) <= 2 else {query[i:i + 2] for i in range(len(query) - 1)}
+    candidates = None
+    for gram in sorted(grams, key=lambda g: len(index.routes.get(g, ()))):
+        units = index.routes.get(gram)
+        if not units:
+            return []
+        candidates = set(units) if candidates is None else candidates.intersection(units)
+        if not candidates:
+            return []
+    return sorted(candidates, key=index.order.__getitem__)
+
+# 回傳 [(單元, 單字, 解釋)]：單字完全相同 → 單字開頭相同 → 單字包含 → 解釋包含，
+# 依序產生、湊滿 limit 筆就停，常見字的查詢也不用掃完整個 posting
+def search(index, query, limit=LIMIT):
+    query = _fold(query)
+    if not query:
+        return []
+    units = _candidate_units(index, query)
+    results = []
+    seen = set()
+    for tier in range(4):
+        for unit in units:
+            shard = index.shards[unit]
+            for i in _ranked(shard, query, tier):
+                if (unit, i) in seen:
+                    continue
+                seen.add((unit, i))
+                results.append((unit, shard["words"][i], shard["meanings"][i]))
+                if len(results) >= limit:
+                    return results
+    return results
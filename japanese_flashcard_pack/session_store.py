@@ -0,0 +1,245 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# 進行中的測驗（題目、第幾題、答對數、答錯的題目）存在 SQLite（WAL）裡，
+# 重新整理網頁、程式當掉或重新部署後都能從同一題接著考。
+# 每答一題只是把最新進度放進佇列，由單一背景執行緒累積一小段時間後整批寫入，
+# 同一個 session 在這段時間內的多次進度只寫最後一次；作答的那一端不用等磁碟。
+# 最多遺失最後 flush_interval 秒的進度，退出程式時會先寫完。
+# 重新啟動時不預先載入任何 session，用主鍵或 (status, owner) 索引查需要的那一筆，
+# 開著的 session 再多，恢復一筆也只是一次索引查詢。
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    owner TEXT,
+    unit TEXT,
+    mode TEXT,
+    whole_unit INTEGER NOT NULL DEFAULT 0,
+    questions TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    idx INTEGER NOT NULL DEFAULT 0,
+    score INTEGER NOT NULL DEFAULT 0,
+    wrongs TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL DEFAULT 'open',
+    started REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_open ON sessions (status, owner, updated);
+"""
+
+SUMMARY = "id, owner, unit, mode, total, idx, score, updated"
+
+def _row(columns, values):
+    return dict(zip(columns, values))
+
+# 題目展開成 (JSON, 題數)；展開失敗只略過這個 session，同一批的其他紀錄照寫
+def _encode_questions(session_id, items):
+    try:
+        items = [list(q) for q in items]
+        return json.dumps(items, ensure_ascii=False), len(items)
+    except Exception:
+        log.exception("無法寫入 session %s 的題目", session_id)
+        return None
+
+class SessionStore:
+    def __init__(self, db_path, flush_interval=0.2):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="session-store", daemon=True)
+        self._thread.start()
+
+    # questions 可以是 LazySample、CardView 等序列，在背景執行緒才展開成 JSON
+    def start(self, session_id, questions, unit=None, mode=None, owner=None, whole_unit=False, now=None):
+        now = time.time() if now is None else now
+        self._queue.put(("start", session_id, (owner, unit, mode, int(whole_unit), questions, now)))
+
+    # 題目被換掉時（例如題庫熱更新後對齊新版本）重寫題目
+    def set_questions(self, session_id, questions):
+        self._queue.put(("questions", session_id, (questions,)))
+
+    def progress(self, session_id, idx, score, wrongs, now=None):
+        now = time.time() if now is None else now
+        self._queue.put(("progress", session_id, (idx, score, list(wrongs), now)))
+
+    # status：done 為考完，closed 為中途放棄；兩者都不會再被列為可繼續
+    def finish(self, session_id, status="done", now=None):
+        now = time.time() if now is None else now
+        self._queue.put(("status", session_id, (status, now)))
+
+    def _drain(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._drain()
+            try:
+                self._write(batch)
+            except Exception:
+                # 寫不進去就放棄這批並記下原因；背景執行緒掛掉的話每個呼叫 flush() 的頁面都會卡住
+                log.exception("測驗進度寫入失敗，略過 %d 筆", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        # 依 start → questions → progress → status 的順序寫；進度與狀態只留每個 session 的最後一筆
+        starts = []
+        questions = {}
+        progress = {}
+        status = {}
+        for kind, session_id, args in batch:
+            if kind == "start":
+                owner, unit, mode, whole_unit, items, now = args
+                encoded = _encode_questions(session_id, items)
+                if encoded is None:
+                    continue
+                starts.append((session_id, owner, unit, mode, whole_unit, *encoded, now, now))
+                questions.pop(session_id, None)
+                progress.pop(session_id, None)
+                status.pop(session_id, None)
+            elif kind == "questions":
+                questions[session_id] = args[0]
+            elif kind == "progress":
+                progress[session_id] = args
+            else:
+                status[session_id] = args
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sessions (id, owner, unit, mode, whole_unit, questions, total, started, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", starts)
+            for session_id, items in questions.items():
+                encoded = _encode_questions(session_id, items)
+                if encoded is not None:
+                    self._conn.execute("UPDATE sessions SET questions = ?, total = ? WHERE id = ?",
+                                       (*encoded, session_id))
+            self._conn.executemany(
+                "UPDATE sessions SET idx = ?, score = ?, wrongs = ?, updated = ? WHERE id = ?",
+                [(idx, score, json.dumps(wrongs, ensure_ascii=False), now, session_id)
+                 for session_id, (idx, score, wrongs, now) in progress.items()])
+            self._conn.executemany("UPDATE sessions SET status = ?, updated = ? WHERE id = ?",
+                                   [(s, now, session_id) for session_id, (s, now) in status.items()])
+
+    # 等佇列中的進度都寫完
+    def flush(self):
+        self._queue.join()
+
+    # 整個 session，questions 與 wrongs 為 tuple 清單；找不到時為 None
+    def get(self, session_id):
+        self.flush()
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
+            values = cursor.fetchone()
+        if values is None:
+            return None
+        session = _row([c[0] for c in cursor.description], values)
+        session["questions"] = [tuple(q) for q in json.loads(session["questions"])]
+        session["wrongs"] = [tuple(w) for w in json.loads(session["wrongs"])]
+        session["whole_unit"] = bool(session["whole_unit"])
+        return session
+
+    # 還沒考完的 session 摘要（不含題目），最近作答的在前
+    def open_sessions(self, owner=None, unit=None, mode=None, limit=20):
+        self.flush()
+        sql = f"SELECT {SUMMARY} FROM sessions WHERE status = 'open'"
+        args = []
+        if owner is not None:
+            sql += " AND owner = ?"
+            args.append(owner)
+        if unit is not None:
+            sql += " AND unit = ?"
+            args.append(unit)
+        if mode is not None:
+            sql += " AND mode = ?"
+            args.append(mode)
+        sql += " ORDER BY updated DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            cursor = self._conn.execute(sql, args)
+            rows = cursor.fetchall()
+        columns = [c[0] for c in cursor.description]
+        return [_row(columns, values) for values in rows]
+
+    # 刪掉 max_age 秒沒動過的 session（含沒考完的）
+    def prune(self, max_age=30 * 86400, now=None):
+        now = time.time() if now is None else now
+        self.flush()
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM sessions WHERE updated < ?", (now - max_age,)).rowcount
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def open_session_store(db_path):
+    key = os.path.abspath(db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = SessionStore(key)
+            _stores[key] = store
+        return store
+
+def cli_owner():
+    import getpass
+    try:
+        return f"cli:{getpass.getuser()}"
+    except (KeyError, OSError):
+        return "cli"
+
+# 命令列版共用：同一個單元、同一種模式上次沒考完的話問要不要接著考，否則用 new_questions() 出新題。
+# 回傳 (sessions, session_id, 題目, 從第幾題開始, 答對數, 答錯的題目)
+def start_cli_session(cards, unit, mode, new_questions, db_path="sessions.db", ask=input):
+    import uuid
+    sessions = open_session_store(db_path)
+    owner = cli_owner()
+    for summary in sessions.open_sessions(owner, unit, mode, limit=1):
+        answer = ask(f"上次的測驗還沒考完（已答 {summary['idx']}/{summary['total']} 題），要繼續嗎？(Y/n): ")
+        if answer.strip().lower() in ("n", "no"):
+            sessions.finish(summary["id"], "closed")
+            break
+        session = sessions.get(summary["id"])
+        # 題庫在這段期間被編輯過的話，還沒出的題目對齊目前的內容
+        idx = session["idx"]
+        questions = session["questions"]
+        remaining = [(w, cards[w]) for w, _ in questions[idx:] if w in cards]
+        if remaining != questions[idx:]:
+            questions = questions[:idx] + remaining
+            sessions.set_questions(session["id"], questions)
+        return sessions, session["id"], questions, idx, session["score"], session["wrongs"]
+    selected = new_questions()
+    session_id = uuid.uuid4().hex
+    sessions.start(session_id, selected, unit, mode, owner=owner)
+    return sessions, session_id, selected, 0, 0, []
+
+@atexit.register
+def _flush_all():
+    for store in list(_stores.values()):
+        store.flush()
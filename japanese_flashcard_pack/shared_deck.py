@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# 多個 worker 共用同一份題庫：python shared_deck.py publish flashcards.txt
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from card_store import CardStore, CardView
+from deck_cache import load_deck
+
+# 一個 loader process 把 CardStore 寫成唯讀的平面格式（整數陣列 + UTF-8 字串區），
+# 各 worker 用 mmap 掛上去直接讀，不解析也不複製，頁面由作業系統在 process 之間共用，
+# 所以 worker 越多總 RSS 也幾乎不變，啟動時間也和題庫大小無關。
+# 重新發佈時寫到暫存檔再 os.replace，已經掛上舊版的 worker 仍可安全讀完。
+
+MAGIC = b"FCDECK01"
+HEADER = struct.Struct("<8sIIIII")
+
+def default_segment_path(deck_path):
+    folder = "/dev/shm" if os.path.isdir("/dev/shm") else os.path.dirname(os.path.abspath(deck_path))
+    key = hashlib.blake2b(os.path.abspath(deck_path).encode("utf-8"), digest_size=6).hexdigest()
+    return os.path.join(folder, f"{os.path.basename(deck_path)}.{key}.shared")
+
+def _pad(f):
+    f.write(b"\0" * (-f.tell() % 8))
+
+# digests：各單元的內容雜湊（deck_cache），worker 熱更新時靠它找出有變的單元
+def publish(store, segment_path, digests=None):
+    blobs = [store.strings[i].encode("utf-8") for i in range(len(store.strings))]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    meta = json.dumps({
+        "units": list(store.unit_names),
+        "extra_units": {str(cid): list(units) for cid, units in store.extra_units.items()},
+        "digests": digests or {},
+    }, ensure_ascii=False).encode("utf-8")
+
+    tmp = f"{segment_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(blobs), len(store), len(store.unit_names), len(store.members), len(meta)))
+        _pad(f)
+        for values in (offsets, store.card_word, store.card_meaning, store.card_unit,
+                       store.unit_offsets, store.members):
+            # 和讀取端的 memoryview.cast("I") 一樣用本機位元組序
+            f.write(array("I", values).tobytes())
+            _pad(f)
+        f.write(meta)
+        _pad(f)
+        f.writelines(blobs)
+    os.replace(tmp, segment_path)
+
+# 卡片和單元雜湊來自同一次讀取
+def publish_deck(deck_path, segment_path):
+    flashcards, signature = load_deck(deck_path)
+    publish(CardStore.from_flashcards(flashcards), segment_path, signature.get("units", {}))
+
+# 和 CardStore 相同的讀取介面，資料全部在 mmap 上
+class SharedDeck:
+    def __init__(self, segment_path):
+        self.segment_path = segment_path
+        with open(segment_path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_strings, n_cards, n_units, n_members, meta_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是題庫共享檔：{segment_path}")
+        view = memoryview(self._mm)
+        pos = HEADER.size + (-HEADER.size % 8)
+
+        def take(count):
+            nonlocal pos
+            section = view[pos:pos + 4 * count].cast("I")
+            pos += 4 * count + (-(4 * count) % 8)
+            return section
+
+        self._string_offsets = take(n_strings + 1)
+        self.card_word = take(n_cards)
+        self.card_meaning = take(n_cards)
+        self.card_unit = take(n_cards)
+        self.unit_offsets = take(n_units + 1)
+        self.members = take(n_members)
+        meta = json.loads(bytes(view[pos:pos + meta_len]).decode("utf-8"))
+        pos += meta_len + (-meta_len % 8)
+        self._blob = pos
+        self.unit_names = tuple(meta["units"])
+        self._unit_pos = {name: i for i, name in enumerate(self.unit_names)}
+        self.extra_units = {int(cid): tuple(units) for cid, units in meta["extra_units"].items()}
+        self.unit_digests = meta.get("digests", {})
+
+    def _string(self, sid):
+        start = self._blob + self._string_offsets[sid]
+        end = self._blob + self._string_offsets[sid + 1]
+        return self._mm[start:end].decode("utf-8")
+
+    def __len__(self):
+        return len(self.card_word)
+
+    def word(self, cid):
+        return self._string(self.card_word[cid])
+
+    def meaning(self, cid):
+        return self._string(self.card_meaning[cid])
+
+    def card(self, cid):
+        return self.word(cid), self.meaning(cid)
+
+    @property
+    def units(self):
+        return self.unit_names
+
+    def unit_ids(self, unit):
+        pos = self._unit_pos[unit]
+        return self.members[self.unit_offsets[pos]:self.unit_offsets[pos + 1]]
+
+    def unit_size(self, unit):
+        pos = self._unit_pos[unit]
+        return self.unit_offsets[pos + 1] - self.unit_offsets[pos]
+
+    def units_of(self, cid):
+        positions = (self.card_unit[cid],) + self.extra_units.get(cid, ())
+        return tuple(self.unit_names[p] for p in positions)
+
+    def view(self, ids):
+        return CardView(self, ids)
+
+    # 共享檔被換成新版本時為 True，呼叫端重新 SharedDeck(path) 即可
+    def stale(self):
+        try:
+            return os.stat(self.segment_path).st_ino != self.inode
+        except OSError:
+            return False
+
+# loader process：發佈一次後持續監看題庫，有變更就重新發佈
+def serve(deck_path, segment_path, poll_interval=2.0):
+    signature = None
+    while True:
+        st = os.stat(deck_path)
+        if (st.st_size, st.st_mtime_ns) != signature:
+            signature = (st.st_size, st.st_mtime_ns)
+            start = time.perf_counter()
+            publish_deck(deck_path, segment_path)
+            print(f"已發佈 {segment_path}（{time.perf_counter() - start:.2f} 秒）", flush=True)
+        time.sleep(poll_interval)
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] != "publish":
+        print("用法：python shared_deck.py publish <flashcards.txt> [共享檔路徑]")
+        return
+    deck_path = os.path.abspath(sys.argv[2])
+    segment_path = sys.argv[3] if len(sys.argv) > 3 else default_segment_path(deck_path)
+    print(f"worker 請設定 FLASHCARD_SHARED_DECK={segment_path}")
+    serve(deck_path, segment_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 套件裡的模組彼此用平的 import，測試也一樣
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PACKAGE_DIR not in sys.path:
+    sys.path.insert(0, PACKAGE_DIR)
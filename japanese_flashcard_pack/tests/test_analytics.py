@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from analytics import Analytics, _day
+
+DAY = 86400
+T0 = 1_700_000_000
+
+# (時間, 答對, 單元, 單字)
+FIRST = [
+    (T0, 1, "第一課", "ねこ"),
+    (T0 + 10, 0, "第一課", "いぬ"),
+    (T0 + 20, 1, "第一課", "いぬ"),
+    (T0 + DAY, 0, "第二課", "さかな"),
+    (T0 + DAY + 5, 1, "第二課", "ねこ"),
+]
+MORE = [
+    (T0 + 2 * DAY, 1, "第二課", "さかな"),
+    (T0 + 2 * DAY + 1, 1, "第三課", "とり"),
+    (T0 + 2 * DAY + 2, 0, "第一課", "いぬ"),
+]
+
+def append(path, rows):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(f"{when}\t{ok}\t{unit}\t{word}\n" for when, ok, unit, word in rows)
+
+@pytest.fixture
+def log(tmp_path):
+    path = str(tmp_path / "answers.log")
+    append(path, FIRST)
+    return path
+
+def word_stats(engine):
+    return {w: (int(engine.word_attempts[i]), int(engine.word_correct[i]), engine.units[engine.word_unit[i]])
+            for i, w in enumerate(engine.words)}
+
+def unit_stats(engine):
+    return {u: (int(engine.unit_attempts[i]), int(engine.unit_correct[i])) for i, u in enumerate(engine.units)}
+
+def test_fold_counts(log):
+    engine = Analytics(log)
+    assert engine.sync() == 5
+    assert engine.sync() == 0
+    # 單字算在最後一次作答的單元
+    assert word_stats(engine) == {"ねこ": (2, 2, "第二課"), "いぬ": (2, 1, "第一課"), "さかな": (1, 0, "第二課")}
+    assert unit_stats(engine) == {"第一課": (3, 2), "第二課": (2, 1)}
+    assert engine.totals() == (5, 3, 3)
+    assert engine.unit_mastery(min_attempts=2) == [("第一課", 3, 2 / 3, 1, 0), ("第二課", 2, 0.5, 2, 1)]
+    assert engine.hardest(min_attempts=1)[0][:3] == ("さかな", "第二課", 1)
+    days, attempts, correct = engine.daily(today=T0 + DAY)
+    assert days.tolist() == [_day(T0), _day(T0) + 1]
+    assert (attempts.tolist(), correct.tolist()) == ([3, 2], [2, 1])
+
+def test_partial_line_waits(log):
+    with open(log, "a", encoding="utf-8") as f:
+        f.write(f"{T0 + 30}\t1\t第一課\tね")
+    engine = Analytics(log)
+    assert engine.sync() == 5
+    with open(log, "a", encoding="utf-8") as f:
+        f.write("こ\n")
+    assert engine.sync() == 1
+    # 補進來的紀錄比較舊，不會蓋掉最後作答的單元
+    assert word_stats(engine)["ねこ"] == (3, 3, "第二課")
+
+def arrays(engine):
+    names = ("word_attempts", "word_correct", "word_last", "word_unit", "unit_attempts", "unit_correct",
+             "day_attempts", "day_correct")
+    return engine.words, engine.units, engine.first_day, engine.offset, \
+        [getattr(engine, name).tolist() for name in names]
+
+def test_incremental_matches_full_rebuild(log, tmp_path):
+    engine = Analytics(log)
+    engine.sync()
+    engine.save()
+    append(log, MORE)
+    # 從快照接著累加，只讀新增的行
+    resumed = Analytics(log)
+    assert resumed.offset == engine.offset
+    assert resumed.sync() == len(MORE)
+    full = Analytics(log, str(tmp_path / "fresh.npz"))
+    assert full.sync() == len(FIRST) + len(MORE)
+    assert arrays(resumed) == arrays(full)
+    assert word_stats(resumed)["いぬ"] == (3, 1, "第一課")
+    assert unit_stats(resumed)["第三課"] == (1, 1)
+
+def test_earlier_day_pads_history(log, tmp_path):
+    engine = Analytics(log)
+    engine.sync()
+    append(log, [(T0 - 2 * DAY, 1, "第一課", "ねこ")])
+    engine.sync()
+    full = Analytics(log, str(tmp_path / "fresh.npz"))
+    full.sync()
+    assert arrays(engine) == arrays(full)
+    assert engine.first_day == _day(T0 - 2 * DAY)
+
+def test_rewritten_log_starts_over(log):
+    engine = Analytics(log)
+    engine.sync()
+    engine.save()
+    with open(log, "w", encoding="utf-8") as f:
+        f.write("")
+    append(log, MORE[:1])
+    engine = Analytics(log)
+    assert engine.sync() == 1
+    assert engine.totals() == (1, 1, 1)
+    assert np.array_equal(engine.unit_attempts, [1])
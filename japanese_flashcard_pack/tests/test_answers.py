@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from answers import answer_forms, bounded_levenshtein, char_masks, check_answer, check_meaning, expand_meaning
+
+def levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+    return row[-1]
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("", "", 0), ("", "ねこ", 2), ("ねこ", "", 2), ("ねこ", "ねこ", 0),
+    ("ねこ", "ねご", 1), ("きって", "きて", 1), ("さかな", "なかさ", 2), ("kitten", "sitting", 3),
+])
+def test_known_distances(a, b, expected):
+    assert bounded_levenshtein(a, b, 10) == expected
+
+def test_matches_dynamic_programming():
+    rng = random.Random(0)
+    alphabet = "あいうかきっゃ"
+    for _ in range(2000):
+        a = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        b = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        limit = rng.randint(0, 4)
+        assert bounded_levenshtein(a, b, limit) == min(levenshtein(a, b), limit + 1), (a, b, limit)
+
+def test_long_pattern_uses_big_masks():
+    # 超過 64 個字也要正確（Python 整數沒有位元數上限）
+    a = "あいうえお" * 30
+    b = a[:70] + "か" + a[71:]
+    assert bounded_levenshtein(a, b, 2, char_masks(a)) == 1
+
+@pytest.mark.parametrize("user, answer, correct, hint", [
+    ("ねこ", "ねこ", True, None),
+    ("ネコ", "ねこ", True, None),
+    ("  ねこ ", "ねこ", True, None),
+    ("かき", "かぎ", False, "少了濁音（゛）"),
+    ("はん", "ぱん", False, "少了半濁音（゜）"),
+    ("ばん", "ぱん", False, "少了半濁音（゜）"),
+    ("がき", "かき", False, "濁音／半濁音標錯"),
+    ("きつて", "きって", False, "小字假名（っゃゅょ）錯誤"),
+    ("さかなや", "さかな", False, "拼字接近，差 1 個字"),
+    ("いぬ", "さかな", False, None),
+    ("", "ねこ", False, None),
+])
+def test_check_answer_hints(user, answer, correct, hint):
+    assert check_answer(user, answer_forms(answer)) == (correct, hint)
+
+@pytest.mark.parametrize("meaning, expected", [
+    # 括號裡是註解：只接受完整寫法和拿掉括號的寫法
+    ("非常（口語）", {"非常", "非常(口語)"}),
+    ("好吃（的）", {"好吃", "好吃(的)"}),
+    ("那邊 (距離遠)", {"那邊", "那邊 (距離遠)"}),
+    ("那邊（禮貌型，靠對方）", {"那邊", "那邊(禮貌型,靠對方)"}),
+    # 括號裡列了好幾個說法
+    ("激（強烈、劇烈）", {"激", "強烈", "劇烈", "激(強烈、劇烈)"}),
+    ("きく（聞く／聽）", {"きく", "聞く", "聽", "きく(聞く/聽)"}),
+    ("涙／眼淚", {"涙", "眼淚", "涙/眼淚"}),
+])
+def test_expand_meaning(meaning, expected):
+    assert expand_meaning(meaning) == expected
+
+def test_annotation_is_not_an_answer():
+    accepted = expand_meaning("非常（關西腔）")
+    assert check_meaning(" 非常 ", accepted)
+    assert not check_meaning("關西腔", accepted)
@@ -0,0 +1,32 @@
+import csv
+
+import batch_grade
+from batch_grade import grade_chunk, read_chunks
+
+def write_sheet(path, rows, header=True):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        if header:
+            writer.writerow(["student", "meaning", "user_answer", "correct_answer"])
+        writer.writerows(rows)
+
+def test_quoted_newlines_stay_in_one_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_grade, "CHUNK", 3)
+    path = str(tmp_path / "sheet.csv")
+    rows = [[f"s{i % 2}", f"第 {i} 題\n\"貓\"", "ねこ" if i % 3 else "ねご", "ねこ"] for i in range(10)]
+    write_sheet(path, rows)
+    chunks = list(read_chunks(path))
+    assert len(chunks) > 1
+    assert [row for chunk in chunks for row in csv.reader(chunk[3])] == rows
+    students = {}
+    for chunk in chunks:
+        for who, (count, correct) in grade_chunk(*chunk)[0].items():
+            students[who] = [a + b for a, b in zip(students.get(who, [0, 0]), (count, correct))]
+    assert students == {"s0": [5, 3], "s1": [5, 3]}
+
+def test_sheet_without_header(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_grade, "CHUNK", 1)
+    path = str(tmp_path / "sheet.csv")
+    rows = [[f"貓\n第 {i} 題", "ねこ", "ねこ"] for i in range(3)]
+    write_sheet(path, rows, header=False)
+    assert [row for chunk in read_chunks(path) for row in csv.reader(chunk[3])] == rows
@@ -0,0 +1,74 @@
+import pickle
+
+import pytest
+
+from card_store import CardStore, load_card_store
+from deck_cache import load_deck
+from shared_deck import SharedDeck, publish, publish_deck
+
+FLASHCARDS = {
+    "第一課": {"ねこ": "貓", "いぬ": "狗", "ひと": "人"},
+    # 和第一課相同的卡只存一份；同一個單字不同解釋是另一張卡
+    "第二課": {"ねこ": "貓", "ひと": "人們", "さかな": "魚"},
+    "空的": {},
+}
+
+def unit_cards(store, unit):
+    return list(store.view(store.unit_ids(unit)))
+
+def check_store(store, flashcards):
+    assert store.units == tuple(flashcards)
+    for unit, cards in flashcards.items():
+        assert unit_cards(store, unit) == list(cards.items())
+        assert store.unit_size(unit) == len(cards)
+    cid = next(cid for cid in range(len(store)) if store.card(cid) == ("ねこ", "貓"))
+    assert store.units_of(cid) == ("第一課", "第二課")
+
+def test_from_flashcards_round_trip():
+    store = CardStore.from_flashcards(FLASHCARDS)
+    assert len(store) == 5
+    check_store(store, FLASHCARDS)
+    assert [store.card(cid) for cid in store.ids_of("ひと")] == [("ひと", "人"), ("ひと", "人們")]
+    # 快取是 pickle 存的，反查表不跟著存
+    check_store(pickle.loads(pickle.dumps(store)), FLASHCARDS)
+
+def test_view_slices():
+    store = CardStore.from_flashcards(FLASHCARDS)
+    view = store.view(store.unit_ids("第一課"))
+    assert list(view[1:]) == [("いぬ", "狗"), ("ひと", "人")]
+    assert view[-1] == ("ひと", "人")
+
+def test_shared_deck_round_trip(tmp_path):
+    store = CardStore.from_flashcards(FLASHCARDS)
+    segment = str(tmp_path / "deck.shared")
+    digests = {unit: f"digest-{i}" for i, unit in enumerate(FLASHCARDS)}
+    publish(store, segment, digests)
+    shared = SharedDeck(segment)
+    assert len(shared) == len(store)
+    check_store(shared, FLASHCARDS)
+    assert shared.unit_digests == digests
+    assert not shared.stale()
+    # 重新發佈換掉檔案，已掛上的舊版仍可讀
+    publish(CardStore.from_flashcards({"第三課": {"とり": "鳥"}}), segment)
+    assert shared.stale()
+    check_store(shared, FLASHCARDS)
+    assert unit_cards(SharedDeck(segment), "第三課") == [("とり", "鳥")]
+    assert SharedDeck(segment).unit_digests == {}
+
+def test_publish_deck_matches_load_deck(tmp_path):
+    path = tmp_path / "flashcards.txt"
+    path.write_text("[第一課]\nねこ: 貓\nいぬ: 狗\n[第二課]\nさかな: 魚\n", encoding="utf-8")
+    segment = str(tmp_path / "deck.shared")
+    publish_deck(str(path), segment)
+    shared = SharedDeck(segment)
+    flashcards, signature = load_deck(str(path))
+    assert shared.unit_digests == signature["units"]
+    store = load_card_store(str(path))
+    for unit in flashcards:
+        assert unit_cards(shared, unit) == unit_cards(store, unit) == list(flashcards[unit].items())
+
+def test_not_a_segment(tmp_path):
+    path = tmp_path / "garbage.shared"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        SharedDeck(str(path))
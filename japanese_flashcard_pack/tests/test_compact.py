@@ -0,0 +1,71 @@
+import gzip
+import json
+
+from compact import compact
+from wrong_store import WrongAnswerStore, archive_path, format_header, format_record, summary_path
+
+DAY = 86400
+NOW = 1_700_000_000
+
+def write_log(path, blocks):
+    with open(path, "w", encoding="utf-8") as f:
+        for unit, when, records in blocks:
+            f.write(f"\n{format_header(unit, when)}\n")
+            f.writelines(format_record(*r) for r in records)
+
+def index(path, db):
+    store = WrongAnswerStore(path, str(db))
+    store.sync()
+    return sorted(store.stats())
+
+BLOCKS = [
+    ("第一課", NOW - 60 * DAY, [("貓", "ねご", "ねこ"), ("狗", "いの", "いぬ")]),
+    ("第一課", NOW - 40 * DAY, [("貓", "ねっこ", "ねこ")]),
+    ("第二課", NOW - 1 * DAY, [("魚", "さがな", "さかな"), ("貓", "ねこお", "ねこ")]),
+]
+
+def test_compaction_keeps_index_results(tmp_path):
+    path = str(tmp_path / "wrong_answers.txt")
+    write_log(path, BLOCKS)
+    before = index(path, tmp_path / "before.db")
+    store = WrongAnswerStore(path, str(tmp_path / "live.db"))
+    store.sync()
+
+    result = compact(path, keep_days=30, now=NOW)
+    assert result["generation"] == 1
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    assert text.startswith("=== 已彙總至第 1 段 ===\n")
+    assert "ねっこ" not in text and "さがな" in text
+    with gzip.open(archive_path(path, 1), "rt", encoding="utf-8") as f:
+        assert "ねっこ" in f.read()
+
+    # 已經開著的索引發現檔案換了會重建；新開的索引從彙總 + 錯題檔建，結果都和壓縮前一樣
+    store.sync()
+    assert sorted(store.stats()) == before
+    assert index(path, tmp_path / "after.db") == before
+
+def test_nothing_to_compact(tmp_path):
+    path = str(tmp_path / "wrong_answers.txt")
+    write_log(path, BLOCKS[2:])
+    assert compact(path, keep_days=30, now=NOW) is None
+    assert compact(path, keep_days=30, now=NOW, min_bytes=10**6) is None
+
+def test_repeated_compaction_accumulates(tmp_path):
+    path = str(tmp_path / "wrong_answers.txt")
+    write_log(path, BLOCKS)
+    before = index(path, tmp_path / "before.db")
+    assert compact(path, keep_days=50, now=NOW)["generation"] == 1
+    assert compact(path, keep_days=30, now=NOW)["generation"] == 2
+    assert compact(path, keep_days=30, now=NOW) is None
+    assert index(path, tmp_path / "after.db") == before
+
+def test_lagging_summary_is_rebuilt_from_archives(tmp_path):
+    # 壓縮寫完錯題檔但還沒寫彙總就中斷：讀的一方從封存補回來
+    path = str(tmp_path / "wrong_answers.txt")
+    write_log(path, BLOCKS)
+    before = index(path, tmp_path / "before.db")
+    compact(path, keep_days=30, now=NOW)
+    with open(summary_path(path), "w", encoding="utf-8") as f:
+        json.dump({"generation": 0, "words": []}, f)
+    assert index(path, tmp_path / "after.db") == before
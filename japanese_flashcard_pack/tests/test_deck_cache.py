@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+import deck_cache
+from deck_cache import cache_path, load_cached, load_cached_units, load_deck, parse_flashcards
+
+DECK = "[第一課]\nねこ: 貓\nいぬ: 狗\n[第二課]\nさかな: 魚\n"
+
+@pytest.fixture
+def deck(tmp_path):
+    path = tmp_path / "flashcards.txt"
+    path.write_text(DECK, encoding="utf-8")
+    return str(path)
+
+@pytest.fixture
+def parsed(monkeypatch):
+    # 記下每次實際被解析的單元內容
+    calls = []
+    parse_unit = deck_cache.parse_unit
+
+    def counting(data):
+        calls.append(data)
+        return parse_unit(data)
+    monkeypatch.setattr(deck_cache, "parse_unit", counting)
+    return calls
+
+def bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+def test_matches_parse_flashcards(deck):
+    assert dict(load_cached(deck)) == parse_flashcards(deck)
+    assert os.path.exists(cache_path(deck, "deck"))
+    # 命中快取時內容相同
+    assert dict(load_cached(deck)) == parse_flashcards(deck)
+
+def test_hit_does_not_parse(deck, parsed):
+    load_cached(deck)
+    parsed.clear()
+    assert load_cached(deck)["第一課"] == {"ねこ": "貓", "いぬ": "狗"}
+    assert parsed == []
+
+def test_touch_only_updates_signature(deck, parsed):
+    load_cached(deck)
+    parsed.clear()
+    bump_mtime(deck)
+    assert load_cached(deck)["第二課"] == {"さかな": "魚"}
+    assert parsed == []
+    _, signature = load_deck(deck)
+    assert signature["mtime"] == os.stat(deck).st_mtime_ns
+
+def test_edit_reparses_only_changed_unit(deck, parsed):
+    load_cached(deck)
+    parsed.clear()
+    with open(deck, "a", encoding="utf-8") as f:
+        f.write("とり: 鳥\n")
+    bump_mtime(deck)
+    cards = load_cached(deck)
+    assert cards["第二課"] == {"さかな": "魚", "とり": "鳥"}
+    assert cards["第一課"] == {"ねこ": "貓", "いぬ": "狗"}
+    assert len(parsed) == 1
+
+def test_same_size_edit_is_detected(deck):
+    load_cached(deck)
+    with open(deck, "w", encoding="utf-8") as f:
+        f.write(DECK.replace("いぬ: 狗", "うし: 牛"))
+    bump_mtime(deck)
+    assert load_cached(deck)["第一課"] == {"ねこ": "貓", "うし": "牛"}
+
+def test_corrupt_cache_is_rebuilt(deck):
+    load_cached(deck)
+    with open(cache_path(deck, "deck"), "wb") as f:
+        f.write(b"not a pickle")
+    assert dict(load_cached(deck)) == parse_flashcards(deck)
+
+def test_units_rebuild_only_changed_units(deck):
+    built = []
+
+    def build(unit, cards):
+        built.append(unit)
+        return sorted(cards)
+    assert dict(load_cached_units(deck, build, tag="test")) == {"第一課": ["いぬ", "ねこ"], "第二課": ["さかな"]}
+    built.clear()
+    with open(deck, "a", encoding="utf-8") as f:
+        f.write("[第三課]\nとり: 鳥\n")
+    bump_mtime(deck)
+    index = load_cached_units(deck, build, tag="test")
+    assert built == ["第三課"]
+    assert index["第一課"] == ["いぬ", "ねこ"]
+    assert index["第三課"] == ["とり"]
+
+def test_units_follow_the_given_deck_version(deck):
+    # 給了 load_deck 的結果時，衍生的索引是那一版的，之後檔案再被改也一樣
+    old = load_deck(deck)
+    with open(deck, "a", encoding="utf-8") as f:
+        f.write("[第三課]\nとり: 鳥\n")
+    bump_mtime(deck)
+    index = load_cached_units(deck, lambda unit, cards: dict(cards), tag="test", deck=old)
+    assert set(index) == set(old[0]) == {"第一課", "第二課"}
+    # 不給的話對到目前的檔案
+    assert "第三課" in load_cached_units(deck, lambda unit, cards: dict(cards), tag="test")
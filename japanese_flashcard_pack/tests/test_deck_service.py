@@ -0,0 +1,137 @@
+import os
+
+import pytest
+
+from choices import build_neighbors
+from deck_service import DeckService
+
+DECK = "[第一課]\nねこ: 貓\nねご: 貓語\nいぬ: 狗\nいね: 稻\n[第二課]\nさかな: 魚\nさかば: 酒館\n"
+
+def write_deck(path, text):
+    path.write_text(text, encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    return str(path)
+
+@pytest.fixture
+def deck(tmp_path):
+    return tmp_path / "flashcards.txt"
+
+@pytest.fixture
+def service(deck):
+    # 輪詢間隔拉長，測試裡手動呼叫 _reload
+    service = DeckService(write_deck(deck, DECK), poll_interval=3600)
+    yield service
+    service.stop()
+
+def test_choices_come_from_snapshot(deck, service):
+    snapshot = service.snapshot
+    # 快照之後題庫被改、第二課被刪掉，選項還是用快照那一版的卡片
+    write_deck(deck, "[第一課]\nとり: 鳥\n")
+    assert dict(snapshot.choices("第一課")) == build_neighbors(dict(snapshot.lookup("第一課")))
+    assert set(snapshot.choices("第二課")) == {"さかな", "さかば"}
+
+def test_choices_built_per_unit(service):
+    snapshot = service.snapshot
+    snapshot.choices("第二課")
+    # 只算了用到的單元
+    assert list(snapshot._choices._built) == ["第二課"]
+
+def reload(service, deck, text):
+    write_deck(deck, text)
+    # 背景執行緒做的事
+    service.snapshot = service._reload()
+    return service.snapshot
+
+def test_edit_one_unit(deck, service):
+    old = service.snapshot
+    new = reload(service, deck, DECK.replace("いぬ: 狗", "いぬ: 小狗").replace("いね: 稻\n", ""))
+    assert service.changes_since(old.version) == [
+        ("第一課", {"added": {}, "changed": {"いぬ": "小狗"}, "removed": {"いね"}}),
+    ]
+    assert service.changes_since(new.version) == []
+    # 沒變的單元沿用原本的 store，有變的單元換成自己的小 store
+    assert new.store_for("第二課") is old.store
+    assert new.store_for("第一課") is not old.store
+    assert list(new.cards("第一課")) == [("ねこ", "貓"), ("ねご", "貓語"), ("いぬ", "小狗")]
+    assert list(new.cards("第二課")) == list(old.cards("第二課"))
+    assert "いね" not in new.answers("第一課")
+
+def test_removed_and_added_units(deck, service):
+    old = service.snapshot
+    new = reload(service, deck, DECK.split("[第二課]")[0] + "[第三課]\nとり: 鳥\n")
+    assert new.units == ("第一課", "第三課")
+    assert service.changes_since(old.version) == [
+        ("第二課", {"added": {}, "changed": {}, "removed": {"さかな", "さかば"}}),
+        ("第三課", {"added": {"とり": "鳥"}, "changed": {}, "removed": set()}),
+    ]
+    assert new.store_for("第一課") is old.store
+    assert list(new.cards("第三課")) == [("とり", "鳥")]
+
+def test_changes_fall_out_of_history(deck):
+    service = DeckService(write_deck(deck, DECK), poll_interval=3600, history=2)
+    try:
+        first = service.snapshot.version
+        for meaning in ("魚1", "魚2", "魚3"):
+            reload(service, deck, DECK.replace("さかな: 魚", f"さかな: {meaning}"))
+        assert service.changes_since(first) is None
+        assert service.changes_since(first + 1) == [
+            ("第二課", {"added": {}, "changed": {"さかな": "魚2"}, "removed": set()}),
+            ("第二課", {"added": {}, "changed": {"さかな": "魚3"}, "removed": set()}),
+        ]
+    finally:
+        service.stop()
+
+class SessionState(dict):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+class Sessions:
+    def __init__(self):
+        self.saved = {}
+
+    def set_questions(self, session_id, questions):
+        self.saved[session_id] = list(questions)
+
+@pytest.fixture
+def session(monkeypatch):
+    import frontend
+    state = SessionState()
+    sessions = Sessions()
+    monkeypatch.setattr(frontend.st, "session_state", state)
+    monkeypatch.setattr(frontend, "get_sessions", lambda: sessions)
+    return frontend, state, sessions
+
+def start(state, snapshot, idx, whole_unit=True):
+    state.update(deck_version=snapshot.version, current_unit="第一課", whole_unit=whole_unit,
+                 session_id="s1", selected=list(snapshot.cards("第一課")), idx=idx,
+                 options_0=["舊"], options_2=["舊"])
+    state.total = len(state.selected)
+
+def test_reconcile_session(deck, service, session):
+    frontend, state, sessions = session
+    start(state, service.snapshot, idx=1)
+    new = reload(service, deck, DECK.replace("ねご: 貓語", "ねご: 貓話").replace("いね: 稻\n", "いね: 稻子\nとら: 虎\n")
+                 .replace("いぬ: 狗\n", ""))
+    frontend.reconcile_session(service, new)
+    # 已經作答的ねこ不動；刪掉的いぬ拿掉、改過的解釋換新，新增的卡接在後面
+    assert state.selected == [("ねこ", "貓"), ("ねご", "貓話"), ("いね", "稻子"), ("とら", "虎")]
+    assert state.total == 4
+    assert state.deck_version == new.version
+    assert sessions.saved["s1"] == state.selected
+    # 目前這題之後的選項要重新產生
+    assert "options_0" in state and "options_2" not in state
+
+def test_reconcile_session_without_history(deck, session):
+    frontend, state, sessions = session
+    service = DeckService(write_deck(deck, DECK), poll_interval=3600, history=1)
+    try:
+        start(state, service.snapshot, idx=0, whole_unit=False)
+        reload(service, deck, DECK.replace("ねこ: 貓", "ねこ: 貓咪"))
+        new = reload(service, deck, DECK.replace("ねこ: 貓", "ねこ: 貓咪").replace("いぬ: 狗\n", ""))
+        # 差異紀錄太舊時拿目前的單元整個重新比對
+        assert service.changes_since(state.deck_version) is None
+        frontend.reconcile_session(service, new)
+        assert state.selected == [("ねこ", "貓咪"), ("ねご", "貓語"), ("いね", "稻")]
+    finally:
+        service.stop()
@@ -0,0 +1,62 @@
+import pytest
+
+import deck_cache
+from deck_cache import _build_deck, file_digest, load_deck, parse_flashcards
+from importer import import_files
+
+SOURCE = (
+    "單字\t解釋\t單元\n"
+    "ねこ\t貓\t第一課\n"
+    "いぬ\t狗\t第二課\n"
+    "さかな\t魚\t第一課\n"
+    "ねこ\t貓\t第二課\n"
+    "いぬ\t犬\t第二課\n"
+    "とり\t鳥\t\n"
+    "\t空的\t第一課\n"
+    "ひと\t人\t第三課\n"
+)
+
+@pytest.fixture
+def imported(tmp_path):
+    source = tmp_path / "words.tsv"
+    source.write_text(SOURCE, encoding="utf-8")
+    out = str(tmp_path / "flashcards.txt")
+    # chunk 很小，同一個單元會分好幾段寫進暫存檔
+    result = import_files([str(source)], out, cache=True, chunk=2, unit_size=1, unit_name="其他")
+    return out, result
+
+def test_import_result(imported):
+    out, result = imported
+    assert (result["rows"], result["cards"], result["units"]) == (8, 5, 4)
+    assert (result["duplicates"], result["merged"], result["rejected"]) == (1, 1, 1)
+    assert parse_flashcards(out) == {
+        "第一課": {"ねこ": "貓", "さかな": "魚"},
+        "第二課": {"いぬ": "狗／犬"},
+        "其他 1": {"とり": "鳥"},
+        "第三課": {"ひと": "人"},
+    }
+
+def test_streamed_cache_matches_build_deck(imported, monkeypatch):
+    out, _ = imported
+    built = []
+    monkeypatch.setattr(deck_cache, "_build_deck", lambda *args: built.append(args) or _build_deck(*args))
+    flashcards, signature = load_deck(out)
+    # 匯入時寫的快取直接命中，不重新解析
+    assert built == []
+    sections, extra = _build_deck(out, None, None)
+    # 單元雜湊要和 _build_deck 一致，否則下次熱更新會把每個單元都當成有變
+    assert signature["units"] == extra["units"]
+    assert list(signature["units"]) == list(sections)
+    assert {unit: dict(flashcards[unit]) for unit in flashcards} == sections
+    assert signature["digest"] == file_digest(out)
+
+def test_edit_after_import_reparses_one_unit(imported, monkeypatch):
+    out, _ = imported
+    with open(out, "a", encoding="utf-8") as f:
+        f.write("[第四課]\nみず: 水\n")
+    parsed = []
+    parse_unit = deck_cache.parse_unit
+    monkeypatch.setattr(deck_cache, "parse_unit", lambda data: parsed.append(data) or parse_unit(data))
+    flashcards, signature = load_deck(out)
+    assert parsed == ["みず: 水\n".encode("utf-8")]
+    assert dict(flashcards["第四課"]) == {"みず": "水"}
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from journal import AnswerLog, WrongAnswerJournal, append_locked
+from session_store import SessionStore, start_cli_session
+from wrong_store import WrongAnswerStore, parse_header, parse_record
+
+RECORDS = [(0, "貓", "ねご", "ねこ"), (2, "狗", "いの", "いぬ")]
+
+@pytest.fixture
+def journal(tmp_path):
+    return WrongAnswerJournal(str(tmp_path / "wrong_answers.txt"), flush_interval=0.01)
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [parse_record(line) for line in f if parse_record(line)]
+
+def test_record_many_dedups_by_session_and_question(journal):
+    assert journal.record_many("s1", "第一課", RECORDS) == 2
+    # 同一個 session 重送（例如 rerun 時又按了一次送出）不會重複寫
+    assert journal.record_many("s1", "第一課", RECORDS) == 0
+    assert journal.record_many("s1", "第一課", [*RECORDS, (3, "魚", "さがな", "さかな")]) == 1
+    # 另一個 session 的同一題要記
+    assert journal.record_many("s2", "第一課", RECORDS[:1]) == 1
+    journal.flush()
+    assert read_records(journal.path) == [
+        ("貓", "ねご", "ねこ"), ("狗", "いの", "いぬ"), ("魚", "さがな", "さかな"), ("貓", "ねご", "ねこ"),
+    ]
+
+def test_flush_writes_exactly_the_records(journal):
+    journal.record_many("s1", "第一課", RECORDS)
+    journal.record_many("s2", "第二課", [(0, "魚", "さがな", "さかな")])
+    journal.flush()
+    with open(journal.path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    headers = [parse_header(line) for line in lines if parse_header(line)]
+    assert [unit for _, unit in headers] == ["第一課", "第二課"]
+    assert read_records(journal.path) == [("貓", "ねご", "ねこ"), ("狗", "いの", "いぬ"), ("魚", "さがな", "さかな")]
+    # 錯題統計讀得到同樣的內容
+    store = WrongAnswerStore(journal.path)
+    assert store.sync() == 3
+    assert store.words_in_unit("第一課") == {"ねこ", "いぬ"}
+
+def test_dedup_window_is_bounded(tmp_path):
+    journal = WrongAnswerJournal(str(tmp_path / "wrong_answers.txt"), flush_interval=0.01, max_keys=2)
+    journal.record_many("s1", "第一課", [(0, "a", "x", "y"), (1, "b", "x", "y"), (2, "c", "x", "y")])
+    # 最舊的 key 已經被擠掉
+    assert journal.record_many("s1", "第一課", [(0, "a", "x", "y"), (2, "c", "x", "y")]) == 1
+    journal.flush()
+
+def test_concurrent_appends_do_not_interleave(tmp_path):
+    path = str(tmp_path / "answers.log")
+    lines = [f"{i}\t" + "あ" * 200 + "\n" for i in range(50)]
+
+    def write(chunk):
+        for line in chunk:
+            append_locked(path, line, sync=False)
+    threads = [threading.Thread(target=write, args=(lines[i::5],)) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with open(path, encoding="utf-8") as f:
+        assert sorted(f.readlines()) == sorted(lines)
+
+def test_answer_log_lines(tmp_path):
+    log = AnswerLog(str(tmp_path / "answers.log"), flush_interval=0.01)
+    log.log("ねこ", "第 一課", True, when=1_700_000_000)
+    log.log("いぬ", None, False, when=1_700_000_001)
+    log.flush()
+    with open(log.path, encoding="utf-8") as f:
+        assert f.read() == "1700000000\t1\t第 一課\tねこ\n1700000001\t0\t\tいぬ\n"
+
+def test_session_resumes_after_write_behind(tmp_path):
+    db = str(tmp_path / "sessions.db")
+    questions = [("ねこ", "貓"), ("いぬ", "狗"), ("さかな", "魚")]
+    store = SessionStore(db, flush_interval=0.01)
+    store.start("s1", questions, unit="第一課", mode="輸入", owner="web", whole_unit=True)
+    store.progress("s1", 1, 0, [("貓", "ねご", "ねこ")])
+    store.progress("s1", 2, 1, [("貓", "ねご", "ねこ")])
+    store.close()
+    # 換一個連線（等於重新啟動）
+    session = SessionStore(db).get("s1")
+    assert session["questions"] == questions
+    assert (session["idx"], session["score"], session["total"]) == (2, 1, 3)
+    assert session["wrongs"] == [("貓", "ねご", "ねこ")]
+    assert session["whole_unit"] and session["status"] == "open"
+
+def test_cli_session_resume(tmp_path):
+    db = str(tmp_path / "sessions.db")
+    cards = {"ねこ": "貓", "いぬ": "狗", "さかな": "魚"}
+    sessions, session_id, questions, idx, score, wrongs = start_cli_session(
+        cards, "第一課", "輸入", lambda: list(cards.items()), db_path=db)
+    assert (questions, idx) == (list(cards.items()), 0)
+    sessions.progress(session_id, 1, 1, [])
+    # 上次沒考完，回答 Y 接著考
+    resumed = start_cli_session(cards, "第一課", "輸入", lambda: pytest.fail("不該出新題"), db_path=db,
+                                ask=lambda prompt: "")
+    assert resumed[1:] == (session_id, list(cards.items()), 1, 1, [])
+    # 回答 n 就放棄舊的、出新題
+    fresh = start_cli_session(cards, "第一課", "輸入", lambda: [("いぬ", "狗")], db_path=db,
+                              ask=lambda prompt: "n")
+    assert fresh[1] != session_id and fresh[2:] == ([("いぬ", "狗")], 0, 0, [])
+    assert sessions.get(session_id)["status"] == "closed"
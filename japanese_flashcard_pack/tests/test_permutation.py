@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from permutation import IndexPermutation, LazySample, weighted_sample
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 5, 16, 17, 100, 1000, 4097])
+def test_permutation_is_bijection(n):
+    for seed in range(3):
+        assert sorted(IndexPermutation(n, seed)) == list(range(n))
+
+def test_permutation_depends_only_on_seed():
+    assert list(IndexPermutation(100, 7)) == list(IndexPermutation(100, 7))
+    assert list(IndexPermutation(100, 7)) != list(IndexPermutation(100, 8))
+    with pytest.raises(IndexError):
+        IndexPermutation(10, 0)[10]
+
+@pytest.mark.parametrize("n, k", [(10, 3), (10, 10), (10, 25), (0, 5), (1000, 999)])
+def test_lazy_sample_distinct(n, k):
+    items = [f"w{i}" for i in range(n)]
+    sample = LazySample(items, k, seed=42)
+    assert len(sample) == min(k, n)
+    assert len(set(sample)) == min(k, n)
+    assert set(sample) <= set(items)
+    # 同一個種子重現同一份測驗
+    assert list(sample) == list(LazySample(items, k, seed=42))
+
+def test_weighted_sample_no_repeats():
+    rng = random.Random(0)
+    pairs = [(i, 1 + i % 5) for i in range(200)]
+    for _ in range(50):
+        sample = weighted_sample(pairs, 30, rng)
+        assert len(sample) == 30
+        assert len(set(sample)) == 30
+
+def test_weighted_sample_zero_weights_and_large_k():
+    pairs = [("a", 1), ("b", 0), ("c", 2.5), ("d", -1), ("e", 0.1)]
+    sample = weighted_sample(pairs, 10, random.Random(1))
+    # 權重 <= 0 的不會被抽到；k 比可抽的多時全部回傳
+    assert sorted(sample) == ["a", "c", "e"]
+    assert weighted_sample(pairs, 0) == []
+    assert weighted_sample([("a", 0)], 3) == []
+
+def test_weighted_sample_prefers_heavy_items():
+    rng = random.Random(2)
+    pairs = [("heavy", 100), *((f"light{i}", 1) for i in range(9))]
+    hits = sum(weighted_sample(pairs, 1, rng) == ["heavy"] for _ in range(500))
+    # 期望值約 500 * 100 / 109
+    assert hits > 400
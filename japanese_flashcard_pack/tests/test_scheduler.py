@@ -0,0 +1,111 @@
+import pytest
+
+from scheduler import DAY, MIN_EASE, RELEARN_DELAY, Card, Scheduler, sm2
+
+NOW = 1_700_000_000.0
+
+def test_sm2_intervals_grow_with_ease():
+    card = Card("ねこ", "貓", "第一課")
+    intervals = []
+    for i in range(4):
+        sm2(card, 4, NOW)
+        intervals.append(card.interval)
+    assert intervals[:2] == [1.0, 6.0]
+    assert intervals[2] == round(6.0 * card.ease, 2)
+    assert intervals[3] > intervals[2]
+    assert card.due == NOW + intervals[3] * DAY
+    # quality 4 不改變 ease
+    assert card.ease == pytest.approx(2.5)
+
+def test_sm2_lapse_resets_and_lowers_ease():
+    card = Card("ねこ", "貓", "第一課")
+    sm2(card, 4, NOW)
+    sm2(card, 4, NOW)
+    sm2(card, 1, NOW)
+    assert (card.reps, card.lapses, card.interval) == (0, 1, 0.0)
+    assert card.due == NOW + RELEARN_DELAY
+    assert card.ease < 2.5
+    sm2(card, 4, NOW)
+    assert card.interval == 1.0
+
+def test_sm2_ease_has_a_floor():
+    card = Card("ねこ", "貓", "第一課")
+    for _ in range(20):
+        sm2(card, 0, NOW)
+    assert card.ease == MIN_EASE
+
+@pytest.fixture(params=["memory", "sqlite"])
+def scheduler(request, tmp_path):
+    return Scheduler(None if request.param == "memory" else str(tmp_path / "schedule.db"))
+
+def test_due_orders_by_due_time_and_filters_unit(scheduler):
+    scheduler.add([("ねこ", "貓", "第一課"), ("いぬ", "狗", "第一課"), ("さかな", "魚", "第二課")], now=NOW)
+    scheduler.review("いぬ", False, now=NOW)
+    scheduler.review("ねこ", True, now=NOW)
+    until = NOW + RELEARN_DELAY
+    assert [w for w, _, _ in scheduler.due(10, until=until)] == ["さかな", "いぬ"]
+    assert [w for w, _, _ in scheduler.due(10, until=until, unit="第一課")] == ["いぬ"]
+    assert [w for w, _, _ in scheduler.due(1, until=until)] == ["さかな"]
+    assert [w for w, _, _ in scheduler.due(10, until=NOW + 2 * DAY)] == ["さかな", "いぬ", "ねこ"]
+    # due 不會把卡片從排程裡拿掉
+    assert len(scheduler.due(10, until=NOW + 2 * DAY)) == 3
+    assert scheduler.next_due() == (NOW, "さかな")
+
+def test_add_keeps_existing_schedule(scheduler):
+    scheduler.add([("ねこ", "貓", "第一課")], now=NOW)
+    scheduler.review("ねこ", True, now=NOW)
+    assert scheduler.add([("ねこ", "貓", "第一課"), ("いぬ", "狗", "第一課")], now=NOW) == 1
+    assert scheduler.get("ねこ").reps == 1
+    assert len(scheduler) == 2
+    assert "いぬ" in scheduler
+
+def test_reviews_from_other_instances_are_visible(tmp_path):
+    # 每個 process 各開一個 Scheduler，資料庫才是準的
+    path = str(tmp_path / "schedule.db")
+    a = Scheduler(path)
+    b = Scheduler(path)
+    a.add([("ねこ", "貓", "第一課")], now=NOW)
+    b.review("ねこ", True, now=NOW)
+    a.review("ねこ", True, now=NOW)
+    card = b.get("ねこ")
+    assert (card.reps, card.interval) == (2, 6.0)
+    assert a.due(10, until=NOW + DAY) == []
+
+def test_word_in_two_units_is_scheduled_per_unit(scheduler):
+    scheduler.add([("ねこ", "貓", "第一課"), ("ねこ", "貓", "第二課")], now=NOW)
+    scheduler.review("ねこ", True, unit="第一課", now=NOW)
+    # 第一課的卡片排到明天，第二課的還是今天到期
+    assert scheduler.due(10, until=NOW, unit="第二課") == [("ねこ", "貓", "第二課")]
+    assert scheduler.due(10, until=NOW, unit="第一課") == []
+    assert scheduler.get("ねこ", "第一課").reps == 1
+    assert scheduler.get("ねこ", "第二課").reps == 0
+    assert scheduler.known_words("第二課") == {"ねこ"}
+    assert scheduler.known_words("第三課") == set()
+    assert scheduler.known_words() == {"ねこ"}
+
+def test_select_due_questions_fills_with_new_cards(scheduler):
+    from logic import select_due_questions
+    unit = {"ねこ": "貓", "いぬ": "狗", "さかな": "魚"}
+    # select_due_questions 看的是到今天結束為止到期的卡片
+    scheduler.add([("いぬ", "狗", "第一課")])
+    scheduler.review("ねこ", True, "貓", "第一課")
+    # いぬ 今天到期；ねこ 已排程（明天），不算新卡片
+    assert select_due_questions(unit, 10, scheduler, unit="第一課") == [("いぬ", "狗"), ("さかな", "魚")]
+
+def test_old_schema_is_migrated(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "schedule.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cards (word TEXT PRIMARY KEY, meaning TEXT NOT NULL, unit TEXT, ease REAL NOT NULL, "
+                 "interval REAL NOT NULL, reps INTEGER NOT NULL, lapses INTEGER NOT NULL, due REAL NOT NULL)")
+    conn.execute("INSERT INTO cards VALUES ('ねこ', '貓', '第一課', 2.5, 6.0, 2, 0, ?)", (NOW,))
+    conn.execute("INSERT INTO cards VALUES ('いぬ', '狗', NULL, 2.5, 0.0, 0, 0, ?)", (NOW,))
+    conn.commit()
+    conn.close()
+    scheduler = Scheduler(path)
+    assert scheduler.get("ねこ", "第一課").reps == 2
+    assert scheduler.get("いぬ").unit is None
+    scheduler.review("ねこ", True, unit="第二課", now=NOW)
+    assert len(scheduler) == 3
+    # 再開一次不會重跑轉換
+    assert len(Scheduler(path)) == 3
@@ -0,0 +1,58 @@
+import os
+
+from search import load_search_index, search
+
+DECK = "[第一課]\nにほんじん: 日本人\nにほんご: 日文\nにく: 肉\n[第二課]\nほん: 書\nにほんしゅ: 日本酒\n"
+
+def write_deck(tmp_path, text):
+    path = tmp_path / "flashcards.txt"
+    path.write_text(text, encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    return str(path)
+
+def words(results):
+    return [word for _, word, _ in results]
+
+def test_ranking(tmp_path):
+    index = load_search_index(write_deck(tmp_path, DECK))
+    # 完全相同 → 開頭相同 → 包含
+    assert words(search(index, "ほん")) == ["ほん", "にほんじん", "にほんご", "にほんしゅ"]
+    assert words(search(index, "ニホン")) == ["にほんじん", "にほんご", "にほんしゅ"]
+    assert words(search(index, "にほんし")) == ["にほんしゅ"]
+    assert search(index, "日本酒") == [("第二課", "にほんしゅ", "日本酒")]
+    assert words(search(index, "日本")) == ["にほんじん", "にほんしゅ"]
+    assert words(search(index, "ほん", limit=2)) == ["ほん", "にほんじん"]
+    assert search(index, "すし") == []
+
+def test_long_query_intersects_postings(tmp_path):
+    index = load_search_index(write_deck(tmp_path, DECK))
+    # 每個二字組都出現過，但沒有單字真的包含整串
+    assert search(index, "にほんく") == []
+    assert words(search(index, "ほんじ")) == ["にほんじん"]
+
+def test_edit_updates_index(tmp_path):
+    path = write_deck(tmp_path, DECK)
+    load_search_index(path)
+    path = write_deck(tmp_path, DECK.replace("ほん: 書", "ほんや: 書店"))
+    index = load_search_index(path)
+    assert search(index, "書店") == [("第二課", "ほんや", "書店")]
+    assert search(index, "日文") == [("第一課", "にほんご", "日文")]
+
+def test_query_opens_only_matching_shards(tmp_path):
+    path = write_deck(tmp_path, DECK)
+    load_search_index(path)
+    index = load_search_index(path)
+    assert search(index, "日本酒") == [("第二課", "にほんしゅ", "日本酒")]
+    # 路由表指到第二課，第一課的分片沒被解開
+    assert list(index.shards._loaded) == ["第二課"]
+
+def test_edit_updates_routes(tmp_path):
+    path = write_deck(tmp_path, DECK)
+    load_search_index(path)
+    # 第二課刪掉、新增第三課
+    path = write_deck(tmp_path, DECK.split("[第二課]")[0] + "[第三課]\nすし: 壽司\n")
+    index = load_search_index(path)
+    assert search(index, "すし") == [("第三課", "すし", "壽司")]
+    assert search(index, "書") == []
+    assert words(search(index, "ほん")) == ["にほんじん", "にほんご"]
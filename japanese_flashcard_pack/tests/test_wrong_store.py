@@ -0,0 +1,68 @@
+from wrong_store import WrongAnswerStore, format_header, format_record, parse_record
+
+def block(unit, when, *records):
+    return f"\n{format_header(unit, when)}\n" + "".join(format_record(*r) for r in records)
+
+def append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+def test_parse_record_round_trip():
+    line = format_record("涙／眼淚, 哭", "れい", "なみだ")
+    assert parse_record(line) == ("涙／眼淚, 哭", "れい", "なみだ")
+    assert parse_record("=== 測驗紀錄 ===") is None
+
+def test_sync_only_reads_new_lines(tmp_path):
+    path = str(tmp_path / "wrong_answers.txt")
+    append(path, block("第一課", 1_700_000_000, ("貓", "ねご", "ねこ"), ("狗", "いの", "いぬ")))
+    store = WrongAnswerStore(path)
+    assert store.sync() == 2
+    assert store.sync() == 0
+    append(path, block("第二課", 1_700_000_100, ("貓", "ねっこ", "ねこ")))
+    assert store.sync() == 1
+    assert store.miss_count("ねこ") == 2
+    assert store.words_in_unit("第二課") == {"ねこ"}
+    assert store.words_in_unit("第一課") == {"いぬ"}
+    word, meaning, unit, count, last_miss = store.stats(["ねこ"])[0]
+    assert (unit, count, last_miss) == ("第二課", 2, 1_700_000_100)
+
+def test_partial_line_waits_for_newline(tmp_path):
+    path = str(tmp_path / "wrong_answers.txt")
+    append(path, block("第一課", 1_700_000_000, ("貓", "ねご", "ねこ")))
+    append(path, "解釋: 狗, 你的回答: いの, 正確")
+    store = WrongAnswerStore(path)
+    assert store.sync() == 1
+    assert store.miss_count("いぬ") == 0
+    # 寫完的那一行接在上次的區塊（單元、時間）之後
+    append(path, "答案: いぬ\n")
+    assert store.sync() == 1
+    assert store.stats(["いぬ"])[0][2:] == ("第一課", 1, 1_700_000_000)
+
+def test_state_survives_reopen(tmp_path):
+    path = str(tmp_path / "wrong_answers.txt")
+    append(path, block("第一課", 1_700_000_000, ("貓", "ねご", "ねこ")))
+    WrongAnswerStore(path).sync()
+    append(path, format_record("貓", "ねこお", "ねこ"))
+    store = WrongAnswerStore(path)
+    assert store.sync() == 1
+    assert store.stats(["ねこ"])[0][2:] == ("第一課", 2, 1_700_000_000)
+
+def test_rewritten_file_is_reindexed(tmp_path):
+    path = str(tmp_path / "wrong_answers.txt")
+    append(path, block("第一課", 1_700_000_000, ("貓", "ねご", "ねこ"), ("狗", "いの", "いぬ")))
+    store = WrongAnswerStore(path)
+    store.sync()
+    # 檔案被改短：從頭重建，不會沿用舊的計數
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(block("第三課", 1_700_000_200, ("魚", "さがな", "さかな")))
+    store.sync()
+    assert store.missed_words() == {"さかな"}
+
+def test_two_stores_do_not_double_count(tmp_path):
+    path = str(tmp_path / "wrong_answers.txt")
+    append(path, block("第一課", 1_700_000_000, ("貓", "ねご", "ねこ")))
+    a = WrongAnswerStore(path)
+    b = WrongAnswerStore(path)
+    a.sync()
+    b.sync()
+    assert a.miss_count("ねこ") == b.miss_count("ねこ") == 1
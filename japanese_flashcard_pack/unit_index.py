@@ -0,0 +1,68 @@
+import os
+from collections.abc import Mapping
+
+from deck_cache import load_cached_value, unit_ranges
+
+# flashcards.txt 裡每個 [單元] 內容的位元組範圍。建一次之後跟著題庫快取一起失效，
+# 之後要列出單元或打開某個單元，只需要 seek 到那一段，不用解析整個檔案。
+
+def build_unit_index(path):
+    with open(path, "rb") as f:
+        return unit_ranges(f)
+
+def load_unit_index(path):
+    return load_cached_value(path, build_unit_index, tag="units")
+
+def iter_unit(path, unit, index=None):
+    index = index if index is not None else load_unit_index(path)
+    start, end = index[unit]
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        for raw in f:
+            if remaining <= 0:
+                break
+            remaining -= len(raw)
+            line = raw.decode("utf-8").strip()
+            if ": " in line:
+                word, meaning = line.split(": ", 1)
+                yield word, meaning
+
+def load_unit(path, unit, index=None):
+    return dict(iter_unit(path, unit, index))
+
+# 和 load_flashcards 的 dict 用法相同，但單元內容第一次用到才從檔案讀出來
+class UnitFileDeck(Mapping):
+    def __init__(self, path):
+        self.path = path
+        self._stat = None
+        self.refresh()
+
+    # 題庫檔有變更時重新讀索引，已讀過的單元等下次用到再從檔案讀；有變更時回傳 True
+    def refresh(self):
+        st = os.stat(self.path)
+        stat = (st.st_size, st.st_mtime_ns)
+        if stat == self._stat:
+            return False
+        changed = self._stat is not None
+        self._stat = stat
+        self.index = load_unit_index(self.path)
+        self._loaded = {}
+        return changed
+
+    def __getitem__(self, unit):
+        cards = self._loaded.get(unit)
+        if cards is None:
+            if unit not in self.index:
+                raise KeyError(unit)
+            cards = self._loaded[unit] = load_unit(self.path, unit, self.index)
+        return cards
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, unit):
+        return unit in self.index
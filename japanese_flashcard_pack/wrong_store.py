@@ -0,0 +1,282 @@
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# 錯題紀錄的索引。wrong_answers.txt 仍是原始紀錄（各程式照舊 append），
+# 這裡把它轉成 SQLite：每個單字的答錯次數、最後答錯時間與所屬單元。
+# 每次只讀上次匯入位置之後新增的內容，不再每次重掃整個檔案。
+# compact.py 會把舊的區塊彙總成每個單字一筆（wrong_answers.summary.json），原始內容壓縮封存到
+# wrong_answers.archive/，錯題檔只留最近的區塊，開頭加一行標記目前彙總到第幾段。
+# 檔案被換掉時索引從「彙總 + 錯題檔」重建，成本只和單字數與最近的紀錄量有關。
+
+HEADER_RE = re.compile(r"^=== 測驗紀錄(?: (\d{4}-\d\d-\d\d \d\d:\d\d:\d\d))?(?: 單元: (.*?))? ===$")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+MARKER_RE = re.compile(r"^=== 已彙總至第 (\d+) 段 ===$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS misses (
+    word TEXT PRIMARY KEY,
+    meaning TEXT NOT NULL,
+    unit TEXT,
+    count INTEGER NOT NULL,
+    last_miss REAL
+);
+CREATE INDEX IF NOT EXISTS misses_unit ON misses(unit);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+def format_header(unit=None, when=None):
+    stamp = time.strftime(TIME_FORMAT, time.localtime(when))
+    if unit:
+        return f"=== 測驗紀錄 {stamp} 單元: {unit} ==="
+    return f"=== 測驗紀錄 {stamp} ==="
+
+def parse_header(line):
+    m = HEADER_RE.match(line)
+    if not m:
+        return None
+    stamp, unit = m.groups()
+    when = time.mktime(time.strptime(stamp, TIME_FORMAT)) if stamp else None
+    return when, unit
+
+def format_record(meaning, user_answer, correct_answer):
+    # 濾掉奇怪符號
+    clean_user_answer = ''.join(c for c in user_answer if unicodedata.category(c)[0] != "C")
+    return f"解釋: {meaning}, 你的回答: {clean_user_answer}, 正確答案: {correct_answer}\n"
+
+# 「解釋: 涙／眼淚, 你的回答: れい, 正確答案: なみだ」→ (解釋, 你的回答, 正確答案)
+def parse_record(line):
+    if not line.startswith("解釋: "):
+        return None
+    head, sep, correct = line.rstrip("\n").rpartition(", 正確答案: ")
+    if not sep:
+        return None
+    meaning, sep, user_answer = head[len("解釋: "):].partition(", 你的回答: ")
+    if not sep:
+        return None
+    return meaning, user_answer, correct
+
+def format_marker(generation):
+    return f"=== 已彙總至第 {generation} 段 ==="
+
+# 錯題檔開頭的彙總標記：回傳段數，沒壓縮過為 0
+def read_generation(f):
+    f.seek(0)
+    m = MARKER_RE.match(f.readline(256).decode("utf-8", errors="ignore").strip())
+    return int(m.group(1)) if m else 0
+
+def summary_path(text_path):
+    return os.path.splitext(text_path)[0] + ".summary.json"
+
+def archive_path(text_path, generation):
+    return os.path.join(os.path.splitext(text_path)[0] + ".archive", f"{generation:04d}.txt.gz")
+
+# 把原始紀錄累加進 {單字: [解釋, 單元, 次數, 最後答錯時間]}，規則和索引的 _add 相同；
+# block 為 (時間, 單元)，接續上一段沒讀完的區塊，回傳讀完時所在的區塊
+def fold_records(summary, lines, block=(None, None)):
+    when, unit = block
+    for line in lines:
+        header = parse_header(line.strip())
+        if header:
+            when, unit = header
+            continue
+        record = parse_record(line)
+        if not record:
+            continue
+        meaning, _, word = record
+        entry = summary.get(word)
+        if entry is None:
+            summary[word] = [meaning, unit, 1, when]
+        else:
+            entry[0] = meaning
+            entry[1] = entry[1] if unit is None else unit
+            entry[2] += 1
+            entry[3] = max(entry[3] or 0, when or 0) or None
+    return when, unit
+
+def write_summary(text_path, generation, summary):
+    path = summary_path(text_path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"generation": generation, "words": [[word, *entry] for word, entry in summary.items()]},
+                  f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+# 讀到第 generation 段為止的彙總；彙總檔落後（壓縮到一半中斷）時補讀缺的封存並寫回
+def load_summary(text_path, generation):
+    try:
+        with open(summary_path(text_path), encoding="utf-8") as f:
+            data = json.load(f)
+        done = data["generation"]
+        summary = {word: list(entry) for word, *entry in data["words"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        done, summary = 0, {}
+    if done >= generation:
+        return summary
+    for missing in range(done + 1, generation + 1):
+        try:
+            with gzip.open(archive_path(text_path, missing), "rt", encoding="utf-8", errors="ignore") as f:
+                fold_records(summary, f)
+        except OSError:
+            continue
+    write_summary(text_path, generation, summary)
+    return summary
+
+class WrongAnswerStore:
+    def __init__(self, text_path, db_path=None):
+        self.text_path = text_path
+        self.db_path = db_path or os.path.splitext(text_path)[0] + ".db"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # 寫入交易：BEGIN IMMEDIATE 讓多個 process 同時匯入時不會重複計數
+    def _write(self, func, *args):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def reset(self):
+        def clear():
+            self._conn.execute("DELETE FROM misses")
+            self._conn.execute("DELETE FROM meta")
+        self._write(clear)
+
+    # 匯入文字檔上次位置之後的新紀錄；檔案被換掉（壓縮過）或變短（被改寫過）時從彙總重建
+    def sync(self):
+        try:
+            st = os.stat(self.text_path)
+        except OSError:
+            return 0
+        with self._lock:
+            if st.st_size == self._meta("offset", 0) and st.st_ino == self._meta("inode"):
+                return 0
+        return self._write(self._import_tail)
+
+    def _import_tail(self):
+        offset = self._meta("offset", 0)
+        with open(self.text_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            generation = read_generation(f)
+            if st.st_ino != self._meta("inode") or st.st_size < offset or generation != self._meta("generation", 0):
+                self._rebuild(generation)
+                offset = 0
+            f.seek(offset)
+            data = f.read(st.st_size - offset)
+        # 只處理完整的行，寫到一半的行留給下次
+        end = data.rfind(b"\n") + 1
+        if not end:
+            self._set_meta("inode", st.st_ino)
+            return 0
+        when = self._meta("block_time")
+        unit = self._meta("block_unit")
+        rows = []
+        for line in data[:end].decode("utf-8", errors="ignore").splitlines():
+            header = parse_header(line.strip())
+            if header:
+                when, unit = header
+                continue
+            record = parse_record(line)
+            if record:
+                rows.append((record[2], record[0], unit, 1, when))
+        self._add(rows)
+        self._set_meta("offset", offset + end)
+        self._set_meta("inode", st.st_ino)
+        self._set_meta("block_time", when)
+        self._set_meta("block_unit", unit)
+        return len(rows)
+
+    def _rebuild(self, generation):
+        self._conn.execute("DELETE FROM misses")
+        self._conn.execute("DELETE FROM meta")
+        if generation:
+            self._add([(word, meaning, unit, count, last_miss)
+                       for word, (meaning, unit, count, last_miss) in load_summary(self.text_path, generation).items()])
+        self._set_meta("generation", generation)
+
+    # rows：(單字, 解釋, 單元, 次數, 最後答錯時間)
+    def _add(self, rows):
+        self._conn.executemany(
+            """INSERT INTO misses (word, meaning, unit, count, last_miss) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(word) DO UPDATE SET
+                   meaning = excluded.meaning,
+                   unit = COALESCE(excluded.unit, misses.unit),
+                   count = misses.count + excluded.count,
+                   last_miss = MAX(COALESCE(misses.last_miss, 0), COALESCE(excluded.last_miss, 0))""",
+            rows,
+        )
+
+    def _all(self, query, params=()):
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    # 每個單字各查一次主鍵索引，成本與單字數成正比，和歷史紀錄多寡無關
+    def _each(self, query, words):
+        with self._lock:
+            rows = []
+            for word in words:
+                row = self._conn.execute(query, (word,)).fetchone()
+                if row:
+                    rows.append(row)
+            return rows
+
+    def miss_count(self, word):
+        rows = self._all("SELECT count FROM misses WHERE word = ?", (word,))
+        return rows[0][0] if rows else 0
+
+    def missed_words(self):
+        return {row[0] for row in self._all("SELECT word FROM misses")}
+
+    def missed_among(self, words):
+        return {row[0] for row in self._each("SELECT word FROM misses WHERE word = ?", words)}
+
+    def words_in_unit(self, unit):
+        return {row[0] for row in self._all("SELECT word FROM misses WHERE unit = ?", (unit,))}
+
+    # (單字, 解釋, 單元, 次數, 最後答錯時間)，不指定單字時依答錯次數排序
+    def stats(self, words=None):
+        if words is None:
+            return self._all("SELECT word, meaning, unit, count, last_miss FROM misses ORDER BY count DESC")
+        return self._each("SELECT word, meaning, unit, count, last_miss FROM misses WHERE word = ?", words)
+
+    def close(self):
+        self._conn.close()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+# 每個錯題檔共用一個 store，並在取得時順便匯入新紀錄
+def open_store(text_path):
+    key = os.path.abspath(text_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = WrongAnswerStore(key)
+            _stores[key] = store
+    store.sync()
+    return store
@@ -1,35 +1,86 @@
 import random
+from collections.abc import Mapping
 from colorama import Fore, Style
-import unicodedata
+import os
+import sys
 
-# Helper function to normalize strings
-def normalize_string(s):
-    return unicodedata.normalize('NFKC', s.strip().lower())
+# Importing japanese_flashcard_pack puts its modules on the import path. Run directly
+# (cd 一 && python practice.py) the repository root is not on sys.path yet, so add it first
+try:
+    import japanese_flashcard_pack  # noqa: F401
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import japanese_flashcard_pack  # noqa: F401
+from deck_cache import load_cached
+from answers import normalize_string, build_meaning_index, check_meaning
+from choices import build_choice_index, make_choices
+from session_store import start_cli_session
 
-# Load flashcards from file (two-column version)
-def load_flashcards(filename="flashcards.txt"):
+HERE = os.path.dirname(os.path.abspath(__file__))
+DECK = os.path.join(HERE, "flashcards.txt")
+
+# Parse flashcards file (two-column version)
+def parse_flashcards(filename):
     flashcards = {}
     learn_only_units = set()
     current_unit = None
 
+    with open(filename, 'r', encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith("[") and line.endswith("]"):
+                current_unit = line[1:-1]
+                if "(learn-only)" in current_unit:
+                    current_unit = current_unit.replace(" (learn-only)", "")
+                    learn_only_units.add(current_unit)
+                flashcards[current_unit] = {}
+            elif current_unit and ": " in line:
+                parts = line.split(": ", 1)
+                if len(parts) == 2:
+                    word, meaning = parts
+                    flashcards[current_unit][word] = meaning
+    return flashcards, learn_only_units
+
+# The compiled per-unit deck cache under the unit names used here: " (learn-only)" is dropped from the
+# name and the unit goes into learn_only instead. Each unit is only unpickled when it is opened
+class Flashcards(Mapping):
+    def __init__(self, deck):
+        self._deck = deck
+        self._units = {unit.replace(" (learn-only)", ""): unit for unit in deck}
+        self.learn_only = {name for name, unit in self._units.items() if "(learn-only)" in unit}
+
+    def __getitem__(self, unit):
+        return self._deck[self._units[unit]]
+
+    def __iter__(self):
+        return iter(self._units)
+
+    def __len__(self):
+        return len(self._units)
+
+# Load flashcards from file, reusing the compiled cache when unchanged
+def load_flashcards(filename=DECK):
     try:
-        with open(filename, 'r', encoding="utf-8") as file:
-            for line in file:
-                line = line.strip()
-                if line.startswith("[") and line.endswith("]"):
-                    current_unit = line[1:-1]
-                    if "(learn-only)" in current_unit:
-                        current_unit = current_unit.replace(" (learn-only)", "")
-                        learn_only_units.add(current_unit)
-                    flashcards[current_unit] = {}
-                elif current_unit and ": " in line:
-                    parts = line.split(": ", 1)
-                    if len(parts) == 2:
-                        word, meaning = parts
-                        flashcards[current_unit][word] = meaning
+        flashcards = Flashcards(load_cached(filename))
+        return flashcards, flashcards.learn_only
     except FileNotFoundError:
         print(f"文件 '{filename}' 未找到。請確認文件存在並重新運行。")
-    return flashcards, learn_only_units
+    return {}, set()
+
+# Accepted meanings per card (／ and （） alternates), cached along with the deck
+def load_accepted(filename=DECK):
+    try:
+        # The tag carries the rule version: changing expand_meaning must not reuse old caches
+        return load_cached(filename, lambda path: build_meaning_index(parse_flashcards(path)[0]), tag="meanings-v2")
+    except FileNotFoundError:
+        return {}
+
+# Distractor index for multiple-choice questions, cached along with the deck
+def load_choices(filename=DECK):
+    try:
+        return load_cached(filename, lambda path: build_choice_index(parse_flashcards(path)[0]), tag="choices")
+    except FileNotFoundError:
+        return {}
 
 # List available units
 def list_units(flashcards, learn_only_units):
@@ -40,6 +91,16 @@ def list_units(flashcards, learn_only_units):
         print(f"{idx}. {unit} ({mode})")
     return units
 
+# New quizzes ask every card of the unit in random order
+def shuffled_unit(flashcards, unit):
+    flashcards_list = list(flashcards[unit].items())
+    random.shuffle(flashcards_list)
+    return flashcards_list
+
+def start_session(flashcards, unit, mode):
+    return start_cli_session(flashcards[unit], unit, mode, lambda: shuffled_unit(flashcards, unit),
+                             db_path=os.path.join(HERE, "sessions.db"))
+
 # Study mode
 def study_mode(flashcards, unit):
     print(f"\n學習模式：{unit}")
@@ -48,27 +109,63 @@ def study_mode(flashcards, unit):
     input("已完成學習，按 Enter 返回主選單...")
 
 # Quiz mode
-def quiz_mode(flashcards, unit):
+def quiz_mode(flashcards, unit, accepted):
     print(f"\n測驗模式：{unit} (輸入 'home' 返回主頁)")
-    flashcards_list = list(flashcards[unit].items())
-    random.shuffle(flashcards_list)
+    sessions, session_id, flashcards_list, start, correct_answers, incorrect_answers = start_session(
+        flashcards, unit, "meaning")
     total_questions = len(flashcards_list)
-    correct_answers = 0
-    incorrect_answers = []
 
-    for word, meaning in flashcards_list:
+    for i in range(start, total_questions):
+        word, meaning = flashcards_list[i]
         user_answer = input(f"{word} 的意思是什麼: ").strip()
         if normalize_string(user_answer) == "home":
-            print("返回主頁...")
+            print("返回主頁...（進度已保存，下次選這個單元可以繼續）")
+            return
+        elif check_meaning(user_answer, accepted[unit][word]):
+            print(Fore.GREEN + "正確！" + Style.RESET_ALL)
+            correct_answers += 1
+        else:
+            print(Fore.RED + f"錯誤！正確答案是：{meaning}" + Style.RESET_ALL)
+            incorrect_answers.append((word, meaning))
+        sessions.progress(session_id, i + 1, correct_answers, incorrect_answers)
+        print()
+
+    sessions.finish(session_id)
+    print("\n測驗結束！")
+    if incorrect_answers:
+        print("你答錯的題目：")
+        for word, meaning in incorrect_answers:
+            print(f"{word}: {meaning}")
+    print(f"\n答對率: {correct_answers / total_questions * 100:.2f}%")
+    input("按 Enter 返回主選單...")
+
+# Multiple-choice mode: pick the meaning of the word out of 4
+def choice_quiz_mode(flashcards, unit, choices):
+    print(f"\n選擇題模式：{unit} (輸入 'home' 返回主頁)")
+    sessions, session_id, flashcards_list, start, correct_answers, incorrect_answers = start_session(
+        flashcards, unit, "meaning-choice")
+    total_questions = len(flashcards_list)
+
+    for i in range(start, total_questions):
+        word, meaning = flashcards_list[i]
+        options, answer = make_choices(word, flashcards[unit], choices.get(unit, {}))
+        print(f"{word} 的意思是什麼:")
+        for idx, option in enumerate(options, start=1):
+            print(f"  {idx}. {flashcards[unit][option]}")
+        user_answer = input(f"請輸入選項 (1-{len(options)}): ").strip()
+        if normalize_string(user_answer) == "home":
+            print("返回主頁...（進度已保存，下次選這個單元可以繼續）")
             return
-        elif normalize_string(user_answer) == normalize_string(meaning):
+        elif user_answer == str(answer + 1):
             print(Fore.GREEN + "正確！" + Style.RESET_ALL)
             correct_answers += 1
         else:
             print(Fore.RED + f"錯誤！正確答案是：{meaning}" + Style.RESET_ALL)
             incorrect_answers.append((word, meaning))
+        sessions.progress(session_id, i + 1, correct_answers, incorrect_answers)
         print()
 
+    sessions.finish(session_id)
     print("\n測驗結束！")
     if incorrect_answers:
         print("你答錯的題目：")
@@ -78,7 +175,7 @@ def quiz_mode(flashcards, unit):
     input("按 Enter 返回主選單...")
 
 # Unlimited quiz mode
-def unlimited_quiz_mode(flashcards):
+def unlimited_quiz_mode(flashcards, accepted):
     print("\n無範圍測驗模式 (輸入 'home' 返回主頁)")
     all_flashcards = [(unit, word, meaning) for unit, unit_flashcards in flashcards.items()
                       for word, meaning in unit_flashcards.items()]
@@ -92,7 +189,7 @@ def unlimited_quiz_mode(flashcards):
         if normalize_string(user_answer) == "home":
             print("返回主頁...")
             return
-        elif normalize_string(user_answer) == normalize_string(meaning):
+        elif check_meaning(user_answer, accepted[unit][word]):
             print(Fore.GREEN + "正確！" + Style.RESET_ALL)
             correct_answers += 1
         else:
@@ -111,6 +208,7 @@ def unlimited_quiz_mode(flashcards):
 # Main
 def main():
     flashcards, learn_only_units = load_flashcards()
+    accepted = load_accepted()
     if not flashcards:
         print("無法載入卡片資料，請檢查文件內容。")
         return
@@ -123,18 +221,20 @@ def main():
             print("已退出。")
             break
         elif choice == "all":
-            unlimited_quiz_mode(flashcards)
+            unlimited_quiz_mode(flashcards, accepted)
         elif choice.isdigit() and 1 <= int(choice) <= len(units):
             unit = units[int(choice) - 1]
             if unit in learn_only_units:
                 print(f"\n{unit} 僅供學習，不提供測驗。進入學習模式...")
                 study_mode(flashcards, unit)
             else:
-                mode = input(f"\n你已選擇 {unit}。選擇模式: 1) 學習模式  2) 測驗模式\n請輸入選項 (1/2): ").strip()
+                mode = input(f"\n你已選擇 {unit}。選擇模式: 1) 學習模式  2) 測驗模式  3) 選擇題\n請輸入選項 (1/2/3): ").strip()
                 if mode == "1":
                     study_mode(flashcards, unit)
                 elif mode == "2":
-                    quiz_mode(flashcards, unit)
+                    quiz_mode(flashcards, unit, accepted)
+                elif mode == "3":
+                    choice_quiz_mode(flashcards, unit, load_choices())
                 else:
                     print("無效選項，返回主頁。")
         else:
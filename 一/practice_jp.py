@@ -1,12 +1,21 @@
 
 import random
 from colorama import Fore, Style
-import unicodedata
+import os
+import sys
 
-def normalize_string(s):
-    return unicodedata.normalize('NFKC', s.strip().lower())
+# Importing japanese_flashcard_pack puts its modules on the import path. Run directly
+# (cd 一 && python practice_jp.py) the repository root is not on sys.path yet, so add it first
+try:
+    import japanese_flashcard_pack  # noqa: F401
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import japanese_flashcard_pack  # noqa: F401
+from answers import normalize_string
 
-def load_flashcards(filename="flashcards.txt"):
+DECK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "flashcards.txt")
+
+def load_flashcards(filename=DECK):
     flashcards = {}
     learn_only_units = set()
     current_unit = None